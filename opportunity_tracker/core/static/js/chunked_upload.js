@@ -0,0 +1,111 @@
+// Resumable chunked uploads for <input type="file" data-upload-url="...">.
+// Each selected file is sent in chunks to its own upload session; the form
+// then only submits the ids of the finished uploads as hidden "uploads" inputs.
+
+const UPLOAD_RETRIES = 5;
+
+function csrfToken(form) {
+  const input = form.querySelector("[name=csrfmiddlewaretoken]");
+  return input ? input.value : "";
+}
+
+async function createUpload(url, file, token) {
+  const response = await fetch(url, {
+    method: "POST",
+    headers: {
+      "X-CSRFToken": token,
+      "Tus-Resumable": "1.0.0",
+      "Upload-Length": file.size,
+      "Upload-Metadata": `filename ${btoa(unescape(encodeURIComponent(file.name)))}`,
+    },
+  });
+  if (!response.ok) throw new Error(await response.text());
+  return response.headers.get("Location");
+}
+
+async function currentOffset(location) {
+  const response = await fetch(location, { method: "HEAD" });
+  return parseInt(response.headers.get("Upload-Offset"), 10);
+}
+
+async function uploadFile(input, file, onProgress) {
+  const form = input.form;
+  const token = csrfToken(form);
+  const chunkSize = parseInt(input.dataset.chunkSize, 10);
+  const location = await createUpload(input.dataset.uploadUrl, file, token);
+
+  let offset = 0;
+  let retries = 0;
+  while (offset < file.size) {
+    try {
+      const response = await fetch(location, {
+        method: "PATCH",
+        headers: {
+          "X-CSRFToken": token,
+          "Tus-Resumable": "1.0.0",
+          "Content-Type": "application/offset+octet-stream",
+          "Upload-Offset": offset,
+        },
+        body: file.slice(offset, offset + chunkSize),
+      });
+      if (response.status !== 204 && response.status !== 409) {
+        throw new Error(`Upload failed with ${response.status}`);
+      }
+      offset = parseInt(response.headers.get("Upload-Offset"), 10);
+      retries = 0;
+      onProgress(offset / file.size);
+    } catch (error) {
+      // Resume from whatever the server has stored
+      if (++retries > UPLOAD_RETRIES) throw error;
+      await new Promise((resolve) => setTimeout(resolve, 1000 * 2 ** retries));
+      offset = await currentOffset(location).catch(() => offset);
+    }
+  }
+  return location.split("/").filter(Boolean).pop();
+}
+
+document.addEventListener("change", async function (evt) {
+  const input = evt.target;
+  if (!input.matches("input[type=file][data-upload-url]")) return;
+
+  const form = input.form;
+  const files = Array.from(input.files);
+  const status = document.getElementById(input.dataset.statusTarget);
+  input.value = "";
+  form.dataset.pendingUploads = (parseInt(form.dataset.pendingUploads || "0", 10) + files.length).toString();
+
+  for (const file of files) {
+    const item = document.createElement("li");
+    item.className = "badge rounded-pill bg-light text-dark";
+    item.textContent = `${file.name} 0%`;
+    if (status) status.appendChild(item);
+
+    try {
+      const id = await uploadFile(input, file, (progress) => {
+        item.textContent = `${file.name} ${Math.floor(progress * 100)}%`;
+      });
+      const hidden = document.createElement("input");
+      hidden.type = "hidden";
+      hidden.name = "uploads";
+      hidden.value = id;
+      form.appendChild(hidden);
+      item.textContent = file.name;
+    } catch (error) {
+      item.className = "badge rounded-pill bg-danger";
+      item.textContent = `${file.name} failed`;
+    } finally {
+      form.dataset.pendingUploads = (parseInt(form.dataset.pendingUploads, 10) - 1).toString();
+    }
+  }
+});
+
+// Hold back the form until all chunks are stored
+function blockWhileUploading(evt) {
+  const form = evt.target.closest("form");
+  if (form && parseInt(form.dataset.pendingUploads || "0", 10) > 0) {
+    evt.preventDefault();
+    alert("Please wait until the attachments are uploaded.");
+  }
+}
+document.addEventListener("submit", blockWhileUploading, true);
+document.addEventListener("htmx:confirm", blockWhileUploading);
@@ -5,7 +5,15 @@ from django.http import HttpRequest, HttpResponse, JsonResponse
 from django.utils.timezone import now
 from django.views.generic import TemplateView
 
-from tracker.models import Opportunity
+from tracker.helpers.reference_cache import get_reference
+from tracker.models import FundingAgency, Institute, Opportunity, Unit
+
+
+def _code(model, pk, default=None):
+    """Code of a reference row from the reference data cache, without a join."""
+    if pk is None:
+        return default
+    return get_reference(model).codes.get(str(pk), default)
 
 
 class DashboardDataView(TemplateView):
@@ -131,7 +139,7 @@ class DashboardDataView(TemplateView):
         funding_agency_counts = Opportunity.objects.filter(
             created_at__year=period,
             funding_agency__in=top_ids
-        ).values("funding_agency__code", "status"
+        ).values("funding_agency", "status"
                  ).annotate(
             count=Count("id")
         ).order_by("-count", "status")
@@ -140,7 +148,7 @@ class DashboardDataView(TemplateView):
         agency_status_labels = set()
 
         for record in funding_agency_counts:
-            agency = record["funding_agency__code"]
+            agency = _code(FundingAgency, record["funding_agency"])
             status = self.status_dict[record["status"]]
             count = record["count"]
 
@@ -172,19 +180,19 @@ class DashboardDataView(TemplateView):
 
     def get_opportunity_by_lead_unit(self, period):
         opportunities = Opportunity.objects.filter(created_at__year=period, status__gt=1).values(
-            "lead_unit__code").annotate(count=Count("id")).order_by("-count")
+            "lead_unit").annotate(count=Count("id")).order_by("-count")
 
         return {
-            "lead_unit_labels": [opp["lead_unit__code"] for opp in opportunities],
+            "lead_unit_labels": [_code(Unit, opp["lead_unit"]) for opp in opportunities],
             "lead_unit_data": [opp["count"] for opp in opportunities]
         }
 
     def get_opportunity_by_lead_institute(self, period):
         opportunities = Opportunity.objects.filter(created_at__year=period, status__gte=5).values(
-            "lead_institute__code").annotate(count=Count("id")).order_by("-count")
+            "lead_institute").annotate(count=Count("id")).order_by("-count")
 
         return {
-            "lead_institute_labels": [opp["lead_institute__code"] for opp in opportunities],
+            "lead_institute_labels": [_code(Institute, opp["lead_institute"]) for opp in opportunities],
             "lead_institute_data": [opp["count"] for opp in opportunities]
         }
 
@@ -202,7 +210,7 @@ class DashboardDataView(TemplateView):
             created_at__year=period, status__exact=7, proposal_amount__gt=0).order_by("-proposal_amount")[:5]
 
         return {
-            "top5_won_valued_labels": [opp.funding_agency.code if opp.funding_agency else "unknown" for opp in opportunities],
+            "top5_won_valued_labels": [_code(FundingAgency, opp.funding_agency_id, "unknown") for opp in opportunities],
             "top5_won_valued_data": [opp.proposal_amount for opp in opportunities]
         }
 
@@ -211,7 +219,7 @@ class DashboardDataView(TemplateView):
             created_at__year=period, status__exact=5, proposal_amount__gt=0).order_by("-proposal_amount")[:5]
 
         return {
-            "top5_valued_submitted_labels": [opp.funding_agency.code if opp.funding_agency else "unknown" for opp in opportunities],
+            "top5_valued_submitted_labels": [_code(FundingAgency, opp.funding_agency_id, "unknown") for opp in opportunities],
             "top5_valued_submitted_data": [opp.proposal_amount for opp in opportunities]
         }
 
@@ -220,7 +228,7 @@ class DashboardDataView(TemplateView):
             created_at__year=period, status__exact=7, duration_months__gt=0).order_by("-duration_months")[:5]
 
         return {
-            "top5_duration_won_labels": [opp.funding_agency.code if opp.funding_agency else "unknown" for opp in opportunities],
+            "top5_duration_won_labels": [_code(FundingAgency, opp.funding_agency_id, "unknown") for opp in opportunities],
             "top5_duration_won_data": [opp.duration_months for opp in opportunities]
         }
 
@@ -229,7 +237,7 @@ class DashboardDataView(TemplateView):
             created_at__year=period, status__exact=5, duration_months__gt=0).order_by("-duration_months")[:5]
 
         return {
-            "top5_duration_submitted_labels": [opp.funding_agency.code if opp.funding_agency else "unknown" for opp in opportunities],
+            "top5_duration_submitted_labels": [_code(FundingAgency, opp.funding_agency_id, "unknown") for opp in opportunities],
             "top5_duration_submitted_data": [opp.duration_months for opp in opportunities]
         }
 
@@ -1,5 +1,6 @@
 from unfold.admin import ModelAdmin
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.utils import timezone
 from django_celery_beat.models import (
     PeriodicTask,
     IntervalSchedule,
@@ -8,6 +9,9 @@ from django_celery_beat.models import (
     ClockedSchedule
 )
 
+from .helpers.circuit_breaker import CircuitBreaker
+from .models import NOTIFICATION_METHODS, DeadLetterNotification, NotificationDelivery
+
 admin.site.unregister(PeriodicTask)
 admin.site.unregister(IntervalSchedule)
 admin.site.unregister(CrontabSchedule)
@@ -42,3 +46,59 @@ class SolarScheduleAdmin(ModelAdmin):
 @admin.register(ClockedSchedule)
 class ClockedScheduleAdmin(ModelAdmin):
     list_display = ("clocked_time",)
+
+
+class CircuitStateMixin:
+    """Warn on the changelist about every channel whose circuit is not closed."""
+
+    def changelist_view(self, request, extra_context=None):
+        for method, label in NOTIFICATION_METHODS:
+            circuit = CircuitBreaker(method).snapshot()
+            if circuit["state"] != CircuitBreaker.CLOSED:
+                self.message_user(
+                    request,
+                    f"{label} circuit is {circuit['state'].replace('_', '-')} after "
+                    f"{circuit['failures']} failures, next probe in {circuit['retry_after']}s.",
+                    messages.WARNING)
+        return super().changelist_view(request, extra_context)
+
+
+@admin.register(NotificationDelivery)
+class NotificationDeliveryAdmin(CircuitStateMixin, ModelAdmin):
+    list_display = ("created_at", "method", "recipient", "status",
+                    "attempts", "latency_ms", "response_code")
+    list_filter = ("status", "method")
+    search_fields = ("recipient", "subject")
+    date_hierarchy = "created_at"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(DeadLetterNotification)
+class DeadLetterNotificationAdmin(CircuitStateMixin, ModelAdmin):
+    list_display = ("created_at", "method", "recipient",
+                    "subject", "attempts", "replayed_at")
+    list_filter = ("method", "replayed_at")
+    search_fields = ("recipient", "subject")
+    readonly_fields = ("recipient", "method", "subject", "message",
+                       "error", "attempts", "created_at", "replayed_at")
+    actions = ["replay"]
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description="Replay selected notifications")
+    def replay(self, request, queryset):
+        from .tasks import deliver_notification
+
+        for dead_letter in queryset:
+            deliver_notification.delay(
+                dead_letter.method, dead_letter.recipient,
+                subject=dead_letter.subject, message=dead_letter.message)
+
+        count = queryset.update(replayed_at=timezone.now())
+        self.message_user(request, f"{count} notification(s) queued for delivery.")
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# Cache backends whose content is not seen by other processes
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches)
+def check_circuit_breaker_cache(app_configs, **kwargs):
+    """Warn when each Celery worker would keep its own notification circuit breakers."""
+    backend = settings.CACHES['default']['BACKEND']
+    if settings.CELERY_BROKER_URL and backend in PROCESS_LOCAL_CACHES:
+        return [Warning(
+            f"The default cache ({backend}) is not shared between processes, so "
+            "every Celery worker opens and closes its own notification circuit breakers.",
+            hint="Set CACHE_URL to a Redis server shared by the web and worker processes.",
+            id='notification.W001',
+        )]
+    return []
@@ -1,11 +1,99 @@
+import logging
+import time
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+from .circuit_breaker import CircuitBreaker
+from .exceptions import NotificationDeliveryError, ProviderUnavailable, RateLimitExceeded
+from .rate_limiter import get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DeliveryResult:
+    recipient: str
+    success: bool
+    response_code: str = ""
+    latency_ms: int = 0
+    error: str = ""
+    # Seconds until the provider can be tried again, when its circuit is open
+    # or its rate limit is exhausted
+    retry_after: float = 0
+    # Deferred by the rate limiter, without calling the provider
+    throttled: bool = False
 
 
 class NotificationChannel(ABC):
+    # Matches the `preferred_method` values stored on subscriptions
+    method = None
 
-    @abstractmethod
     def send(self, recipients, **kwargs):
-        pass
+        """Send the message to every recipient and return one DeliveryResult each.
+
+        Provider failures are captured per recipient instead of aborting the
+        whole batch, so the caller can log them and retry only what failed.
+        """
+        self.validate(**kwargs)
+        return self.send_batch([(recipient, kwargs) for recipient in recipients if recipient])
+
+    def send_batch(self, messages):
+        """Send a list of (recipient, kwargs) pairs, each with its own content."""
+        for _, kwargs in messages:
+            self.validate(**kwargs)
+        return [self.deliver(recipient, **kwargs) for recipient, kwargs in messages]
+
+    @property
+    def circuit_breaker(self):
+        return CircuitBreaker(self.method)
+
+    def deliver(self, recipient, **kwargs):
+        breaker = self.circuit_breaker
+        started = time.monotonic()
+        probing = False
+        try:
+            # Throttled calls never reach the breaker, so they cannot hold its probe
+            self.throttle()
+            probing = breaker.before_call()
+            started = time.monotonic()
+            response_code = self.send_one(recipient, **kwargs)
+        except Exception as e:
+            if isinstance(e, ProviderUnavailable):
+                breaker.record_failure()
+            elif probing:
+                breaker.release_probe()
+            logger.warning("%s delivery to %s failed: %s",
+                           self.method, recipient, e)
+            return DeliveryResult(
+                recipient=recipient,
+                success=False,
+                response_code=getattr(e, "response_code", ""),
+                latency_ms=int((time.monotonic() - started) * 1000),
+                error=str(e) or e.__class__.__name__,
+                retry_after=getattr(e, "retry_after", 0),
+                throttled=isinstance(e, RateLimitExceeded),
+            )
+
+        breaker.record_success()
+        return DeliveryResult(
+            recipient=recipient,
+            success=True,
+            response_code=str(response_code or ""),
+            latency_ms=int((time.monotonic() - started) * 1000),
+        )
+
+    def validate(self, **kwargs):
+        """Raise ValueError when the message arguments are incomplete."""
+
+    def throttle(self):
+        """Take a token from the channel's shared rate limiter, if one is configured."""
+        bucket = get_rate_limiter(self.method)
+        if bucket:
+            bucket.acquire()
+
+    @abstractmethod
+    def send_one(self, recipient, **kwargs):
+        """Send to a single recipient and return the provider response code."""
 
 
 class NotificationService:
@@ -0,0 +1,102 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .exceptions import CircuitOpenError
+
+
+class CircuitBreaker:
+    """Per-channel circuit breaker whose state is shared by all workers via the cache.
+
+    The circuit opens after `failure_threshold` consecutive provider failures.
+    While open, calls fail fast with CircuitOpenError; once `recovery_timeout`
+    has passed a single probe call is let through (half-open). A successful
+    probe closes the circuit, a failed one opens it again.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, failure_threshold=None, recovery_timeout=None):
+        self.name = name
+        self.failure_threshold = failure_threshold or settings.NOTIFICATION_CIRCUIT_FAILURE_THRESHOLD
+        self.recovery_timeout = recovery_timeout or settings.NOTIFICATION_CIRCUIT_RECOVERY_TIMEOUT
+
+    def _key(self, suffix):
+        return f"notification:circuit:{self.name}:{suffix}"
+
+    @property
+    def opened_at(self):
+        return cache.get(self._key("opened_at"))
+
+    @property
+    def failures(self):
+        return cache.get(self._key("failures"), 0)
+
+    @property
+    def state(self):
+        opened_at = self.opened_at
+        if opened_at is None:
+            return self.CLOSED
+        if time.time() - opened_at < self.recovery_timeout:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def retry_after(self):
+        opened_at = self.opened_at
+        if opened_at is None:
+            return 0
+        return max(0, self.recovery_timeout - (time.time() - opened_at))
+
+    def before_call(self):
+        """Raise CircuitOpenError unless the provider may be called.
+
+        Returns True when the call is the half-open probe. The caller then
+        gives the probe back through record_success, record_failure or
+        release_probe.
+        """
+        state = self.state
+        if state == self.OPEN:
+            raise CircuitOpenError(
+                f"Circuit for {self.name} is open", self.retry_after())
+        # Only one worker gets to probe a half-open circuit
+        if state == self.HALF_OPEN:
+            if not cache.add(self._key("probe"), 1, self.recovery_timeout):
+                raise CircuitOpenError(
+                    f"Circuit for {self.name} is half-open, probe in progress", self.recovery_timeout)
+            return True
+        return False
+
+    def record_success(self):
+        cache.delete_many([self._key("failures"),
+                          self._key("opened_at"), self._key("probe")])
+
+    def record_failure(self):
+        if self.state == self.HALF_OPEN:
+            self._open()
+            return
+
+        cache.add(self._key("failures"), 0, None)
+        if cache.incr(self._key("failures")) >= self.failure_threshold:
+            self._open()
+
+    def release_probe(self):
+        """Let another call probe the circuit when the probe told nothing about the provider."""
+        cache.delete(self._key("probe"))
+
+    def _open(self):
+        cache.set(self._key("opened_at"), time.time(), None)
+        cache.delete(self._key("probe"))
+
+    def reset(self):
+        self.record_success()
+
+    def snapshot(self):
+        return {
+            "channel": self.name,
+            "state": self.state,
+            "failures": self.failures,
+            "opened_at": self.opened_at,
+            "retry_after": round(self.retry_after(), 1),
+        }
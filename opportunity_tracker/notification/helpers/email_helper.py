@@ -1,24 +1,56 @@
-from django.core.mail import EmailMultiAlternatives, send_mail
+import smtplib
+
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.utils.html import strip_tags
 from .base import NotificationChannel
+from .exceptions import NotificationDeliveryError, ProviderUnavailable
 
 
 class EmailNotificationChannel(NotificationChannel):
-    def send(self, recipients, **kwargs):
-        subject = kwargs.get("subject")
-        message = kwargs.get("message")
+    method = "email"
+    from_email = "noreply@swisstph.ch"
+    connection = None
+
+    def send_batch(self, messages):
+        # One SMTP session for the whole batch, one message per recipient so
+        # a rejected address does not fail the others. If the session cannot
+        # be opened, every send_one reports the connection error itself.
+        self.connection = get_connection()
+        try:
+            self.connection.open()
+        except Exception:
+            pass
 
-        if not subject or not message:
+        try:
+            return super().send_batch(messages)
+        finally:
+            self.connection.close()
+            self.connection = None
+
+    def validate(self, **kwargs):
+        if not kwargs.get("subject") or not kwargs.get("message"):
             raise ValueError(
                 "Email notification requires both subject and message")
 
-        if recipients:
-            plain_text = strip_tags(message)
-            email = send_mail(
-                subject=subject,
-                message=plain_text,
-                from_email="noreply@swisstph.ch",
-                recipient_list=recipients,
-                html_message=message,
-            )
-            return email
+    def send_one(self, recipient, **kwargs):
+        message = kwargs.get("message")
+        email = EmailMultiAlternatives(
+            subject=kwargs.get("subject"),
+            body=strip_tags(message),
+            from_email=self.from_email,
+            to=[recipient],
+            connection=self.connection,
+        )
+        email.attach_alternative(message, "text/html")
+        try:
+            email.send()
+        except smtplib.SMTPResponseException as e:
+            # 421: the server is shutting down or refusing connections
+            if e.smtp_code == 421:
+                raise ProviderUnavailable(str(e), e.smtp_code) from e
+            raise NotificationDeliveryError(str(e), e.smtp_code) from e
+        except smtplib.SMTPRecipientsRefused as e:
+            raise NotificationDeliveryError(str(e)) from e
+        except (smtplib.SMTPServerDisconnected, OSError) as e:
+            raise ProviderUnavailable(f"SMTP connection error: {e}") from e
+        return "250"
@@ -0,0 +1,26 @@
+class NotificationDeliveryError(Exception):
+    """Raised when a provider rejects a message or cannot be reached."""
+
+    def __init__(self, message="", response_code=""):
+        super().__init__(message)
+        self.response_code = str(response_code or "")
+
+
+class RateLimitExceeded(NotificationDeliveryError):
+    """Raised when no token is available yet or the daily quota is spent."""
+
+    def __init__(self, message="", retry_after=0):
+        super().__init__(message, 429)
+        self.retry_after = retry_after
+
+
+class ProviderUnavailable(NotificationDeliveryError):
+    """Raised when the provider itself is down, as opposed to rejecting one recipient."""
+
+
+class CircuitOpenError(NotificationDeliveryError):
+    """Raised without calling the provider while its circuit breaker is open."""
+
+    def __init__(self, message="", retry_after=0):
+        super().__init__(message, 503)
+        self.retry_after = retry_after
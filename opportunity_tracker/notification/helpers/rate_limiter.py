@@ -0,0 +1,160 @@
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .exceptions import RateLimitExceeded
+
+
+# Refills the bucket from the Redis server clock, takes the requested tokens
+# if available and returns the seconds to wait otherwise (-1 when the daily
+# quota is exhausted). Runs atomically, so all workers share one bucket.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local daily_limit = tonumber(ARGV[4])
+
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+if daily_limit > 0 then
+    local used = tonumber(redis.call('GET', KEYS[2]) or '0')
+    if used + requested > daily_limit then
+        return '-1'
+    end
+end
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local wait = 0
+if tokens >= requested then
+    tokens = tokens - requested
+    if daily_limit > 0 then
+        redis.call('INCRBY', KEYS[2], requested)
+        redis.call('EXPIRE', KEYS[2], 90000)
+    end
+else
+    wait = (requested - tokens) / rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RedisBucketBackend:
+    def __init__(self, client):
+        self.client = client
+        self.script = client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    def take(self, key, day_key, rate, capacity, tokens, daily_limit):
+        return float(self.script(keys=[key, day_key], args=[rate, capacity, tokens, daily_limit or 0]))
+
+
+class LocalBucketBackend:
+    """In-process bucket used in tests and when Redis is not configured."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets = {}
+        self.usage = {}
+
+    def take(self, key, day_key, rate, capacity, tokens, daily_limit):
+        with self.lock:
+            now = time.monotonic()
+            if daily_limit and self.usage.get(day_key, 0) + tokens > daily_limit:
+                return -1
+
+            available, ts = self.buckets.get(key, (capacity, now))
+            available = min(capacity, available + max(0, now - ts) * rate)
+
+            wait = 0
+            if available >= tokens:
+                available -= tokens
+                if daily_limit:
+                    self.usage[day_key] = self.usage.get(day_key, 0) + tokens
+            else:
+                wait = (tokens - available) / rate
+
+            self.buckets[key] = (available, now)
+            return wait
+
+
+class TokenBucket:
+    def __init__(self, name, rate, capacity=None, daily_limit=None, backend=None):
+        self.name = name
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.daily_limit = daily_limit
+        self.backend = backend or LocalBucketBackend()
+
+    @property
+    def key(self):
+        return f"notification:ratelimit:{self.name}"
+
+    def acquire(self, tokens=1):
+        """Take `tokens` from the bucket without waiting for them.
+
+        Raises RateLimitExceeded when they are not available yet, with the
+        seconds until they are in `retry_after`, or when the daily quota is
+        spent, with the seconds until the next day's quota. The caller defers
+        the message instead of holding a worker while the bucket refills.
+        """
+        now = timezone.now()
+        day_key = f"{self.key}:{now:%Y%m%d}"
+        wait = self.backend.take(
+            self.key, day_key, self.rate, self.capacity, tokens, self.daily_limit)
+        if wait < 0:
+            tomorrow = (now + timedelta(days=1)).replace(
+                hour=0, minute=0, second=0, microsecond=0)
+            raise RateLimitExceeded(
+                f"Daily limit of {self.daily_limit} reached for {self.name}",
+                retry_after=(tomorrow - now).total_seconds())
+        if wait > 0:
+            raise RateLimitExceeded(
+                f"Rate limit for {self.name} exceeded, retry in {wait:.1f}s", retry_after=wait)
+
+
+_backend = None
+_buckets = {}
+_lock = threading.Lock()
+
+
+def _get_backend():
+    global _backend
+    if _backend is None:
+        redis_url = settings.NOTIFICATION_RATE_LIMIT_REDIS_URL
+        if redis_url and redis_url.startswith(("redis://", "rediss://", "unix://")):
+            import redis
+            _backend = RedisBucketBackend(redis.Redis.from_url(redis_url))
+        else:
+            _backend = LocalBucketBackend()
+    return _backend
+
+
+def get_rate_limiter(method):
+    """Return the shared token bucket for a channel, or None if it is unlimited.
+
+    A channel without a configuration or with a rate of 0 is unlimited.
+    """
+    with _lock:
+        if method not in _buckets:
+            config = settings.NOTIFICATION_RATE_LIMITS.get(method)
+            unlimited = not config or config["rate"] <= 0
+            _buckets[method] = None if unlimited else TokenBucket(
+                method, backend=_get_backend(), **config)
+        return _buckets[method]
+
+
+def reset_rate_limiters():
+    global _backend
+    with _lock:
+        _backend = None
+        _buckets.clear()
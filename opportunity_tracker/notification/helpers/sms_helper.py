@@ -1,12 +1,18 @@
+import logging
+
 from .base import NotificationChannel
 
+logger = logging.getLogger(__name__)
+
 
 class SMSNotificationChannel(NotificationChannel):
-    def send(self, recipients, **kwargs):
-        message = kwargs.get('message')
-        if not message:
+    method = "sms"
+
+    def validate(self, **kwargs):
+        if not kwargs.get('message'):
             raise ValueError("SMS requires a message")
 
-        for recipient in recipients:
-            # Call SMS API
-            print(f"Sending SMS to {recipient}")
+    def send_one(self, recipient, **kwargs):
+        # Call SMS API
+        logger.info("Sending SMS to %s", recipient)
+        return ""
@@ -1,21 +1,29 @@
 import json
-import aiohttp
+import logging
+import os
+
 import requests
+
 from .base import NotificationChannel
-import os
+from .exceptions import NotificationDeliveryError, ProviderUnavailable
+
+logger = logging.getLogger(__name__)
 
 
 class WhatsAppNotificationChannel(NotificationChannel):
-    def send(self, recipients, **kwargs):
-        message = kwargs.get('message')
-        if not message:
+    method = "whatsapp"
+    timeout = 10
+
+    def validate(self, **kwargs):
+        if not kwargs.get('message'):
             raise ValueError("WhatsApp requires a message")
 
-        for recipient in recipients:
-            # Call WhatsApp API
-            print(f"Sending WhatsApp to {recipient}")
-            message_data = self.get_text_message_input(recipient, message)
-            self.send_message(message_data)
+    def send_one(self, recipient, **kwargs):
+        # Call WhatsApp API
+        logger.info("Sending WhatsApp to %s", recipient)
+        message_data = self.get_text_message_input(
+            recipient, kwargs.get('message'))
+        return self.send_message(message_data)
 
     def send_message(self, data):
         headers = {
@@ -23,18 +31,23 @@ class WhatsAppNotificationChannel(NotificationChannel):
             "Authorization": f"Bearer {os.getenv("ACCESS_TOKEN")}",
         }
 
-        url = f"https://graph.facebook.com/{os.getenv("VERSION")}/{
+        base_url = os.getenv("WHATSAPP_API_URL", "https://graph.facebook.com")
+        url = f"{base_url}/{os.getenv("VERSION")}/{
             os.getenv("PHONE_NUMBER_ID")}/messages"
         try:
-            response = requests.post(url, data=data, headers=headers)
-            if response.status_code == 200:
-                print("Message sent successfully",
-                      response.status_code, response.text)
-            else:
-                print("Failed to send message",
-                      response.status_code, response.text)
-        except Exception as e:
-            print("Connection Error:", e)
+            response = requests.post(
+                url, data=data, headers=headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise ProviderUnavailable(f"Connection Error: {e}") from e
+
+        if response.status_code >= 500:
+            raise ProviderUnavailable(
+                f"Failed to send message: {response.text}", response.status_code)
+        if response.status_code != 200:
+            raise NotificationDeliveryError(
+                f"Failed to send message: {response.text}", response.status_code)
+
+        return response.status_code
 
     def get_text_message_input(self, recipient, text):
         return json.dumps({
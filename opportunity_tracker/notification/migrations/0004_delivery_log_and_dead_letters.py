@@ -0,0 +1,51 @@
+# Generated by Django 5.1.2 on 2026-10-19 13:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification', '0003_alter_opportunitysubscription_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeadLetterNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipient', models.CharField(max_length=255)),
+                ('method', models.CharField(choices=[('email', 'Email'), ('whatsapp', 'WhatsApp'), ('sms', 'SMS')], max_length=15)),
+                ('subject', models.CharField(blank=True, max_length=255)),
+                ('message', models.TextField()),
+                ('error', models.TextField(blank=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('replayed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'notification_dead_letters',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='NotificationDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipient', models.CharField(max_length=255)),
+                ('method', models.CharField(choices=[('email', 'Email'), ('whatsapp', 'WhatsApp'), ('sms', 'SMS')], max_length=15)),
+                ('subject', models.CharField(blank=True, max_length=255)),
+                ('status', models.CharField(choices=[('sent', 'Sent'), ('failed', 'Failed'), ('dead', 'Dead-lettered')], db_index=True, max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=1)),
+                ('latency_ms', models.PositiveIntegerField(default=0)),
+                ('response_code', models.CharField(blank=True, max_length=20)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Notification deliveries',
+                'db_table': 'notification_deliveries',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.2 on 2026-10-19 13:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification', '0004_delivery_log_and_dead_letters'),
+        ('tracker', '0009_alter_opportunity_is_noncompetitive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='opportunitysubscription',
+            name='digest_mode',
+            field=models.CharField(choices=[('immediate', 'Immediate'), ('hourly', 'Hourly digest'), ('daily', 'Daily digest')], default='immediate', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='PendingNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('opportunity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='tracker.opportunity')),
+                ('subscription', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_notifications', to='notification.opportunitysubscription')),
+            ],
+            options={
+                'db_table': 'notification_pending',
+                'constraints': [models.UniqueConstraint(fields=('subscription', 'opportunity'), name='unique_pending_notification')],
+            },
+        ),
+    ]
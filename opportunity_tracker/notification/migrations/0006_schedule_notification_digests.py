@@ -0,0 +1,43 @@
+from django.db import migrations
+
+
+DIGEST_SCHEDULES = {
+    # digest_mode: crontab minute, hour
+    'hourly': ('0', '*'),
+    'daily': ('0', '7'),
+}
+
+
+def create_digest_tasks(apps, schema_editor):
+    CrontabSchedule = apps.get_model('django_celery_beat', 'CrontabSchedule')
+    PeriodicTask = apps.get_model('django_celery_beat', 'PeriodicTask')
+
+    for digest_mode, (minute, hour) in DIGEST_SCHEDULES.items():
+        schedule, _ = CrontabSchedule.objects.get_or_create(
+            minute=minute, hour=hour, day_of_week='*', day_of_month='*', month_of_year='*')
+        PeriodicTask.objects.get_or_create(
+            name=f"Send {digest_mode} notification digests",
+            defaults={
+                'task': 'notification.tasks.send_notification_digests',
+                'crontab': schedule,
+                'args': f'["{digest_mode}"]',
+            },
+        )
+
+
+def delete_digest_tasks(apps, schema_editor):
+    PeriodicTask = apps.get_model('django_celery_beat', 'PeriodicTask')
+    PeriodicTask.objects.filter(
+        task='notification.tasks.send_notification_digests').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification', '0005_opportunitysubscription_digest_mode'),
+        ('django_celery_beat', '0019_alter_periodictasks_options'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_digest_tasks, delete_digest_tasks),
+    ]
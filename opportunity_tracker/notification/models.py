@@ -34,6 +34,11 @@ class NotificationSubscription(models.Model):
 
 
 class OpportunitySubscription(models.Model):
+    DIGEST_MODES = [
+        ('immediate', 'Immediate'),
+        ('hourly', 'Hourly digest'),
+        ('daily', 'Daily digest'),
+    ]
     user = models.ForeignKey(settings.AUTH_USER_MODEL,
                              on_delete=models.CASCADE)
     opportunity = models.ForeignKey(
@@ -41,8 +46,77 @@ class OpportunitySubscription(models.Model):
     preferred_method = models.CharField(max_length=15, choices=[(
         'email', 'Email'), ('whatsapp', "WhatsApp"), ('sms', 'SMS')], default='email')
     is_active = models.BooleanField(default=True)
+    digest_mode = models.CharField(
+        max_length=10, choices=DIGEST_MODES, default='immediate')
 
     class Meta:
         db_table = 'opportunity_subscriptions'
         ordering = ['user__first_name',
                     'user__last_name', 'opportunity__ref_no']
+
+
+NOTIFICATION_METHODS = [
+    ('email', 'Email'), ('whatsapp', "WhatsApp"), ('sms', 'SMS')]
+
+
+class NotificationDelivery(models.Model):
+    STATUS = [
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+        ('dead', 'Dead-lettered'),
+    ]
+    recipient = models.CharField(max_length=255)
+    method = models.CharField(max_length=15, choices=NOTIFICATION_METHODS)
+    subject = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS, db_index=True)
+    attempts = models.PositiveSmallIntegerField(default=1)
+    latency_ms = models.PositiveIntegerField(default=0)
+    response_code = models.CharField(max_length=20, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        db_table = 'notification_deliveries'
+        ordering = ['-created_at']
+        verbose_name_plural = 'Notification deliveries'
+
+    def __str__(self):
+        return f"{self.method} to {self.recipient} ({self.status})"
+
+
+class DeadLetterNotification(models.Model):
+    recipient = models.CharField(max_length=255)
+    method = models.CharField(max_length=15, choices=NOTIFICATION_METHODS)
+    subject = models.CharField(max_length=255, blank=True)
+    message = models.TextField()
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    replayed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'notification_dead_letters'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.method} to {self.recipient}"
+
+
+class PendingNotification(models.Model):
+    """An opportunity update waiting to go out in a subscriber's next digest.
+
+    Repeated updates of the same opportunity within one digest window collapse
+    into a single row.
+    """
+    subscription = models.ForeignKey(
+        OpportunitySubscription, on_delete=models.CASCADE, related_name='pending_notifications')
+    opportunity = models.ForeignKey(
+        'tracker.Opportunity', on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'notification_pending'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['subscription', 'opportunity'], name='unique_pending_notification'),
+        ]
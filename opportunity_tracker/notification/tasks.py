@@ -1,54 +1,249 @@
 import os
+import random
 from celery import shared_task
 from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.db import transaction
 from django.urls import reverse
 from requests import request
 
-from notification.helpers.base import NotificationService
+from notification.helpers.base import NotificationService, NotificationDeliveryError
 from notification.helpers.email_helper import EmailNotificationChannel
 from notification.helpers.whatsapp_helper import WhatsAppNotificationChannel
 from notification.helpers.sms_helper import SMSNotificationChannel
-from .models import NotificationChannel, NotificationSubscription, OpportunitySubscription
+from .models import (DeadLetterNotification, NotificationChannel, NotificationDelivery,
+                     NotificationSubscription, OpportunitySubscription, PendingNotification)
 from tracker.models import Opportunity
 from django.core.mail import send_mail
 from django.template.loader import render_to_string
 
+# Map each preferred method with its channel
+CHANNEL_CLASSES = {
+    'email': EmailNotificationChannel,
+    'whatsapp': WhatsAppNotificationChannel,
+    'sms': SMSNotificationChannel,
+}
 
-@shared_task
-def execute_channel_send(subscription_ids, model, subject="", email_message="", short_message=""):
-    # Map each channel with the preferred method
-    channels_map = {
-        'email': EmailNotificationChannel(),
-        'whatsapp': WhatsAppNotificationChannel(),
-        'sms': SMSNotificationChannel(),
-    }
 
+def _message_for(method, email_message, short_message):
+    return email_message if method == 'email' else short_message
+
+
+def _delivery_log(result, method, subject, status, attempts=1):
+    return NotificationDelivery(
+        recipient=result.recipient,
+        method=method,
+        subject=subject[:255],
+        status=status,
+        attempts=attempts,
+        latency_ms=result.latency_ms,
+        response_code=result.response_code[:20],
+        error=result.error,
+    )
+
+
+def _jitter():
+    return random.uniform(0, settings.NOTIFICATION_RETRY_BACKOFF)
+
+
+def _defer(method, recipient, subject, message, retry_after, deferrals=1, retries=0):
+    """Re-queue a throttled message once the rate limit lets it through.
+
+    The provider was never called, so the retry count is carried over as is
+    and the deferral is not logged as a failed delivery.
+    """
+    deliver_notification.apply_async(
+        (method, recipient), {'subject': subject, 'message': message, 'deferrals': deferrals},
+        countdown=retry_after + _jitter(), retries=retries)
+
+
+def _dispatch(messages_by_method):
+    """Send (recipient, kwargs) messages grouped by method.
+
+    Every delivered or failed recipient is written to the delivery log in one
+    bulk insert and failed ones are handed over to the retry task. Throttled
+    ones are deferred until the rate limit lets them through.
+    """
+    delivery_logs = []
+    for method, messages in messages_by_method.items():
+        channel = CHANNEL_CLASSES[method]()
+        results = channel.send_batch(messages)
+
+        for result, (_, kwargs) in zip(results, messages):
+            subject = kwargs.get('subject', '')
+            if result.success:
+                delivery_logs.append(
+                    _delivery_log(result, method, subject, 'sent'))
+            elif result.throttled:
+                _defer(method, result.recipient, subject,
+                       kwargs.get('message', ''), result.retry_after)
+            else:
+                delivery_logs.append(
+                    _delivery_log(result, method, subject, 'failed'))
+                # An open circuit defers the retry until the probe is allowed
+                deliver_notification.apply_async(
+                    (method, result.recipient), kwargs,
+                    countdown=result.retry_after + _jitter() if result.retry_after else None)
+
+    return NotificationDelivery.objects.bulk_create(delivery_logs)
+
+
+def _recipient_for(user, method):
+    return user.email if method == 'email' else user.phone_number
+
+
+@shared_task
+def execute_channel_send(subscription_ids, model, subject="", email_message="", short_message="", opportunity_id=None):
     # Group notifications by channel
-    notification_by_channel = {}
+    messages_by_method = {}
+    pending = []
 
     ModelClass = apps.get_model('notification', model)
     subscriptions = ModelClass.objects.filter(
-        id__in=subscription_ids)
+        id__in=subscription_ids).select_related('user')
 
     for subscription in subscriptions:
+        # Digest subscribers get the update with their next digest instead
+        if opportunity_id and getattr(subscription, 'digest_mode', 'immediate') != 'immediate':
+            pending.append(PendingNotification(
+                subscription=subscription, opportunity_id=opportunity_id))
+            continue
+
         preferred_method = subscription.preferred_method
-        if preferred_method in channels_map:
-            channel = channels_map[preferred_method]
-            if channel not in notification_by_channel:
-                notification_by_channel[channel] = []
-            notification_by_channel[channel].append(
-                subscription.user.email if preferred_method == 'email' else subscription.user.phone_number)
-
-    # Send notification via each channel
-    for channel, recipients in notification_by_channel.items():
-        if isinstance(channel, EmailNotificationChannel):
-            channel.send(
-                recipients=recipients,
-                subject=subject,
-                message=email_message
-            )
-        else:
-            channel.send(
-                recipients=recipients,
-                message=short_message
-            )
+        recipient = _recipient_for(subscription.user, preferred_method)
+        if preferred_method in CHANNEL_CLASSES and recipient:
+            messages_by_method.setdefault(preferred_method, []).append((recipient, {
+                'subject': subject,
+                'message': _message_for(preferred_method, email_message, short_message),
+            }))
+
+    PendingNotification.objects.bulk_create(pending, ignore_conflicts=True)
+    delivery_logs = _dispatch(messages_by_method)
+
+    return f"{len(delivery_logs)} notifications processed, {len(pending)} queued for digests."
+
+
+@shared_task
+def notify_user(user_id, subject="", email_message=""):
+    """Email one user directly, outside any channel subscription."""
+    user = get_user_model().objects.filter(id=user_id).first()
+    if not user or not user.email:
+        return "User has no email address."
+    delivery_logs = _dispatch({'email': [(user.email, {
+        'subject': subject, 'message': email_message})]})
+    return f"{len(delivery_logs)} notifications processed."
+
+
+@shared_task
+def send_notification_digests(digest_mode):
+    """Fan out the pending digest of every user, NOTIFICATION_DIGEST_BATCH_SIZE users per task.
+
+    Scheduled hourly and daily through django-celery-beat.
+    """
+    user_ids = list(PendingNotification.objects.filter(
+        subscription__digest_mode=digest_mode).values_list(
+            'subscription__user_id', flat=True).order_by().distinct())
+
+    batch_size = settings.NOTIFICATION_DIGEST_BATCH_SIZE
+    for i in range(0, len(user_ids), batch_size):
+        send_digest_batch.delay(digest_mode, user_ids[i:i + batch_size])
+
+    return f"{digest_mode} digests queued for {len(user_ids)} users."
+
+
+@shared_task
+def send_digest_batch(digest_mode, user_ids):
+    """Render and send one digest per user and delivery method.
+
+    The pending rows are locked while their digests are sent and deleted in
+    the same transaction afterwards, so a crash before then leaves them for
+    the next run. Failed sends are covered by the retry task.
+    """
+    with transaction.atomic():
+        pending = list(PendingNotification.objects.select_for_update(
+            skip_locked=True, of=('self',)).filter(
+                subscription__digest_mode=digest_mode,
+                subscription__user_id__in=user_ids,
+        ).select_related('subscription__user', 'opportunity__funding_agency').order_by('-created_at'))
+
+        digests = {}
+        for item in pending:
+            subscription = item.subscription
+            if subscription.is_active:
+                digests.setdefault(
+                    (subscription.user, subscription.preferred_method), []).append(item.opportunity)
+
+        messages_by_method = {}
+        for (user, method), opportunities in digests.items():
+            recipient = _recipient_for(user, method)
+            if method not in CHANNEL_CLASSES or not recipient:
+                continue
+
+            subject = f"{len(opportunities)} subscribed opportunities updated"
+            if method == 'email':
+                message = render_to_string('notification/emails/digest.html', {
+                    'user': user,
+                    'opportunities': opportunities,
+                    'digest_mode': digest_mode,
+                    'site_url': settings.SITE_URL,
+                })
+            else:
+                message = f"{len(opportunities)} opportunities you are subscribed to have been updated."
+            messages_by_method.setdefault(method, []).append(
+                (recipient, {'subject': subject, 'message': message}))
+
+        delivery_logs = _dispatch(messages_by_method)
+        PendingNotification.objects.filter(
+            id__in=[item.id for item in pending]).delete()
+
+    return f"{len(delivery_logs)} {digest_mode} digests sent."
+
+
+@shared_task(
+    bind=True,
+    autoretry_for=(NotificationDeliveryError,),
+    retry_backoff=settings.NOTIFICATION_RETRY_BACKOFF,
+    retry_backoff_max=settings.NOTIFICATION_RETRY_BACKOFF_MAX,
+    retry_jitter=True,
+    max_retries=settings.NOTIFICATION_MAX_RETRIES,
+)
+def deliver_notification(self, method, recipient, subject="", message="", deferrals=0):
+    """Retry a single failed recipient with exponential backoff.
+
+    Once the retries, or NOTIFICATION_MAX_DEFERRALS rate limit deferrals, are
+    exhausted the message is moved to the dead-letter table, from where it
+    can be replayed in the admin.
+    """
+    channel = CHANNEL_CLASSES[method]()
+    result = channel.send(
+        recipients=[recipient], subject=subject, message=message)[0]
+
+    # The first attempt happened in execute_channel_send
+    attempts = self.request.retries + 2
+
+    if result.success:
+        _delivery_log(result, method, subject, 'sent', attempts).save()
+        return f"{method} notification delivered to {recipient}."
+
+    if result.throttled and deferrals < settings.NOTIFICATION_MAX_DEFERRALS:
+        _defer(method, recipient, subject, message, result.retry_after,
+               deferrals + 1, self.request.retries)
+        return f"{method} notification to {recipient} deferred by the rate limit."
+
+    if result.throttled or self.request.retries >= self.max_retries:
+        _delivery_log(result, method, subject, 'dead', attempts).save()
+        DeadLetterNotification.objects.create(
+            recipient=recipient,
+            method=method,
+            subject=subject[:255],
+            message=message,
+            error=result.error,
+            attempts=attempts,
+        )
+        return f"{method} notification to {recipient} moved to dead letters."
+
+    _delivery_log(result, method, subject, 'failed', attempts).save()
+    if result.retry_after:
+        raise self.retry(countdown=result.retry_after + _jitter())
+    raise NotificationDeliveryError(result.error, result.response_code)
@@ -1,3 +1,730 @@
-from django.test import TestCase
+"""
+Unit tests for notification app.
 
-# Create your tests here.
+This module tests:
+- Per-recipient delivery results of the notification channels
+- Delivery logging, retries and dead-lettering in the Celery tasks
+- Dead-letter replay from the admin
+- Shared token-bucket rate limiting of outbound providers
+- Per-channel circuit breakers
+- Hourly and daily digests for opportunity subscriptions
+- Subscribing and choosing a digest mode from the opportunity pages
+"""
+import multiprocessing
+import os
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+import requests
+
+from notification.checks import check_circuit_breaker_cache
+from notification.helpers.base import NotificationDeliveryError
+from notification.helpers.circuit_breaker import CircuitBreaker
+from notification.helpers.email_helper import EmailNotificationChannel
+from notification.helpers.exceptions import CircuitOpenError, RateLimitExceeded
+from notification.helpers.rate_limiter import (LocalBucketBackend, TokenBucket,
+                                               get_rate_limiter, reset_rate_limiters)
+from notification.helpers.whatsapp_helper import WhatsAppNotificationChannel
+from notification.models import (DeadLetterNotification, NotificationChannel,
+                                 NotificationDelivery, NotificationSubscription,
+                                 OpportunitySubscription, PendingNotification)
+from notification.tasks import (deliver_notification, execute_channel_send, notify_user,
+                                send_digest_batch, send_notification_digests)
+from tracker.models import Opportunity
+
+User = get_user_model()
+
+
+class EmailNotificationChannelTest(TestCase):
+    """Test cases for EmailNotificationChannel."""
+
+    def test_send_returns_result_per_recipient(self):
+        """Test that each recipient gets its own message and result."""
+        results = EmailNotificationChannel().send(
+            ['a@example.com', 'b@example.com'], subject='Hello', message='<p>Hi</p>')
+
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[0].to, ['a@example.com'])
+        self.assertTrue(all(result.success for result in results))
+
+    def test_send_captures_provider_failure(self):
+        """Test that a failing recipient does not abort the batch."""
+        original = EmailNotificationChannel.send_one
+
+        def send_one(channel, recipient, **kwargs):
+            if recipient == 'bad@example.com':
+                raise NotificationDeliveryError('Mailbox unavailable', 550)
+            return original(channel, recipient, **kwargs)
+
+        with patch.object(EmailNotificationChannel, 'send_one', send_one):
+            results = EmailNotificationChannel().send(
+                ['bad@example.com', 'good@example.com'], subject='Hello', message='Hi')
+
+        self.assertFalse(results[0].success)
+        self.assertEqual(results[0].response_code, '550')
+        self.assertTrue(results[1].success)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_send_requires_subject_and_message(self):
+        """Test that incomplete messages are rejected."""
+        with self.assertRaises(ValueError):
+            EmailNotificationChannel().send(['a@example.com'], message='Hi')
+
+
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True)
+class ExecuteChannelSendTaskTest(TestCase):
+    """Test cases for execute_channel_send task."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.channel = NotificationChannel.objects.create(
+            name='test_channel', description='Test')
+        self.subscription_ids = []
+        for username in ('alice', 'bob'):
+            user = User.objects.create_user(
+                username=username, email=f'{username}@example.com', password='testpass123')
+            self.subscription_ids.append(NotificationSubscription.objects.create(
+                user=user, channel=self.channel).id)
+
+    def test_successful_deliveries_are_logged(self):
+        """Test that every delivered recipient is written to the delivery log."""
+        execute_channel_send(self.subscription_ids, NotificationSubscription.__name__,
+                             subject='Subject', email_message='<p>Body</p>', short_message='Body')
+
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(NotificationDelivery.objects.filter(
+            status='sent', method='email').count(), 2)
+
+    @patch('notification.tasks.deliver_notification.apply_async')
+    def test_failed_recipient_is_retried(self, mock_retry):
+        """Test that only failed recipients are handed to the retry task."""
+        original = EmailNotificationChannel.send_one
+
+        def send_one(channel, recipient, **kwargs):
+            if recipient == 'bob@example.com':
+                raise NotificationDeliveryError('Temporary failure', 451)
+            return original(channel, recipient, **kwargs)
+
+        with patch.object(EmailNotificationChannel, 'send_one', send_one):
+            execute_channel_send(self.subscription_ids, NotificationSubscription.__name__,
+                                 subject='Subject', email_message='<p>Body</p>')
+
+        mock_retry.assert_called_once_with(
+            ('email', 'bob@example.com'), {'subject': 'Subject', 'message': '<p>Body</p>'}, countdown=None)
+        failed = NotificationDelivery.objects.get(status='failed')
+        self.assertEqual(failed.recipient, 'bob@example.com')
+        self.assertEqual(failed.response_code, '451')
+
+    @override_settings(NOTIFICATION_RATE_LIMITS={'email': {'rate': 1, 'capacity': 1}})
+    @patch('notification.tasks.deliver_notification.apply_async')
+    def test_throttled_recipient_is_deferred(self, mock_defer):
+        """Test that a throttled recipient is deferred with jitter and not logged as failed."""
+        reset_rate_limiters()
+        self.addCleanup(reset_rate_limiters)
+
+        with patch('notification.tasks.random.uniform', return_value=7):
+            execute_channel_send(self.subscription_ids, NotificationSubscription.__name__,
+                                 subject='Subject', email_message='<p>Body</p>')
+
+        args, kwargs = mock_defer.call_args
+        self.assertEqual(args[0], ('email', 'bob@example.com'))
+        self.assertEqual(args[1]['deferrals'], 1)
+        self.assertGreater(kwargs['countdown'], 7)
+        self.assertEqual(NotificationDelivery.objects.get().status, 'sent')
+
+
+class NotifyUserTaskTest(TestCase):
+    """Test cases for notify_user task."""
+
+    def test_user_is_emailed_and_logged(self):
+        """Test that the user gets the email without a channel subscription."""
+        user = User.objects.create_user(
+            username='alice', email='alice@example.com', password='testpass123')
+
+        notify_user(user.id, subject='Export ready', email_message='<p>Link</p>')
+
+        self.assertEqual(mail.outbox[0].to, ['alice@example.com'])
+        self.assertTrue(NotificationDelivery.objects.filter(
+            recipient='alice@example.com', status='sent').exists())
+
+    def test_user_without_email(self):
+        """Test that nothing is sent to a user without an email address."""
+        user = User.objects.create_user(username='bob', password='testpass123')
+
+        self.assertEqual(notify_user(user.id), 'User has no email address.')
+        self.assertEqual(len(mail.outbox), 0)
+
+
+class DeliverNotificationTaskTest(TestCase):
+    """Test cases for deliver_notification retry task."""
+
+    def test_delivery_succeeds(self):
+        """Test that a successful retry is logged as sent."""
+        deliver_notification.apply(
+            args=('email', 'a@example.com'), kwargs={'subject': 'S', 'message': 'M'}, retries=1)
+
+        log = NotificationDelivery.objects.get()
+        self.assertEqual(log.status, 'sent')
+        self.assertEqual(log.attempts, 3)
+
+    @patch.object(EmailNotificationChannel, 'send_one', side_effect=NotificationDeliveryError('Down'))
+    def test_failure_is_retried_until_exhausted(self, mock_send):
+        """Test that failed attempts are retried and each one is logged."""
+        # Eager tasks run their retries inline without the backoff delay
+        deliver_notification.apply(
+            args=('email', 'a@example.com'), kwargs={'subject': 'S', 'message': 'M'})
+
+        max_retries = deliver_notification.max_retries
+        self.assertEqual(mock_send.call_count, max_retries + 1)
+        self.assertEqual(NotificationDelivery.objects.filter(
+            status='failed').count(), max_retries)
+        self.assertEqual(DeadLetterNotification.objects.get().attempts, max_retries + 2)
+
+    @override_settings(NOTIFICATION_RATE_LIMITS={'email': {'rate': 0.5, 'capacity': 1}})
+    @patch('notification.tasks.deliver_notification.apply_async')
+    def test_throttled_delivery_is_deferred_after_refill(self, mock_defer):
+        """Test that a throttled delivery is re-queued without using up a retry."""
+        reset_rate_limiters()
+        self.addCleanup(reset_rate_limiters)
+        EmailNotificationChannel().send(['a@example.com'], subject='S', message='M')
+
+        deliver_notification.apply(
+            args=('email', 'b@example.com'), kwargs={'subject': 'S', 'message': 'M'}, retries=2)
+
+        args, kwargs = mock_defer.call_args
+        self.assertEqual(args, (('email', 'b@example.com'),
+                                {'subject': 'S', 'message': 'M', 'deferrals': 1}))
+        self.assertEqual(kwargs['retries'], 2)
+        self.assertGreater(kwargs['countdown'], 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertFalse(NotificationDelivery.objects.filter(status='failed').exists())
+
+    @override_settings(NOTIFICATION_RATE_LIMITS={'email': {'rate': 0.5, 'capacity': 1}},
+                       NOTIFICATION_MAX_DEFERRALS=3)
+    @patch('notification.tasks.deliver_notification.apply_async')
+    def test_exhausted_deferrals_move_to_dead_letters(self, mock_defer):
+        """Test that a message throttled NOTIFICATION_MAX_DEFERRALS times is dead-lettered."""
+        reset_rate_limiters()
+        self.addCleanup(reset_rate_limiters)
+        EmailNotificationChannel().send(['a@example.com'], subject='S', message='M')
+
+        deliver_notification.apply(
+            args=('email', 'b@example.com'), kwargs={'subject': 'S', 'message': 'M', 'deferrals': 3})
+
+        mock_defer.assert_not_called()
+        self.assertEqual(DeadLetterNotification.objects.get().recipient, 'b@example.com')
+
+    @patch.object(EmailNotificationChannel, 'send_one', side_effect=NotificationDeliveryError('Down'))
+    def test_exhausted_retries_move_to_dead_letters(self, mock_send):
+        """Test that the message is dead-lettered after the last retry."""
+        deliver_notification.apply(
+            args=('email', 'a@example.com'), kwargs={'subject': 'S', 'message': 'M'},
+            retries=deliver_notification.max_retries)
+
+        dead_letter = DeadLetterNotification.objects.get()
+        self.assertEqual(dead_letter.recipient, 'a@example.com')
+        self.assertEqual(dead_letter.message, 'M')
+        self.assertEqual(dead_letter.error, 'Down')
+        self.assertEqual(NotificationDelivery.objects.get().status, 'dead')
+
+
+class DeadLetterReplayTest(TestCase):
+    """Test cases for the dead-letter replay admin action."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='testpass123')
+        self.dead_letter = DeadLetterNotification.objects.create(
+            recipient='a@example.com', method='email', subject='S', message='M', attempts=6)
+
+    @patch('notification.tasks.deliver_notification.delay')
+    def test_replay_requeues_and_marks_replayed(self, mock_deliver):
+        """Test that replaying re-enqueues the message."""
+        self.client.force_login(self.admin)
+        self.client.post('/admin/notification/deadletternotification/', {
+            'action': 'replay',
+            '_selected_action': [self.dead_letter.pk],
+        })
+
+        mock_deliver.assert_called_once_with(
+            'email', 'a@example.com', subject='S', message='M')
+        self.dead_letter.refresh_from_db()
+        self.assertIsNotNone(self.dead_letter.replayed_at)
+
+
+class TokenBucketTest(TestCase):
+    """Test cases for the in-memory token bucket."""
+
+    def test_burst_up_to_capacity(self):
+        """Test that the bucket allows a burst of `capacity` tokens without waiting."""
+        bucket = TokenBucket('test', rate=1, capacity=3)
+        started = time.monotonic()
+        for _ in range(3):
+            bucket.acquire()
+
+        self.assertLess(time.monotonic() - started, 0.1)
+
+    def test_empty_bucket_defers_without_blocking(self):
+        """Test that an empty bucket raises at once with the seconds until the next token."""
+        bucket = TokenBucket('test', rate=2, capacity=1)
+        bucket.acquire()
+
+        started = time.monotonic()
+        with self.assertRaises(RateLimitExceeded) as context:
+            bucket.acquire()
+        self.assertLess(time.monotonic() - started, 0.1)
+        self.assertEqual(context.exception.response_code, '429')
+        self.assertGreater(context.exception.retry_after, 0)
+        self.assertLessEqual(context.exception.retry_after, 0.5)
+
+    def test_empty_bucket_refills(self):
+        """Test that a token can be taken again once retry_after has passed."""
+        bucket = TokenBucket('test', rate=20, capacity=1)
+        bucket.acquire()
+        with self.assertRaises(RateLimitExceeded) as context:
+            bucket.acquire()
+
+        time.sleep(context.exception.retry_after)
+        bucket.acquire()
+
+    def test_daily_limit(self):
+        """Test that the daily quota is enforced."""
+        bucket = TokenBucket('test', rate=100, capacity=100, daily_limit=2)
+        bucket.acquire()
+        bucket.acquire()
+
+        with self.assertRaisesMessage(RateLimitExceeded, 'Daily limit') as context:
+            bucket.acquire()
+        # Deferred until the quota is renewed at midnight
+        self.assertGreater(context.exception.retry_after, 0)
+        self.assertLessEqual(context.exception.retry_after, 24 * 3600)
+
+    @override_settings(NOTIFICATION_RATE_LIMITS={'email': {'rate': 1, 'capacity': 1}})
+    def test_channel_reports_throttled_recipient_as_failed(self):
+        """Test that a throttled recipient is returned as a failed, retryable result."""
+        reset_rate_limiters()
+        self.addCleanup(reset_rate_limiters)
+
+        results = EmailNotificationChannel().send(
+            ['a@example.com', 'b@example.com'], subject='Hello', message='Hi')
+
+        self.assertTrue(results[0].success)
+        self.assertFalse(results[1].success)
+        self.assertEqual(results[1].response_code, '429')
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertGreater(results[1].retry_after, 0)
+
+    @override_settings(NOTIFICATION_RATE_LIMITS={'email': {'rate': 0, 'capacity': 1}})
+    def test_zero_rate_is_unlimited(self):
+        """Test that a rate of 0 disables the limiter instead of dividing by it."""
+        reset_rate_limiters()
+        self.addCleanup(reset_rate_limiters)
+
+        results = EmailNotificationChannel().send(
+            ['a@example.com', 'b@example.com', 'c@example.com'], subject='Hello', message='Hi')
+
+        self.assertTrue(all(result.success for result in results))
+        self.assertEqual(len(mail.outbox), 3)
+
+
+class FakeProviderHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.hits.append(time.monotonic())
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _send_whatsapp_batch(count):
+    channel = WhatsAppNotificationChannel()
+    for i in range(count):
+        # Sleeping for retry_after stands in for the retry task's countdown
+        while not (result := channel.send([f'4100000{i:04d}'], message='Load test')[0]).success:
+            time.sleep(result.retry_after)
+
+
+LOAD_TEST_RATE = 10
+LOAD_TEST_BURST = 5
+
+
+@override_settings(
+    NOTIFICATION_RATE_LIMITS={'whatsapp': {
+        'rate': LOAD_TEST_RATE, 'capacity': LOAD_TEST_BURST}},
+)
+class RateLimiterLoadTest(TestCase):
+    """Load test of concurrent WhatsApp workers against a local fake provider."""
+
+    def setUp(self):
+        """Start the fake provider and point the WhatsApp channel at it."""
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeProviderHandler)
+        self.server.hits = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        environ = patch.dict(os.environ, {
+            'WHATSAPP_API_URL': f'http://127.0.0.1:{self.server.server_port}'})
+        environ.start()
+        self.addCleanup(environ.stop)
+        self.addCleanup(reset_rate_limiters)
+
+    def assertRateRespected(self, expected_hits):
+        hits = sorted(self.server.hits)
+        self.assertEqual(len(hits), expected_hits)
+        # No one-second window may see more than the burst plus one second of refill
+        for i, start in enumerate(hits):
+            in_window = sum(1 for hit in hits[i:] if hit - start < 1)
+            self.assertLessEqual(in_window, LOAD_TEST_BURST + LOAD_TEST_RATE)
+
+    def test_threaded_workers_share_local_bucket(self):
+        """Test that worker threads in one process share the in-memory bucket."""
+        with override_settings(NOTIFICATION_RATE_LIMIT_REDIS_URL=None):
+            reset_rate_limiters()
+            workers = [threading.Thread(target=_send_whatsapp_batch, args=(6,))
+                       for _ in range(4)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+
+        self.assertRateRespected(24)
+
+    def test_worker_processes_share_redis_bucket(self):
+        """Test that separate worker processes are throttled by one Redis bucket."""
+        import redis
+
+        redis_url = os.environ.get(
+            'NOTIFICATION_LOAD_TEST_REDIS_URL', 'redis://127.0.0.1:6379/15')
+        try:
+            redis.Redis.from_url(redis_url).ping()
+        except redis.RedisError:
+            raise unittest.SkipTest(f'Redis is not reachable at {redis_url}')
+
+        redis.Redis.from_url(redis_url).delete('notification:ratelimit:whatsapp')
+        with override_settings(NOTIFICATION_RATE_LIMIT_REDIS_URL=redis_url):
+            reset_rate_limiters()
+            context = multiprocessing.get_context('fork')
+            workers = [context.Process(target=_send_whatsapp_batch, args=(6,))
+                       for _ in range(4)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+
+        self.assertRateRespected(24)
+
+
+class CircuitBreakerTest(TestCase):
+    """Test cases for CircuitBreaker."""
+
+    def setUp(self):
+        """Start every test with a closed circuit."""
+        cache.clear()
+        self.breaker = CircuitBreaker(
+            'test', failure_threshold=3, recovery_timeout=60)
+
+    def test_opens_after_consecutive_failures(self):
+        """Test that the circuit opens once the failure threshold is reached."""
+        for _ in range(2):
+            self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+    def test_success_resets_failure_count(self):
+        """Test that only consecutive failures count towards opening."""
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_half_open_allows_single_probe(self):
+        """Test that only one call may probe a half-open circuit."""
+        for _ in range(3):
+            self.breaker.record_failure()
+
+        with patch('notification.helpers.circuit_breaker.time.time', return_value=time.time() + 61):
+            self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+            self.breaker.before_call()
+            with self.assertRaises(CircuitOpenError):
+                self.breaker.before_call()
+
+            self.breaker.record_success()
+            self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_failed_probe_reopens(self):
+        """Test that a failed probe opens the circuit again."""
+        for _ in range(3):
+            self.breaker.record_failure()
+
+        with patch('notification.helpers.circuit_breaker.time.time', return_value=time.time() + 61):
+            self.breaker.before_call()
+            self.breaker.record_failure()
+            self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+
+    @override_settings(CELERY_BROKER_URL='redis://redis:6379/0')
+    def test_process_local_cache_is_reported(self):
+        """Test that a cache private to each worker process fails the system checks."""
+        with override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            self.assertEqual([warning.id for warning in check_circuit_breaker_cache(None)],
+                             ['notification.W001'])
+
+        with override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                'LOCATION': 'redis://redis:6379/2'}}):
+            self.assertEqual(check_circuit_breaker_cache(None), [])
+
+
+@override_settings(NOTIFICATION_CIRCUIT_FAILURE_THRESHOLD=2)
+class ChannelCircuitBreakerTest(TestCase):
+    """Test cases for circuit breaking around provider calls."""
+
+    def setUp(self):
+        """Start every test with a closed circuit."""
+        cache.clear()
+
+    @patch('notification.helpers.whatsapp_helper.requests.post',
+           side_effect=requests.ConnectionError('Connection refused'))
+    def test_open_circuit_fails_fast(self, mock_post):
+        """Test that recipients after the circuit opened are not sent to the provider."""
+        results = WhatsAppNotificationChannel().send(
+            ['41000001', '41000002', '41000003', '41000004'], message='Hi')
+
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertFalse(any(result.success for result in results))
+        self.assertEqual(results[3].response_code, '503')
+        self.assertGreater(results[3].retry_after, 0)
+
+    @patch('notification.helpers.whatsapp_helper.requests.post')
+    def test_rejected_recipient_does_not_open_circuit(self, mock_post):
+        """Test that a client error for one recipient is not a provider failure."""
+        mock_post.return_value.status_code = 400
+        WhatsAppNotificationChannel().send(
+            ['41000001', '41000002', '41000003'], message='Hi')
+
+        self.assertEqual(mock_post.call_count, 3)
+        self.assertEqual(CircuitBreaker('whatsapp').state, CircuitBreaker.CLOSED)
+
+    def _half_open(self):
+        for _ in range(2):
+            CircuitBreaker('whatsapp').record_failure()
+        later = patch('notification.helpers.circuit_breaker.time.time',
+                      return_value=time.time() + 61)
+        later.start()
+        self.addCleanup(later.stop)
+
+    @patch('notification.helpers.whatsapp_helper.requests.post')
+    def test_rejected_probe_releases_slot(self, mock_post):
+        """Test that a probe ending in a non-provider error lets the next call probe."""
+        self._half_open()
+        mock_post.return_value.status_code = 400
+
+        WhatsAppNotificationChannel().send(['41000001', '41000002'], message='Hi')
+
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertEqual(CircuitBreaker('whatsapp').state, CircuitBreaker.HALF_OPEN)
+
+    @override_settings(NOTIFICATION_RATE_LIMITS={'whatsapp': {'rate': 1, 'capacity': 1}})
+    @patch('notification.helpers.whatsapp_helper.requests.post')
+    def test_throttled_call_does_not_take_probe(self, mock_post):
+        """Test that a throttled call is deferred before it can claim the half-open probe."""
+        reset_rate_limiters()
+        self.addCleanup(reset_rate_limiters)
+        self._half_open()
+        get_rate_limiter('whatsapp').acquire()
+
+        result = WhatsAppNotificationChannel().send(['41000001'], message='Hi')[0]
+
+        self.assertTrue(result.throttled)
+        self.assertTrue(CircuitBreaker('whatsapp').before_call())
+
+    @patch('notification.tasks.deliver_notification.apply_async')
+    def test_open_circuit_defers_retry(self, mock_retry):
+        """Test that messages are deferred to the retry path while the circuit is open."""
+        channel = NotificationChannel.objects.create(name='test_channel', description='Test')
+        user = User.objects.create_user(
+            username='alice', email='alice@example.com', password='testpass123')
+        subscription = NotificationSubscription.objects.create(user=user, channel=channel)
+        for _ in range(2):
+            CircuitBreaker('email').record_failure()
+
+        execute_channel_send([subscription.id], NotificationSubscription.__name__,
+                             subject='Subject', email_message='<p>Body</p>')
+
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertGreater(mock_retry.call_args.kwargs['countdown'], 0)
+
+    def test_metrics_expose_circuit_state(self):
+        """Test that the metrics endpoint reports the state of each circuit."""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='testpass123')
+        for _ in range(2):
+            CircuitBreaker('sms').record_failure()
+
+        self.client.force_login(admin)
+        response = self.client.get(reverse('notification:delivery_metrics'))
+
+        circuits = {circuit['channel']: circuit['state']
+                    for circuit in response.json()['circuits']}
+        self.assertEqual(circuits['sms'], CircuitBreaker.OPEN)
+        self.assertEqual(circuits['email'], CircuitBreaker.CLOSED)
+
+
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True)
+class DigestNotificationTest(TestCase):
+    """Test cases for hourly and daily notification digests."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(
+            username='digest', email='digest@example.com', password='testpass123')
+        self.immediate_user = User.objects.create_user(
+            username='immediate', email='immediate@example.com', password='testpass123')
+        self.opportunities = [
+            Opportunity.objects.create(
+                ref_no=f'OPP-DIGEST-{i}', title=f'Digest {i}', opp_type='RFP',
+                created_by=self.user, status=1)
+            for i in range(3)
+        ]
+        self.subscriptions = {
+            opportunity.id: OpportunitySubscription.objects.create(
+                user=self.user, opportunity=opportunity, digest_mode='daily')
+            for opportunity in self.opportunities
+        }
+        mail.outbox = []
+
+    def _notify(self, opportunity, subscription_ids):
+        execute_channel_send(subscription_ids, OpportunitySubscription.__name__,
+                             subject=f'Update: {opportunity.title}', email_message='<p>Body</p>',
+                             short_message='Body', opportunity_id=str(opportunity.id))
+
+    def test_digest_subscribers_are_queued(self):
+        """Test that digest subscribers are queued while immediate ones are sent."""
+        opportunity = self.opportunities[0]
+        immediate = OpportunitySubscription.objects.create(
+            user=self.immediate_user, opportunity=opportunity)
+
+        self._notify(opportunity, [self.subscriptions[opportunity.id].id, immediate.id])
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['immediate@example.com'])
+        self.assertEqual(PendingNotification.objects.get().opportunity, opportunity)
+
+    def test_repeated_updates_are_queued_once(self):
+        """Test that several updates of one opportunity yield one digest entry."""
+        opportunity = self.opportunities[0]
+        for _ in range(3):
+            self._notify(opportunity, [self.subscriptions[opportunity.id].id])
+
+        self.assertEqual(PendingNotification.objects.count(), 1)
+
+    def test_one_digest_per_user(self):
+        """Test that all pending updates are combined into one message."""
+        for opportunity in self.opportunities:
+            self._notify(opportunity, [self.subscriptions[opportunity.id].id])
+
+        send_notification_digests('daily')
+
+        self.assertEqual(len(mail.outbox), 1)
+        html = mail.outbox[0].alternatives[0][0]
+        for opportunity in self.opportunities:
+            self.assertIn(opportunity.title, html)
+        self.assertFalse(PendingNotification.objects.exists())
+        self.assertEqual(NotificationDelivery.objects.get().status, 'sent')
+
+    def test_failed_send_keeps_pending_items(self):
+        """Test that a digest run that crashes while sending leaves its items for the next run."""
+        for opportunity in self.opportunities:
+            self._notify(opportunity, [self.subscriptions[opportunity.id].id])
+
+        with patch('notification.tasks._dispatch', side_effect=ConnectionError('SMTP down')):
+            with self.assertRaises(ConnectionError):
+                send_digest_batch('daily', [self.user.id])
+
+        self.assertEqual(PendingNotification.objects.count(), 3)
+        send_digest_batch('daily', [self.user.id])
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertFalse(PendingNotification.objects.exists())
+
+    def test_other_digest_mode_is_left_pending(self):
+        """Test that the hourly run does not send daily digests."""
+        opportunity = self.opportunities[0]
+        self._notify(opportunity, [self.subscriptions[opportunity.id].id])
+
+        send_notification_digests('hourly')
+
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(PendingNotification.objects.count(), 1)
+
+    def test_inactive_subscription_is_dropped(self):
+        """Test that unsubscribing before the digest run drops the update."""
+        opportunity = self.opportunities[0]
+        subscription = self.subscriptions[opportunity.id]
+        self._notify(opportunity, [subscription.id])
+        subscription.is_active = False
+        subscription.save()
+
+        send_notification_digests('daily')
+
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertFalse(PendingNotification.objects.exists())
+
+
+class ToggleSubscriptionViewTest(TestCase):
+    """Test cases for subscribing to an opportunity from its pages."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(
+            username='subscriber', email='subscriber@example.com', password='testpass123')
+        self.client.force_login(self.user)
+        self.opportunity = Opportunity.objects.create(
+            ref_no='OPP-SUB-1', title='Subscribe', opp_type='RFP',
+            created_by=self.user, status=1)
+        self.toggle_url = reverse('notification:toggle_subscription',
+                                  kwargs={'opportunity_id': self.opportunity.id})
+
+    def test_digest_mode_round_trip(self):
+        """Test that the digest mode posted by the update page is stored and shown again."""
+        page = self.client.get(reverse('update_opportunity', args=[self.opportunity.id]))
+        self.assertContains(page, 'name="digest_mode"')
+        self.assertContains(page, f'hx-post="{self.toggle_url}"', count=2)
+
+        response = self.client.post(self.toggle_url, {'is_subscribed': 'on', 'digest_mode': 'daily'})
+
+        self.assertEqual(response.json()['digest_mode'], 'daily')
+        subscription = OpportunitySubscription.objects.get(user=self.user)
+        self.assertTrue(subscription.is_active)
+        self.assertEqual(subscription.digest_mode, 'daily')
+
+        page = self.client.get(reverse('update_opportunity', args=[self.opportunity.id]))
+        self.assertContains(page, '<option value="daily" selected>')
+        modal = self.client.get(reverse('notification:get_opportunity_subscribers',
+                                        args=[self.opportunity.id]))
+        self.assertContains(modal, '<option value="daily" selected>')
+
+    def test_unknown_digest_mode_is_ignored(self):
+        """Test that an unknown digest mode keeps the stored one."""
+        self.client.post(self.toggle_url, {'is_subscribed': 'on', 'digest_mode': 'weekly'})
+
+        self.assertEqual(OpportunitySubscription.objects.get(user=self.user).digest_mode, 'immediate')
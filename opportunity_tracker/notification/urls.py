@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import ToggleSubscriptionView, get_subscribers
+from .views import ToggleSubscriptionView, delivery_metrics, get_subscribers
 
 app_name = 'notification'
 
@@ -8,4 +8,5 @@ urlpatterns = [
          ToggleSubscriptionView.as_view(), name='toggle_subscription'),
     path('opportunity/<uuid:opp_id>/subscribers',
          get_subscribers, name='get_opportunity_subscribers'),
+    path('metrics', delivery_metrics, name='delivery_metrics'),
 ]
@@ -1,10 +1,15 @@
 import json
+from datetime import timedelta
 
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db.models import Avg, Count
 from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404
 from django.views import View
 from django.template.loader import render_to_string
-from notification.models import OpportunitySubscription
+from django.utils import timezone
+from notification.helpers.circuit_breaker import CircuitBreaker
+from notification.models import NOTIFICATION_METHODS, NotificationDelivery, OpportunitySubscription
 from tracker.models import Opportunity
 
 
@@ -25,10 +30,14 @@ class ToggleSubscriptionView(View):
 
             # Toggle subscription based on the checkbox
             subscription.is_active = is_subscribed
+            digest_mode = request.POST.get("digest_mode")
+            if digest_mode in dict(OpportunitySubscription.DIGEST_MODES):
+                subscription.digest_mode = digest_mode
             subscription.save()
 
             # Redirect back to the opportunity update page
-            return JsonResponse({'success': True, 'is_subscribed': subscription.is_active})
+            return JsonResponse({'success': True, 'is_subscribed': subscription.is_active,
+                                 'digest_mode': subscription.digest_mode})
         except json.JSONDecodeError:
             print(request.body)
             return JsonResponse({'success': False, 'message': 'Invalid JSON Data'}, status=400)
@@ -40,6 +49,25 @@ def get_subscribers(request, opp_id):
     opportunity = get_object_or_404(Opportunity, id=opp_id)
     subscribers = OpportunitySubscription.objects.filter(
         opportunity=opportunity, is_active=True).select_related("user")
+    # The signed-in subscriber can change how often they are notified from the modal
+    subscription = next(
+        (subscriber for subscriber in subscribers if subscriber.user_id == request.user.pk), None)
     html = render_to_string(
-        "notification/subscribers_modal.html", {"subscribers": subscribers})
-    return HttpResponse(html, {"subscribers": subscribers})
+        "notification/subscribers_modal.html",
+        {"opportunity": opportunity, "subscribers": subscribers, "subscription": subscription,
+         "digest_modes": OpportunitySubscription.DIGEST_MODES},
+        request=request)
+    return HttpResponse(html)
+
+
+@staff_member_required
+def delivery_metrics(request):
+    """Circuit breaker state and last hour's delivery counts for each channel."""
+    since = timezone.now() - timedelta(hours=1)
+    deliveries = NotificationDelivery.objects.filter(created_at__gte=since).values(
+        "method", "status").annotate(count=Count("id"), avg_latency_ms=Avg("latency_ms"))
+
+    return JsonResponse({
+        "circuits": [CircuitBreaker(method).snapshot() for method, _ in NOTIFICATION_METHODS],
+        "deliveries_last_hour": list(deliveries),
+    })
@@ -38,6 +38,66 @@ CSRF_TRUSTED_ORIGINS = os.environ.get(
 STATIC_URL = '/static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Attachment storage: "filesystem" keeps the blobs under MEDIA_ROOT, "s3" puts them
+# in an S3-compatible bucket (AWS, MinIO) shared by every web replica and worker
+ATTACHMENT_STORAGE_BACKEND = os.environ.get("ATTACHMENT_STORAGE_BACKEND", "filesystem")
+ATTACHMENT_STORAGES = {
+    "filesystem": {"BACKEND": "tracker.helpers.storage.ContentAddressedStorage"},
+    "s3": {"BACKEND": "tracker.helpers.s3_storage.ContentAddressedS3Storage"},
+}
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    "attachments": ATTACHMENT_STORAGES[ATTACHMENT_STORAGE_BACKEND],
+}
+AWS_STORAGE_BUCKET_NAME = os.environ.get("AWS_STORAGE_BUCKET_NAME")
+# Set for MinIO or other S3-compatible services, leave empty for AWS
+AWS_S3_ENDPOINT_URL = os.environ.get("AWS_S3_ENDPOINT_URL") or None
+AWS_S3_REGION_NAME = os.environ.get("AWS_S3_REGION_NAME") or None
+AWS_ACCESS_KEY_ID = os.environ.get("AWS_ACCESS_KEY_ID")
+AWS_SECRET_ACCESS_KEY = os.environ.get("AWS_SECRET_ACCESS_KEY")
+AWS_S3_ADDRESSING_STYLE = os.environ.get("AWS_S3_ADDRESSING_STYLE") or None
+# Lifetime of presigned download URLs, in seconds
+AWS_QUERYSTRING_EXPIRE = int(os.environ.get("AWS_QUERYSTRING_EXPIRE", 300))
+ATTACHMENT_S3_MULTIPART_THRESHOLD = int(
+    os.environ.get("ATTACHMENT_S3_MULTIPART_THRESHOLD", 16 * 1024 ** 2))
+ATTACHMENT_S3_MULTIPART_CHUNKSIZE = int(
+    os.environ.get("ATTACHMENT_S3_MULTIPART_CHUNKSIZE", 8 * 1024 ** 2))
+
+# Attachments are authorised by Django and transferred by the web server:
+# "nginx" (X-Accel-Redirect), "apache" (X-Sendfile) or empty to serve them from Django
+MEDIA_SENDFILE_BACKEND = os.environ.get("MEDIA_SENDFILE_BACKEND", "")
+# Internal nginx location aliased to MEDIA_ROOT
+MEDIA_ACCEL_REDIRECT_PREFIX = os.environ.get(
+    "MEDIA_ACCEL_REDIRECT_PREFIX", "/protected-media/")
+
+# Attachment thumbnails, named after the content hash and served as static files
+PREVIEW_ROOT = os.environ.get(
+    "PREVIEW_ROOT", os.path.join(BASE_DIR, 'cache', 'previews'))
+PREVIEW_URL = '/previews/'
+
+# Chunked upload sessions are assembled here until attached to an opportunity
+FILE_UPLOAD_SESSION_DIR = os.environ.get(
+    "FILE_UPLOAD_SESSION_DIR", os.path.join(BASE_DIR, 'cache', 'uploads'))
+FILE_UPLOAD_MAX_SIZE = int(
+    os.environ.get("FILE_UPLOAD_MAX_SIZE", 1024 ** 3))
+# Unattached upload sessions are removed after this many hours
+FILE_UPLOAD_EXPIRY_HOURS = int(os.environ.get("FILE_UPLOAD_EXPIRY_HOURS", 24))
+
+# Zipped attachment folders are cached here and trimmed to the size cap (bytes)
+ATTACHMENT_ARCHIVE_CACHE_DIR = os.environ.get(
+    "ATTACHMENT_ARCHIVE_CACHE_DIR", os.path.join(BASE_DIR, 'cache', 'archives'))
+ATTACHMENT_ARCHIVE_CACHE_MAX_SIZE = int(
+    os.environ.get("ATTACHMENT_ARCHIVE_CACHE_MAX_SIZE", 2 * 1024 ** 3))
+# Garbage collection of attachments no OpportunityFile refers to. Orphans are
+# moved to the quarantine directory when one is set, deleted otherwise.
+ATTACHMENT_GC_BATCH_SIZE = int(os.environ.get("ATTACHMENT_GC_BATCH_SIZE", 1000))
+ATTACHMENT_ORPHAN_GRACE_HOURS = int(os.environ.get("ATTACHMENT_ORPHAN_GRACE_HOURS", 24))
+ATTACHMENT_ORPHAN_QUARANTINE_DIR = os.environ.get("ATTACHMENT_ORPHAN_QUARANTINE_DIR", "")
+# Extracted attachment text is truncated to this many characters before indexing
+ATTACHMENT_TEXT_MAX_LENGTH = int(
+    os.environ.get("ATTACHMENT_TEXT_MAX_LENGTH", 1_000_000))
 # LOGIN_URL = '/login/'
 
 
@@ -91,7 +151,6 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -99,6 +158,14 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Compiled templates are kept per process; runserver's autoreloader
+            # still clears them when a template changes
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
@@ -177,11 +244,99 @@ LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'accounts:login'
 
 
+# Cache settings
+# A shared Redis cache is needed for state that must be visible to every web
+# and worker process (e.g. notification circuit breakers, the reference data
+# version that tells every process to reload its cached choices). Running
+# Celery without it is reported by the notification.W001 system check.
+if os.environ.get("CACHE_URL"):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get("CACHE_URL"),
+        }
+    }
+
+# Rendered opportunity cards and details are cached for this many seconds. They
+# are keyed on the opportunity's updated_at, the reference data version and
+# the names of the users they show, so the timeout only bounds the cache size.
+OPPORTUNITY_FRAGMENT_CACHE_TIMEOUT = int(
+    os.environ.get("OPPORTUNITY_FRAGMENT_CACHE_TIMEOUT", 24 * 3600))
+
+# Seconds a shared cache (reverse proxy or CDN) may serve the public opportunity
+# page before revalidating it; browsers always revalidate, answered with a 304
+OPPORTUNITY_PUBLIC_CACHE_TIMEOUT = int(
+    os.environ.get("OPPORTUNITY_PUBLIC_CACHE_TIMEOUT", 300))
+
+
 # Celery settings
 CELERY_BROKER_URL = os.environ.get("CELERY_BROKER_URL")
 CELERY_RESULT_BACKEND = os.environ.get("CELERY_BROKER_URL")
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
+# Previews and text extraction run on their own queue and worker (see docker-compose.yml)
+CELERY_TASK_ROUTES = {
+    'tracker.tasks.generate_file_preview': {'queue': 'previews'},
+    'tracker.tasks.extract_attachment_text': {'queue': 'previews'},
+}
+
+# Rows per chunk when admin import jobs are validated in parallel across workers
+IMPORT_JOB_CHUNK_SIZE = int(os.environ.get("IMPORT_JOB_CHUNK_SIZE", 2000))
+# Background admin exports: rows read per query, and hours the file is kept
+EXPORT_JOB_CHUNK_SIZE = int(os.environ.get("EXPORT_JOB_CHUNK_SIZE", 2000))
+EXPORT_JOB_EXPIRY_HOURS = int(os.environ.get("EXPORT_JOB_EXPIRY_HOURS", 48))
+
+
+# Notification delivery settings
+# Failed recipients are retried with exponential backoff (in seconds) and
+# jitter, then moved to the dead-letter table.
+NOTIFICATION_MAX_RETRIES = int(os.environ.get("NOTIFICATION_MAX_RETRIES", 5))
+NOTIFICATION_RETRY_BACKOFF = int(
+    os.environ.get("NOTIFICATION_RETRY_BACKOFF", 30))
+NOTIFICATION_RETRY_BACKOFF_MAX = int(
+    os.environ.get("NOTIFICATION_RETRY_BACKOFF_MAX", 3600))
+
+# Number of users whose digests are rendered and sent by one task
+NOTIFICATION_DIGEST_BATCH_SIZE = int(
+    os.environ.get("NOTIFICATION_DIGEST_BATCH_SIZE", 100))
+
+# Notification channels served by the scheduled weekly summary (comma separated)
+WEEKLY_SUMMARY_CHANNELS = [
+    name.strip() for name in os.environ.get("WEEKLY_SUMMARY_CHANNELS", "").split(",") if name.strip()]
+
+# Outbound provider limits shared by all workers through a Redis token bucket
+# (rate in messages per second, 0 for unlimited; capacity is the allowed
+# burst). Without a Redis URL each process falls back to its own in-memory
+# bucket. Throttled messages are re-queued once their tokens have refilled,
+# without using up their retries, at most NOTIFICATION_MAX_DEFERRALS times.
+NOTIFICATION_RATE_LIMIT_REDIS_URL = os.environ.get(
+    "NOTIFICATION_RATE_LIMIT_REDIS_URL", CELERY_BROKER_URL)
+NOTIFICATION_MAX_DEFERRALS = int(
+    os.environ.get("NOTIFICATION_MAX_DEFERRALS", 50))
+
+# Consecutive provider failures before a channel's circuit opens, and the
+# seconds it stays open before a half-open probe is allowed
+NOTIFICATION_CIRCUIT_FAILURE_THRESHOLD = int(
+    os.environ.get("NOTIFICATION_CIRCUIT_FAILURE_THRESHOLD", 5))
+NOTIFICATION_CIRCUIT_RECOVERY_TIMEOUT = int(
+    os.environ.get("NOTIFICATION_CIRCUIT_RECOVERY_TIMEOUT", 60))
+NOTIFICATION_RATE_LIMITS = {
+    "email": {
+        "rate": float(os.environ.get("EMAIL_RATE_LIMIT", 5)),
+        "capacity": int(os.environ.get("EMAIL_RATE_BURST", 10)),
+        "daily_limit": int(os.environ.get("EMAIL_DAILY_LIMIT", 0)) or None,
+    },
+    "whatsapp": {
+        "rate": float(os.environ.get("WHATSAPP_RATE_LIMIT", 20)),
+        "capacity": int(os.environ.get("WHATSAPP_RATE_BURST", 20)),
+        "daily_limit": int(os.environ.get("WHATSAPP_DAILY_LIMIT", 1000)) or None,
+    },
+    "sms": {
+        "rate": float(os.environ.get("SMS_RATE_LIMIT", 1)),
+        "capacity": int(os.environ.get("SMS_RATE_BURST", 5)),
+        "daily_limit": int(os.environ.get("SMS_DAILY_LIMIT", 0)) or None,
+    },
+}
 
 
 # Email settings
@@ -192,6 +347,7 @@ EMAIL_USE_TLS = os.environ.get("EMAIL_USE_TLS")
 EMAIL_HOST_USER = os.environ.get("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.environ.get("EMAIL_HOST_PASSWORD")
 DEFAULT_FROM_EMAIL = os.environ.get("DEFAULT_FROM_EMAIL")
+EMAIL_TIMEOUT = int(os.environ.get("EMAIL_TIMEOUT", 10))
 
 
 UNFOLD = {
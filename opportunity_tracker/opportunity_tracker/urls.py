@@ -3,10 +3,12 @@ from django.urls import path, include, re_path
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
-from django.conf.urls.static import static
 from django.conf import settings
+from django.conf.urls.static import static
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
+from tracker.views import MediaFileView
+
 schema_view = get_schema_view(
     openapi.Info(
         title="Opportunity Tracker API",
@@ -36,4 +38,9 @@ urlpatterns = [
     path("dashboard/", include("dashboard.urls")),
     path("report/", include('reports.urls')),
 ]
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+urlpatterns += [
+    path(f"{settings.MEDIA_URL.lstrip('/')}<path:path>",
+         MediaFileView.as_view(), name="media"),
+]
+# Served by the web server in production
+urlpatterns += static(settings.PREVIEW_URL, document_root=settings.PREVIEW_ROOT)
@@ -1,6 +1,7 @@
 from django import forms
 
 from accounts.models import User
+from tracker.forms import ReferenceChoiceField
 from tracker.models import Client, FundingAgency, Unit, Institute, Currency
 
 
@@ -45,13 +46,13 @@ class OpportunityFilterForm(forms.Form):
         required=False, widget=forms.DateTimeInput(attrs={'type': 'datetime-local'}))
     created_by = forms.ModelChoiceField(
         queryset=User.objects.all(), empty_label="All", required=False)
-    client = forms.ModelChoiceField(
+    client = ReferenceChoiceField(
         queryset=Client.objects.all(), empty_label="All", required=False)
-    funding_agency = forms.ModelChoiceField(
+    funding_agency = ReferenceChoiceField(
         queryset=FundingAgency.objects.all(), empty_label="All", required=False)
-    lead_unit = forms.ModelChoiceField(
+    lead_unit = ReferenceChoiceField(
         queryset=Unit.objects.all(), empty_label="All", required=False)
-    lead_institute = forms.ModelChoiceField(
+    lead_institute = ReferenceChoiceField(
         Institute.objects.all(), empty_label="All", required=False)
     proposal_lead = forms.ModelChoiceField(
         User.objects.all(), empty_label="All", required=False)
@@ -64,7 +65,7 @@ class OpportunityFilterForm(forms.Form):
         required=False, widget=forms.DateInput(attrs={'type': 'date'}))
     result_date_to = forms.DateField(
         required=False, widget=forms.DateInput(attrs={'type': 'date'}))
-    currency = forms.ModelChoiceField(
+    currency = ReferenceChoiceField(
         Currency.objects.all(), empty_label="All", required=False)
     is_noncompetitive = forms.ChoiceField(
         choices=COMPETITION_TYPE, required=False
@@ -1,15 +1,63 @@
-from django.contrib import admin
-from import_export.admin import ImportExportModelAdmin
+from django import forms
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.http import Http404
+from django.db import transaction
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import path, reverse
+from django.utils.decorators import method_decorator
+from django.utils.html import format_html
+from django.views.decorators.http import require_POST
+from import_export.admin import ExportActionModelAdmin, ImportExportModelAdmin
 from notification.models import (NotificationChannel, NotificationSubscription,
                                  OpportunitySubscription)
 from unfold.admin import ModelAdmin
 from unfold.contrib.import_export.forms import (ExportForm, ImportForm,
                                                 SelectableFieldsExportForm)
+from unfold.widgets import UnfoldBooleanWidget
 
-from .models import (Client, Country, Currency, FundingAgency, Institute,
-                     Opportunity, Unit)
+from .helpers.exports import WRITERS
+from .helpers.file_response import send_field_file
+from .models import (Client, Country, Currency, ExportJob, FundingAgency, ImportJob,
+                     Institute, Opportunity, Unit)
 
-from .resources import ClientResource, FundingAgencyResource, InstituteResource, UnitResource
+from .resources import (ClientResource, FundingAgencyResource, InstituteResource,
+                        OpportunityResource, UnitResource)
+from .tasks import apply_import_job, run_export_job, validate_import_job
+
+
+class BackgroundExportForm(ExportForm):
+    background = forms.BooleanField(
+        required=False, widget=UnfoldBooleanWidget,
+        label='Export in the background and email me a link',
+        help_text='For large exports, in CSV or XLSX.')
+
+
+class BackgroundExportMixin:
+    """Lets changelist exports run in a Celery task (see run_export_job).
+
+    The job keeps the changelist query string, so the file holds what the
+    user filtered, searched and sorted. Exports of selected rows, and
+    formats without a streaming writer, are still done in the request.
+    """
+    export_form_class = BackgroundExportForm
+
+    def _do_file_export(self, file_format, request, queryset, export_form=None):
+        extension = file_format.get_extension()
+        if (not export_form or not export_form.cleaned_data.get('background')
+                or 'export_items' in export_form.changed_data or extension not in WRITERS):
+            return super()._do_file_export(file_format, request, queryset, export_form=export_form)
+
+        job = ExportJob.objects.create(
+            model=self.model._meta.label_lower, query=request.GET.urlencode(),
+            resource_index=int(export_form.cleaned_data.get('resource') or 0),
+            file_format=extension, created_by=request.user)
+        transaction.on_commit(lambda: run_export_job.delay(str(job.pk)))
+        messages.success(request, 'The export is running in the background. '
+                                  'You will get an email with the download link.')
+        changelist_url = reverse(
+            f'admin:{self.model._meta.app_label}_{self.model._meta.model_name}_changelist')
+        return redirect(f'{changelist_url}?{job.query}' if job.query else changelist_url)
 
 
 @admin.register(NotificationSubscription)
@@ -20,9 +68,9 @@ class NotificationSubscriptionAdmin(ModelAdmin):
 
 
 @admin.register(OpportunitySubscription)
-class OpportunitySubscriptionAdmin(ModelAdmin):
-    list_display = ('user', 'opportunity', 'is_active')
-    list_filter = ('user', 'is_active')
+class OpportunitySubscriptionAdmin(BackgroundExportMixin, ModelAdmin, ExportActionModelAdmin):
+    list_display = ('user', 'opportunity', 'digest_mode', 'is_active')
+    list_filter = ('user', 'digest_mode', 'is_active')
 
 
 @admin.register(FundingAgency)
@@ -83,8 +131,98 @@ class NotificationChannelAdmin(ModelAdmin):
 
 
 @admin.register(Opportunity)
-class OpportunityAdmin(ModelAdmin, ImportExportModelAdmin):
+class OpportunityAdmin(BackgroundExportMixin, ModelAdmin, ImportExportModelAdmin):
+    resource_class = OpportunityResource
     import_form_class = ImportForm
-    export_form_class = ExportForm
     list_display = ['ref_no', 'title']
     search_fields = ['ref_no', 'title']
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(ModelAdmin):
+    """Large imports, validated by Celery workers in parallel chunks.
+
+    The change page polls the job's progress (htmx) and offers to apply it
+    once every row is valid.
+    """
+    list_display = ['__str__', 'status', 'progress_display', 'created_by', 'created_at']
+    list_filter = ['resource', 'status']
+    fields = ['resource', 'file']
+    change_form_template = 'admin/tracker/importjob/change_form.html'
+
+    @admin.display(description='Progress')
+    def progress_display(self, obj):
+        return f"{obj.progress}%"
+
+    def get_readonly_fields(self, request, obj=None):
+        return self.fields if obj else []
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            obj.created_by = request.user
+        super().save_model(request, obj, form, change)
+        if not change:
+            transaction.on_commit(lambda: validate_import_job.delay(str(obj.pk)))
+
+    def get_urls(self):
+        return [
+            path('<uuid:pk>/progress/', self.admin_site.admin_view(self.progress_view),
+                 name='tracker_importjob_progress'),
+            path('<uuid:pk>/apply/', self.admin_site.admin_view(self.apply_view),
+                 name='tracker_importjob_apply'),
+        ] + super().get_urls()
+
+    def progress_view(self, request, pk):
+        job = get_object_or_404(ImportJob, pk=pk)
+        if not self.has_view_permission(request, job):
+            raise PermissionDenied
+        return render(request, 'admin/tracker/importjob/progress.html', {'job': job})
+
+    @method_decorator(require_POST)
+    def apply_view(self, request, pk):
+        job = get_object_or_404(ImportJob, pk=pk)
+        if not self.has_change_permission(request, job):
+            raise PermissionDenied
+        if ImportJob.objects.filter(pk=pk, status='valid').update(status='importing'):
+            transaction.on_commit(lambda: apply_import_job.delay(str(pk)))
+            messages.info(request, 'The import is being applied.')
+        else:
+            messages.warning(request, 'Only a validated job without errors can be applied.')
+        return redirect('admin:tracker_importjob_change', pk)
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(ModelAdmin):
+    """Background exports; users see their own, superusers everyone's."""
+    list_display = ['__str__', 'status', 'row_count', 'created_by', 'created_at',
+                    'expires_at', 'download_link']
+    list_filter = ['model', 'status']
+    readonly_fields = ['model', 'query', 'file_format', 'status', 'row_count', 'error',
+                       'created_by', 'finished_at', 'expires_at']
+    exclude = ['file', 'resource_index']
+
+    @admin.display(description='File')
+    def download_link(self, obj):
+        if obj.status != 'done' or not obj.file:
+            return '-'
+        return format_html('<a href="{}">{}</a>', reverse(
+            'admin:tracker_exportjob_download', args=[obj.pk]), obj.filename)
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        return queryset if request.user.is_superuser else queryset.filter(created_by=request.user)
+
+    def has_add_permission(self, request):
+        return False
+
+    def get_urls(self):
+        return [
+            path('<uuid:pk>/download/', self.admin_site.admin_view(self.download_view),
+                 name='tracker_exportjob_download'),
+        ] + super().get_urls()
+
+    def download_view(self, request, pk):
+        job = get_object_or_404(self.get_queryset(request), pk=pk, status='done')
+        if not job.file or not job.file.storage.exists(job.file.name):
+            raise Http404('The export has expired.')
+        return send_field_file(request, job.file, job.filename, as_attachment=True)
@@ -2,25 +2,154 @@ import datetime
 from django.forms.widgets import Select
 from typing import Any, Mapping
 from django import forms
+from django.core.exceptions import ValidationError
 from django.core.files.base import File
+from django.db import transaction
 from django.db.models.base import Model
 from django.forms.utils import ErrorList
 from django.urls import reverse, reverse_lazy
-from .models import Client, Country, FundingAgency, Institute, Opportunity, FundingAgency, Client
+from .models import Client, Country, FileUpload, FundingAgency, Institute, Opportunity, FundingAgency, Client
 from django.contrib.auth.models import User
 from django.contrib.auth import get_user_model
+from django.forms.models import ModelChoiceIterator
+from .helpers.autocomplete import user_label
+from .helpers.reference_cache import get_reference, reference_label
+from notification.models import OpportunitySubscription
 
 User = get_user_model()
 
 
-class FundingAgencyChoiceField(forms.ModelChoiceField):
-    def label_from_instance(self, obj):
-        return obj.display_label
+class ReferenceChoiceIterator(ModelChoiceIterator):
+    """Choices of a reference table, read from the reference data cache.
+
+    A queryset narrowed by filters is still read from the database.
+    """
+
+    def _cached(self):
+        return not self.queryset.query.has_filters()
+
+    def __iter__(self):
+        if not self._cached():
+            yield from super().__iter__()
+            return
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        yield from get_reference(self.queryset.model).choices
+
+    def __len__(self):
+        if not self._cached():
+            return super().__len__()
+        return len(get_reference(self.queryset.model).choices) + (self.field.empty_label is not None)
+
+    def __bool__(self):
+        if not self._cached():
+            return super().__bool__()
+        return self.field.empty_label is not None or bool(get_reference(self.queryset.model).choices)
 
+    def selected(self, keys):
+        """Choices for the given primary keys."""
+        if not self._cached():
+            return [self.choice(obj) for obj in self.queryset.filter(pk__in=keys)]
+        labels = get_reference(self.queryset.model).labels
+        return [(key, labels[str(key)]) for key in keys if str(key) in labels]
+
+
+class ReferenceFieldMixin:
+    """Model choice field over a reference table that renders from the cache.
+
+    Submitted values are still validated against the queryset.
+    """
+    iterator = ReferenceChoiceIterator
 
-class ClientChoiceField(forms.ModelChoiceField):
     def label_from_instance(self, obj):
-        return obj.display_label
+        return get_reference(type(obj)).labels.get(str(obj.pk)) or reference_label(obj)
+
+
+class ReferenceChoiceField(ReferenceFieldMixin, forms.ModelChoiceField):
+    pass
+
+
+class ReferenceMultipleChoiceField(ReferenceFieldMixin, forms.ModelMultipleChoiceField):
+    pass
+
+
+class AutocompleteMixin:
+    """Select that only renders its selected options.
+
+    The other options are fetched from the `autocomplete` endpoint for
+    `entity` as the user types: select2 reads its ajax source from the
+    data-ajax--* attributes, so the page no longer grows with the
+    reference table.
+    """
+
+    def __init__(self, entity, attrs=None):
+        self.entity = entity
+        super().__init__(attrs)
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs["data-ajax--url"] = reverse("autocomplete", kwargs={"entity": self.entity})
+        attrs["data-ajax--delay"] = 250
+        return attrs
+
+    def _selected_choices(self, value):
+        iterator = self.choices
+        choices = []
+        if not self.allow_multiple_selected and iterator.field.empty_label is not None:
+            choices.append(("", iterator.field.empty_label))
+
+        pk = iterator.queryset.model._meta.pk
+        keys = []
+        for key in value:
+            # Skips blanks and the "new:<name>" tags of entities created on save
+            try:
+                keys.append(pk.to_python(key))
+            except ValidationError:
+                continue
+        keys = [key for key in keys if key not in (None, "")]
+        if not keys:
+            return choices
+        if isinstance(iterator, ReferenceChoiceIterator):
+            # Labels come from the reference data cache, without a query
+            choices.extend(iterator.selected(keys))
+        else:
+            choices.extend(iterator.choice(obj) for obj in iterator.queryset.filter(pk__in=keys))
+        return choices
+
+    def optgroups(self, name, value, attrs=None):
+        choices = self.choices
+        self.choices = self._selected_choices(value)
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = choices
+
+
+class AutocompleteSelect(AutocompleteMixin, forms.Select):
+    pass
+
+
+class AutocompleteSelectMultiple(AutocompleteMixin, forms.SelectMultiple):
+    pass
+
+
+class FundingAgencyChoiceField(ReferenceChoiceField):
+    """Labelled "code | name", as cached for FundingAgency."""
+
+
+class ClientChoiceField(ReferenceChoiceField):
+    """Labelled "code | name", as cached for Client."""
+
+
+class UploadsField(forms.ModelMultipleChoiceField):
+    """Ids of finished chunked uploads to attach when the form is saved."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("queryset", FileUpload.objects.filter(
+            completed_at__isnull=False))
+        kwargs.setdefault("required", False)
+        kwargs.setdefault("widget", forms.MultipleHiddenInput)
+        super().__init__(**kwargs)
 
 
 class LoginForm(forms.Form):
@@ -36,17 +165,24 @@ class OpportunityForm(forms.ModelForm):
         (4, "Consider"),
     ]
     funding_agency = FundingAgencyChoiceField(
-        queryset=FundingAgency.objects.all(), required=False)
+        queryset=FundingAgency.objects.all(), required=False,
+        widget=AutocompleteSelect("funding_agency"))
     client = ClientChoiceField(
-        queryset=Client.objects.all(), required=False)
+        queryset=Client.objects.all(), required=False, widget=AutocompleteSelect("client"))
+    uploads = UploadsField()
 
     class Meta:
         model = Opportunity
         fields = ['ref_no', 'title', 'funding_agency', 'client', 'opp_type', 'countries',
                   'due_date', 'clarification_date', 'intent_bid_date',  'duration_months', 'notes', 'status', 'currency', 'proposal_amount', 'is_noncompetitive']
+        field_classes = {
+            'countries': ReferenceMultipleChoiceField,
+            'currency': ReferenceChoiceField,
+        }
 
         widgets = {
             'ref_no': forms.TextInput(attrs={'placeholder': 'Enter reference number'}),
+            'countries': AutocompleteSelectMultiple("country"),
             'due_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
             'clarification_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
             'intent_bid_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
@@ -92,12 +228,15 @@ class OpportunityForm(forms.ModelForm):
 
 class UpdateOpportunityForm(forms.ModelForm):
     funding_agency = FundingAgencyChoiceField(
-        queryset=FundingAgency.objects.all(), required=False)
+        queryset=FundingAgency.objects.all(), required=False,
+        widget=AutocompleteSelect("funding_agency"))
     client = ClientChoiceField(
-        queryset=Client.objects.all(), required=False)
+        queryset=Client.objects.all(), required=False, widget=AutocompleteSelect("client"))
 
-    partners = forms.ModelMultipleChoiceField(
-        queryset=Institute.objects.all(), required=False, label="Partners")
+    partners = ReferenceMultipleChoiceField(
+        queryset=Institute.objects.all(), required=False, label="Partners",
+        widget=AutocompleteSelectMultiple("institute"))
+    uploads = UploadsField()
 
     class Meta:
         model = Opportunity
@@ -105,9 +244,18 @@ class UpdateOpportunityForm(forms.ModelForm):
                   'due_date', 'clarification_date', 'intent_bid_date', 'duration_months', 'notes', 'status', 'currency', 'proposal_amount',
                   'lead_unit', 'proposal_lead', 'submission_date', 'lead_institute', 'partners', 'submission_validity', 'result_note', 'is_noncompetitive']
         # Note: result_date is intentionally excluded - it's only managed via UpdateStatusForm
+        field_classes = {
+            'countries': ReferenceMultipleChoiceField,
+            'currency': ReferenceChoiceField,
+            'lead_unit': ReferenceChoiceField,
+            'lead_institute': ReferenceChoiceField,
+        }
 
         widgets = {
             'ref_no': forms.TextInput(attrs={'readonly': 'readonly', 'placeholder': 'Enter reference number'}),
+            'countries': AutocompleteSelectMultiple("country"),
+            'proposal_lead': AutocompleteSelect("user"),
+            'lead_institute': AutocompleteSelect("institute"),
             'due_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
             'clarification_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
             'intent_bid_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
@@ -159,23 +307,28 @@ class UpdateOpportunityForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         from django.urls import reverse
         is_subscribed = kwargs.pop("is_subscribed", False)
+        digest_mode = kwargs.pop("digest_mode", "immediate")
         super().__init__(*args, **kwargs)
 
         self.fields['proposal_lead'].queryset = User.objects.all()
-        self.fields['proposal_lead'].label_from_instance = lambda obj: f"{obj.first_name} {
-            obj.last_name}" if obj.first_name and obj.last_name else obj.username
+        self.fields['proposal_lead'].label_from_instance = user_label
 
         self.fields["is_subscribed"].initial = is_subscribed
+        self.fields["digest_mode"].initial = digest_mode
         if self.instance.pk:
             toggle_url = reverse('notification:toggle_subscription', kwargs={
                                  'opportunity_id': self.instance.pk})
-            self.fields["is_subscribed"].widget.attrs.update({
-                'hx-post': toggle_url,
-                'hx-trigger': 'change',
-                'hx-target': 'this',
-                'hx-swap': 'none',
-                'data-bs-toast-target': '#successToast',
-            })
+            # Both controls post the switch and the digest mode together
+            for field_name, include in (("is_subscribed", "[name='digest_mode']"),
+                                        ("digest_mode", "[name='is_subscribed']")):
+                self.fields[field_name].widget.attrs.update({
+                    'hx-post': toggle_url,
+                    'hx-trigger': 'change',
+                    'hx-target': 'this',
+                    'hx-swap': 'none',
+                    'hx-include': include,
+                    'data-bs-toast-target': '#successToast',
+                })
 
     status = forms.IntegerField(initial=1, widget=forms.HiddenInput())
     is_subscribed = forms.BooleanField(
@@ -184,9 +337,33 @@ class UpdateOpportunityForm(forms.ModelForm):
             'class': 'form-check-input',
             'role': 'switch',
         }))
+    digest_mode = forms.ChoiceField(
+        choices=OpportunitySubscription.DIGEST_MODES, required=False, label="Notifications",
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'}))
+
+
+class PartialUpdateMixin:
+    """Save only the columns a transition form edits."""
+
+    def save_partial(self, updated_by):
+        """Write the form's fields with one UPDATE, along with updated_by and updated_at.
+
+        Many-to-many fields go through the related manager's set(), which
+        only adds and removes the rows that changed.
+        """
+        instance = self.instance
+        instance.updated_by = updated_by
+        opts = instance._meta
+        update_fields = [f.name for f in opts.concrete_fields if f.name in self.cleaned_data]
+        with transaction.atomic():
+            instance.save(update_fields=[*update_fields, "updated_by", "updated_at"])
+            for field in opts.many_to_many:
+                if field.name in self.cleaned_data:
+                    getattr(instance, field.name).set(self.cleaned_data[field.name])
+        return instance
 
 
-class UpdateStatusForm(forms.ModelForm):
+class UpdateStatusForm(PartialUpdateMixin, forms.ModelForm):
     OPP_STATUS = [
         (2, "Go"),
         (3, "NO-Go"),
@@ -208,19 +385,20 @@ class UpdateStatusForm(forms.ModelForm):
         model = Opportunity
         fields = ['status', 'lead_unit', 'proposal_lead',
                   'result_note', 'result_date']
+        field_classes = {'lead_unit': ReferenceChoiceField}
 
         widgets = {
+            'proposal_lead': AutocompleteSelect("user"),
             'result_note': forms.TextInput(attrs={'placeholder': 'Enter notes'})
         }
 
-    status = forms.ChoiceField(
-        widget=forms.RadioSelect, label="status", choices=OPP_STATUS, required=True, error_messages={'required': 'Select at least one option'})
+    status = forms.TypedChoiceField(
+        widget=forms.RadioSelect, label="status", choices=OPP_STATUS, coerce=int, required=True, error_messages={'required': 'Select at least one option'})
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.fields['proposal_lead'].queryset = User.objects.all()
-        self.fields['proposal_lead'].label_from_instance = lambda obj: f"{obj.first_name} {
-            obj.last_name}" if obj.first_name and obj.last_name else obj.username
+        self.fields['proposal_lead'].label_from_instance = user_label
         if self.instance and self.instance.pk:
             submission_date = self.instance.submission_date
             if submission_date:
@@ -246,18 +424,20 @@ class UpdateStatusForm(forms.ModelForm):
         return cleaned_data
 
 
-class SubmitProposalForm(forms.ModelForm):
+class SubmitProposalForm(PartialUpdateMixin, forms.ModelForm):
     submission_date = forms.DateField(required=True,
                                       error_messages={
                                           'required': 'Please provide a submission date'},
                                       widget=forms.DateInput(
                                           attrs={'class': 'form-control', 'type': 'date'})
                                       )
-    lead_institute = forms.ModelChoiceField(
-        queryset=Institute.objects.all(), required=True, label="Lead Organization", error_messages={'required': 'Select a Lead Organization'})
+    lead_institute = ReferenceChoiceField(
+        queryset=Institute.objects.all(), required=True, label="Lead Organization", error_messages={'required': 'Select a Lead Organization'},
+        widget=AutocompleteSelect("institute"))
 
-    partners = forms.ModelMultipleChoiceField(
-        queryset=Institute.objects.all(), required=False, label="Partners")
+    partners = ReferenceMultipleChoiceField(
+        queryset=Institute.objects.all(), required=False, label="Partners",
+        widget=AutocompleteSelectMultiple("institute"))
 
     class Meta:
         model = Opportunity
@@ -288,17 +468,26 @@ class OpportunitySearchForm(forms.Form):
     )
     title = forms.CharField(required=False, label='Title', widget=forms.TextInput(
         attrs={'placeholder': 'Enter title'}))
+    search_attachments = forms.BooleanField(
+        required=False, label="Search in attachments",
+        widget=forms.CheckboxInput(attrs={
+            'class': 'form-check-input',
+            'role': 'switch',
+        }))
 
     funding_agency = FundingAgencyChoiceField(
-        queryset=FundingAgency.objects.all(), required=False, label="Funding Agency")
+        queryset=FundingAgency.objects.all(), required=False, label="Funding Agency",
+        widget=AutocompleteSelect("funding_agency"))
     client = ClientChoiceField(
-        queryset=Client.objects.all(), required=False, label='Client')
+        queryset=Client.objects.all(), required=False, label='Client',
+        widget=AutocompleteSelect("client"))
     status = forms.ChoiceField(
         choices=[('', '')] + Opportunity.OPP_STATUS, required=False, label="Status")
     opp_type = forms.ChoiceField(
         choices=[('', '')] + Opportunity.OPP_TYPE, required=False, label="Type")
-    country = forms.ModelChoiceField(
-        queryset=Country.objects.all(), required=False, label="Country")
+    country = ReferenceChoiceField(
+        queryset=Country.objects.all(), required=False, label="Country",
+        widget=AutocompleteSelect("country"))
     is_noncompetitive = forms.ChoiceField(
         choices=[('', 'Both'), (True, 'Non-competitive'),
                  (False, 'Competitive')],
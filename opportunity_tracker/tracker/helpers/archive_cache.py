@@ -0,0 +1,114 @@
+import hashlib
+import os
+import shutil
+import time
+import uuid
+
+from django.conf import settings
+
+# Partial archives older than this are left over from aborted downloads
+STALE_PART_SECONDS = 3600
+
+
+def archive_key(files):
+    """Key an opportunity's archive by the ids, names and blobs of its files.
+
+    Blobs are named after their content, so no storage lookup is needed,
+    which keeps cache hits cheap on object storage too.
+    """
+    parts = [f"{opportunity_file.pk}:{opportunity_file.display_name}:{opportunity_file.file.name}"
+             for opportunity_file in files]
+    return hashlib.sha256("|".join(sorted(parts)).encode()).hexdigest()
+
+
+def _opportunity_dir(opportunity_id):
+    return os.path.join(settings.ATTACHMENT_ARCHIVE_CACHE_DIR, str(opportunity_id))
+
+
+def archive_path(opportunity_id, key):
+    return os.path.join(_opportunity_dir(opportunity_id), f"{key}.zip")
+
+
+def get_cached_archive(opportunity_id, key):
+    """Return the path of a cached archive, or None on a miss.
+
+    Hits bump the access time, which eviction orders by, and keep the
+    modification time that downloads are served with as Last-Modified.
+    """
+    path = archive_path(opportunity_id, key)
+    try:
+        os.utime(path, ns=(time.time_ns(), os.stat(path).st_mtime_ns))
+    except FileNotFoundError:
+        return None
+    return path
+
+
+def cache_archive(opportunity_id, key, chunks):
+    """Pass the chunks of a streamed archive through while writing them to the cache.
+
+    The archive is only published once it is complete, so an aborted
+    download never leaves a truncated archive behind.
+    """
+    from tracker.tasks import evict_archive_cache
+
+    path = archive_path(opportunity_id, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    part_path = f"{path}.{uuid.uuid4().hex}.part"
+
+    completed = False
+    try:
+        with open(part_path, "wb") as part:
+            for chunk in chunks:
+                part.write(chunk)
+                yield chunk
+        os.replace(part_path, path)
+        completed = True
+    finally:
+        if not completed and os.path.exists(part_path):
+            os.remove(part_path)
+
+    evict_archive_cache.delay()
+
+
+def invalidate_archives(opportunity_id):
+    """Drop every cached archive of an opportunity after its files changed."""
+    shutil.rmtree(_opportunity_dir(opportunity_id), ignore_errors=True)
+
+
+def evict_archives(max_size=None):
+    """Delete the least recently used archives until the cache fits `max_size` bytes.
+
+    Returns the number of bytes freed.
+    """
+    if max_size is None:
+        max_size = settings.ATTACHMENT_ARCHIVE_CACHE_MAX_SIZE
+
+    archives = []
+    freed = 0
+    now = time.time()
+    for root, dirs, files in os.walk(settings.ATTACHMENT_ARCHIVE_CACHE_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if name.endswith(".part"):
+                if now - stat.st_mtime > STALE_PART_SECONDS:
+                    os.remove(path)
+                    freed += stat.st_size
+                continue
+            archives.append((stat.st_atime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in archives)
+    for _, size, path in sorted(archives):
+        if total <= max_size:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        freed += size
+
+    return freed
@@ -0,0 +1,26 @@
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.db import connection
+
+from tracker.models import AttachmentText
+
+SEARCH_CONFIG = "simple"
+
+
+def update_search_vector(attachment_text):
+    if connection.vendor == "postgresql":
+        AttachmentText.objects.filter(pk=attachment_text.pk).update(
+            search_vector=SearchVector("text", config=SEARCH_CONFIG))
+
+
+def search_attachments(query):
+    """Return the ids of the opportunities whose attachment text matches `query`.
+
+    Answered from the attachment_texts index only; files are never opened.
+    """
+    texts = AttachmentText.objects.all()
+    if connection.vendor == "postgresql":
+        texts = texts.filter(search_vector=SearchQuery(
+            query, config=SEARCH_CONFIG, search_type="websearch"))
+    else:
+        texts = texts.filter(text__icontains=query)
+    return texts.values("file__opportunity_id")
@@ -0,0 +1,64 @@
+from dataclasses import dataclass
+from functools import reduce
+from operator import or_
+from typing import Callable
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+
+PAGE_SIZE = 20
+
+
+def user_label(user):
+    """Full name when both parts are set, the username otherwise."""
+    if user.first_name and user.last_name:
+        return f"{user.first_name} {user.last_name}"
+    return user.username
+
+
+@dataclass(frozen=True)
+class Source:
+    """A reference table the autocomplete endpoint can search."""
+    model: str
+    search_fields: tuple
+    ordering: tuple
+    label: Callable = str
+
+    def get_queryset(self):
+        if self.model == "user":
+            return get_user_model().objects.all()
+        return apps.get_model("tracker", self.model).objects.all()
+
+
+SOURCES = {
+    "funding_agency": Source("FundingAgency", ("code", "name"), ("name", ),
+                             lambda obj: obj.display_label),
+    "client": Source("Client", ("code", "name"), ("name", ), lambda obj: obj.display_label),
+    "institute": Source("Institute", ("code", "name"), ("name", )),
+    "country": Source("Country", ("code", "name"), ("name", )),
+    "user": Source("user", ("username", "first_name", "last_name"),
+                   ("first_name", "last_name", "username"), user_label),
+}
+
+
+def search(source, term, page=1):
+    """One page of `source` rows whose search fields start with `term`.
+
+    Matches are case-insensitive prefix lookups, which PostgreSQL answers
+    from the trigram indexes added in migration 0020. The result is in the
+    shape select2 expects from an ajax source.
+    """
+    queryset = source.get_queryset()
+    term = term.strip()
+    if term:
+        queryset = queryset.filter(reduce(
+            or_, (Q(**{f"{field}__istartswith": term}) for field in source.search_fields)))
+
+    offset = (page - 1) * PAGE_SIZE
+    # One extra row tells whether there is a next page without a COUNT query
+    rows = list(queryset.order_by(*source.ordering)[offset:offset + PAGE_SIZE + 1])
+    return {
+        "results": [{"id": str(obj.pk), "text": source.label(obj)} for obj in rows[:PAGE_SIZE]],
+        "pagination": {"more": len(rows) > PAGE_SIZE},
+    }
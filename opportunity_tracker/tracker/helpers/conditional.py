@@ -0,0 +1,79 @@
+from hashlib import md5
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .reference_cache import get_version
+
+
+def make_etag(*parts):
+    return md5("|".join(map(str, parts)).encode(), usedforsecurity=False).hexdigest()
+
+
+def opportunity_validators(pk):
+    """ETag parts and Last-Modified of an opportunity's detail pages, from one query.
+
+    Returns None when the opportunity does not exist. Attachments do not
+    touch the opportunity's updated_at, so their count, upload times and
+    rendered thumbnails are part of both.
+    """
+    from tracker.models import Opportunity
+
+    stats = Opportunity.objects.filter(pk=pk).aggregate(
+        updated_at=Max("updated_at"), files=Count("Files"),
+        uploaded_at=Max("Files__uploaded_at"), previews=Count("Files__preview_ready_at"),
+        preview_ready_at=Max("Files__preview_ready_at"))
+    if stats["updated_at"] is None:
+        return None
+    last_modified = max(filter(None, (
+        stats["updated_at"], stats["uploaded_at"], stats["preview_ready_at"])))
+    return (pk, *stats.values(), get_version()), last_modified
+
+
+def queryset_validators(queryset, *parts):
+    """ETag parts and Last-Modified of a page listing `queryset`, from one aggregate query."""
+    stats = queryset.aggregate(count=Count("pk"), last_modified=Max("updated_at"))
+    last_modified = stats["last_modified"]
+    return (*parts, stats["count"], last_modified and last_modified.isoformat(),
+            get_version()), last_modified
+
+
+class ConditionalGetMixin:
+    """Answer a GET with 304 Not Modified, before rendering, when the client's copy is current.
+
+    get_validators() returns the ETag parts and Last-Modified, computed with
+    cheap queries, or None to always render. cache_control holds the
+    Cache-Control directives, passed to patch_cache_control.
+    """
+    cache_control = {"private": True, "no_cache": True}
+    vary_on = ()
+
+    def get_validators(self):
+        return None
+
+    def get_cache_control(self):
+        return self.cache_control
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return super().dispatch(request, *args, **kwargs)
+
+        validators = self.get_validators()
+        etag = last_modified = None
+        if validators is not None:
+            parts, modified_at = validators
+            etag = quote_etag(make_etag(*parts))
+            last_modified = int(modified_at.timestamp()) if modified_at else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            if etag and not response.has_header("ETag"):
+                response.headers["ETag"] = etag
+            if last_modified and not response.has_header("Last-Modified"):
+                response.headers["Last-Modified"] = http_date(last_modified)
+            patch_cache_control(response, **self.get_cache_control())
+        patch_vary_headers(response, self.vary_on)
+        return response
@@ -0,0 +1,150 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import (FileResponse, Http404, HttpResponse, HttpResponseNotModified,
+                         HttpResponseRedirect)
+from django.utils.http import content_disposition_header, http_date
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class _FileRange:
+    """Read at most `length` bytes of an open file from its current position."""
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b""
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """Return (start, end) of a single byte range, None to send the whole file
+    and False when the range cannot be satisfied.
+
+    Multiple ranges are answered with the whole file, which RFC 9110 allows.
+    """
+    match = RANGE_RE.match(header or "")
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the last N bytes
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def ranged_file_response(request, path, filename=None, etag=None, content_type=None, as_attachment=True):
+    """Serve a file from disk with Range, If-Range and If-None-Match support.
+
+    `etag` is the opaque part of a strong validator; the file must not change
+    while it keeps the same value.
+    """
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = f'"{etag}"' if etag else None
+
+    headers = {"Accept-Ranges": "bytes", "Last-Modified": http_date(stat.st_mtime)}
+    if etag:
+        headers["ETag"] = etag
+        if_none_match = request.headers.get("If-None-Match", "")
+        if if_none_match == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]:
+            response = HttpResponseNotModified()
+            response["ETag"] = etag
+            return response
+
+    byte_range = None
+    if_range = request.headers.get("If-Range")
+    if request.method == "GET" and (if_range is None or (etag and if_range == etag)):
+        byte_range = parse_range(request.headers.get("Range"), size)
+
+    if byte_range is False:
+        return HttpResponse(status=416, headers={"Content-Range": f"bytes */{size}"})
+
+    file = open(path, "rb")
+    if byte_range is None:
+        response = FileResponse(file, as_attachment=as_attachment,
+                                filename=filename, content_type=content_type)
+    else:
+        start, end = byte_range
+        file.seek(start)
+        response = FileResponse(_FileRange(file, end - start + 1), status=206,
+                                as_attachment=as_attachment, filename=filename,
+                                content_type=content_type)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = end - start + 1
+
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+def send_file(request, path, internal_url, filename=None, as_attachment=False):
+    """Hand a protected file over to the web server, or serve it from Django.
+
+    With MEDIA_SENDFILE_BACKEND "nginx" the response carries X-Accel-Redirect
+    to `internal_url` under MEDIA_ACCEL_REDIRECT_PREFIX, with "apache" it
+    carries X-Sendfile with the absolute path. Otherwise the file is served
+    with range support.
+    """
+    backend = settings.MEDIA_SENDFILE_BACKEND
+    filename = filename or os.path.basename(path)
+
+    if backend in ("nginx", "apache"):
+        content_type, encoding = mimetypes.guess_type(filename)
+        response = HttpResponse(content_type=content_type or "application/octet-stream")
+        if backend == "nginx":
+            prefix = settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip("/")
+            response["X-Accel-Redirect"] = f"{prefix}/{quote(internal_url.lstrip('/'))}"
+        else:
+            response["X-Sendfile"] = os.path.abspath(path)
+        response["Content-Disposition"] = content_disposition_header(
+            as_attachment, filename)
+        return response
+
+    # Uploaded files are never rewritten in place, so size and mtime identify the content
+    stat = os.stat(path)
+    etag = f"{stat.st_size:x}-{int(stat.st_mtime * 1000000):x}"
+    return ranged_file_response(request, path, filename=filename, etag=etag,
+                                as_attachment=as_attachment)
+
+
+def send_field_file(request, field_file, filename, as_attachment=False):
+    """Serve a FileField's file from whichever storage holds it.
+
+    Object storage redirects the client to a presigned URL, other storages
+    without local paths are streamed, and files on disk go through send_file.
+    """
+    storage = field_file.storage
+    if hasattr(storage, "presigned_url"):
+        # Object storage: the client downloads straight from the bucket
+        return HttpResponseRedirect(storage.presigned_url(
+            field_file.name, filename, as_attachment=as_attachment))
+    if not storage.exists(field_file.name):
+        raise Http404("File not found")
+    try:
+        path = storage.path(field_file.name)
+    except NotImplementedError:
+        return FileResponse(field_file.open("rb"), as_attachment=as_attachment, filename=filename)
+    return send_file(request, path, field_file.name, filename=filename,
+                     as_attachment=as_attachment)
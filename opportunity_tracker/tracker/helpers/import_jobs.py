@@ -0,0 +1,142 @@
+import os
+
+import tablib
+from django.core.files.base import ContentFile
+from import_export.formats import base_formats
+
+FORMATS = {".csv": base_formats.CSV, ".xlsx": base_formats.XLSX}
+
+
+def get_resource(job):
+    """A fresh resource instance for the job's model."""
+    from tracker.resources import (ClientResource, FundingAgencyResource, InstituteResource,
+                                   OpportunityResource, UnitResource)
+
+    return {
+        "opportunity": OpportunityResource,
+        "funding_agency": FundingAgencyResource,
+        "client": ClientResource,
+        "institute": InstituteResource,
+        "unit": UnitResource,
+    }[job.resource]()
+
+
+def _input_format(name):
+    extension = os.path.splitext(name)[1].lower()
+    try:
+        return FORMATS[extension]()
+    except KeyError:
+        raise ValueError(f"Unsupported file type '{extension}', use CSV or XLSX.")
+
+
+def _read_dataset(storage, name):
+    input_format = _input_format(name)
+    with storage.open(name, "rb") as uploaded:
+        data = uploaded.read()
+    if not input_format.is_binary():
+        data = data.decode("utf-8-sig")
+    return input_format.create_dataset(data)
+
+
+def load_dataset(job):
+    """Parse the uploaded file into a tablib Dataset."""
+    return _read_dataset(job.file.storage, job.file.name)
+
+
+def chunk_bounds(total, size):
+    """(start, stop) row offsets splitting `total` rows into chunks of `size`."""
+    return [(start, min(start + size, total)) for start in range(0, total, size)]
+
+
+def split_file(job, size):
+    """Parse the job's file once and store its rows as chunk files of `size` rows.
+
+    Chunks keep the upload's format, so XLSX cell types survive. Returns the
+    row count and a (start, stop, name) triple per chunk, for validate_rows.
+    """
+    dataset = load_dataset(job)
+    input_format = _input_format(job.file.name)
+    extension = os.path.splitext(job.file.name)[1].lower()
+    storage = job.file.storage
+    chunks = []
+    for start, stop in chunk_bounds(len(dataset), size):
+        chunk = tablib.Dataset(*dataset[start:stop], headers=dataset.headers)
+        data = chunk.export(input_format.get_title())
+        name = storage.save(f"imports/chunks/{job.pk}/{start}{extension}",
+                            ContentFile(data.encode() if isinstance(data, str) else data))
+        chunks.append((start, stop, name))
+    return len(dataset), chunks
+
+
+def _import_key(resource, row):
+    columns = [resource.fields[name].column_name for name in resource.get_import_id_fields()]
+    values = [str(row.get(column) or "").strip() for column in columns]
+    return "|".join(values) if all(values) else None
+
+
+def validate_rows(job, start, name):
+    """Dry-run the chunk file `name` written by split_file, starting at row `start`.
+
+    Only the chunk is read, and it is deleted once validated. Returns
+    JSON-serialisable counts, errors numbered by row in the whole file, and
+    the import keys of the valid rows so duplicates across chunks can be
+    found when the results are merged.
+    """
+    storage = job.file.storage
+    try:
+        chunk = _read_dataset(storage, name)
+    finally:
+        storage.delete(name)
+    resource = get_resource(job)
+    result = resource.import_data(chunk, dry_run=True, user=job.created_by)
+
+    errors = [{"row": None, "errors": [str(error.error)]} for error in result.base_errors]
+    failed = set()
+    for number, row_errors in result.row_errors():
+        failed.add(number)
+        errors.append({"row": start + number, "errors": [str(error.error) for error in row_errors]})
+    for invalid in result.invalid_rows:
+        failed.add(invalid.number)
+        errors.append({"row": start + invalid.number, "errors": [
+            f"{field}: {message}" for field, messages in invalid.error_dict.items()
+            for message in messages]})
+
+    keys = []
+    for number, values in enumerate(chunk, 1):
+        key = _import_key(resource, dict(zip(chunk.headers, values)))
+        if number not in failed and key:
+            keys.append([start + number, key])
+    return {"totals": dict(result.totals), "errors": errors, "keys": keys}
+
+
+def merge_results(results):
+    """Combine the chunk results of validate_rows into (totals, errors).
+
+    Each chunk only sees its own rows, so a key already used by an earlier
+    chunk is reported here, on the later row.
+    """
+    totals, errors, first_seen = {}, [], {}
+    for chunk in results:
+        for import_type, count in chunk["totals"].items():
+            totals[import_type] = totals.get(import_type, 0) + count
+        errors.extend(chunk["errors"])
+
+        chunk_keys = {}
+        for number, key in chunk["keys"]:
+            if key in first_seen:
+                errors.append({"row": number, "errors": [
+                    f"'{key}' appears more than once in the file (first on row {first_seen[key]})"]})
+                totals["invalid"] = totals.get("invalid", 0) + 1
+            else:
+                chunk_keys.setdefault(key, number)
+        first_seen.update(chunk_keys)
+
+    errors.sort(key=lambda error: error["row"] or 0)
+    return totals, errors
+
+
+def apply_rows(job):
+    """Import the whole file in one transaction; nothing is written if any row fails."""
+    resource = get_resource(job)
+    return resource.import_data(load_dataset(job), use_transactions=True,
+                                rollback_on_validation_errors=True, user=job.created_by)
@@ -0,0 +1,143 @@
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.conf import settings
+from django.core.files.move import file_move_safe
+
+from .previews import preview_path
+from .storage import BLOB_PREFIX, get_attachment_storage, iter_chunks
+
+logger = logging.getLogger(__name__)
+
+# "opportunities" holds attachments stored before the move to blobs (migration 0013)
+ATTACHMENT_DIRS = (BLOB_PREFIX, "opportunities")
+
+
+@dataclass
+class OrphanReport:
+    """Outcome and throughput of one garbage collection run."""
+    dry_run: bool
+    scanned: int = 0
+    orphans: list = field(default_factory=list)
+    orphan_bytes: int = 0
+    removed: int = 0
+    quarantined: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def files_per_second(self):
+        return self.scanned / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        action = "would be removed" if self.dry_run else "collected"
+        return (f"{self.scanned} files scanned in {self.elapsed:.1f}s "
+                f"({self.files_per_second:.0f}/s), {len(self.orphans)} orphans "
+                f"({self.orphan_bytes} bytes) {action}.")
+
+
+def _remove_preview(name):
+    try:
+        os.remove(preview_path(name))
+    except FileNotFoundError:
+        pass
+
+
+def delete_blob(name, storage=None):
+    """Delete a stored attachment and its cached preview."""
+    (storage or get_attachment_storage()).delete(name)
+    _remove_preview(name)
+
+
+def blob_age(name, storage=None):
+    """Seconds since a stored attachment was last written; FileNotFoundError when it is gone.
+
+    Saving content that is already stored only touches the blob, so a young
+    blob may belong to an OpportunityFile row that is not committed yet.
+    """
+    storage = storage or get_attachment_storage()
+    return time.time() - storage.get_modified_time(name).timestamp()
+
+
+def _walk(storage, directory):
+    """Yield the names of all files under `directory`, depth first."""
+    try:
+        dirs, files = storage.listdir(directory)
+    except FileNotFoundError:
+        # Object storage has no directories; a missing prefix just lists empty
+        return
+    for name in files:
+        yield f"{directory}/{name}"
+    for name in dirs:
+        yield from _walk(storage, f"{directory}/{name}")
+
+
+def _batches(names, size):
+    names = iter(names)
+    while batch := list(islice(names, size)):
+        yield batch
+
+
+def _quarantine(storage, name):
+    target = os.path.join(settings.ATTACHMENT_ORPHAN_QUARANTINE_DIR, name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    try:
+        file_move_safe(storage.path(name), target, allow_overwrite=True)
+    except NotImplementedError:
+        # Object storage: keep a local copy, then drop the object
+        with open(target, "wb") as quarantined:
+            for chunk in iter_chunks(storage.open(name)):
+                quarantined.write(chunk)
+        storage.delete(name)
+    _remove_preview(name)
+
+
+def collect_orphans(dry_run=False, batch_size=None, storage=None):
+    """Remove stored attachments that no OpportunityFile refers to.
+
+    The storage is walked in batches of `batch_size` names, each checked
+    against the database with one query. Files modified within
+    ATTACHMENT_ORPHAN_GRACE_HOURS are left alone, as their row may not be
+    committed yet. Orphans are moved to ATTACHMENT_ORPHAN_QUARANTINE_DIR when
+    it is set, and deleted otherwise. With `dry_run` nothing is touched and
+    the report lists what would be collected.
+    """
+    from tracker.models import OpportunityFile
+
+    storage = storage or get_attachment_storage()
+    batch_size = batch_size or settings.ATTACHMENT_GC_BATCH_SIZE
+    grace = settings.ATTACHMENT_ORPHAN_GRACE_HOURS * 3600
+    report = OrphanReport(dry_run=dry_run)
+    started = time.monotonic()
+
+    for directory in ATTACHMENT_DIRS:
+        for batch in _batches(_walk(storage, directory), batch_size):
+            report.scanned += len(batch)
+            referenced = set(OpportunityFile.objects.filter(
+                file__in=batch).values_list("file", flat=True))
+            for name in batch:
+                if name in referenced:
+                    continue
+                try:
+                    age = blob_age(name, storage)
+                    size = storage.size(name)
+                except FileNotFoundError:
+                    continue
+                if age < grace:
+                    continue
+                report.orphans.append(name)
+                report.orphan_bytes += size
+                if dry_run:
+                    continue
+                if settings.ATTACHMENT_ORPHAN_QUARANTINE_DIR:
+                    _quarantine(storage, name)
+                    report.quarantined += 1
+                else:
+                    delete_blob(name, storage)
+                    report.removed += 1
+
+    report.elapsed = time.monotonic() - started
+    logger.info("Attachment garbage collection: %s", report)
+    return report
@@ -0,0 +1,78 @@
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+
+from django.conf import settings
+from PIL import Image, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_SIZE = (480, 480)
+PDF_RENDER_TIMEOUT = 60
+IMAGE_EXTENSIONS = {".bmp", ".gif", ".jpeg", ".jpg", ".png", ".tif", ".tiff", ".webp"}
+
+
+def can_preview(original_name):
+    extension = os.path.splitext(original_name)[1].lower()
+    return extension == ".pdf" or extension in IMAGE_EXTENSIONS
+
+
+def preview_name(file_name):
+    """Previews follow the content-addressed blob, so shared files share a preview."""
+    digest = os.path.basename(file_name)
+    return f"{digest[:2]}/{digest}.jpg"
+
+
+def preview_path(file_name):
+    return os.path.join(settings.PREVIEW_ROOT, preview_name(file_name))
+
+
+def preview_url(file_name):
+    return f"{settings.PREVIEW_URL}{preview_name(file_name)}"
+
+
+def _render_pdf_page(source_path, directory):
+    """Rasterise the first page with poppler's pdftoppm, which the Docker image installs."""
+    if not shutil.which("pdftoppm"):
+        logger.warning("pdftoppm is not installed, skipping PDF preview")
+        return None
+
+    output = os.path.join(directory, "page")
+    subprocess.run(
+        ["pdftoppm", "-png", "-f", "1", "-l", "1", "-singlefile",
+         "-scale-to", str(max(PREVIEW_SIZE)), source_path, output],
+        check=True, capture_output=True, timeout=PDF_RENDER_TIMEOUT)
+    return f"{output}.png"
+
+
+def generate_preview(source_path, original_name, target_path):
+    """Write a JPEG thumbnail of an image, or of the first page of a PDF.
+
+    Returns False when the format is not supported or cannot be read.
+    """
+    extension = os.path.splitext(original_name)[1].lower()
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            if extension == ".pdf":
+                source_path = _render_pdf_page(source_path, directory)
+                if not source_path:
+                    return False
+            elif extension not in IMAGE_EXTENSIONS:
+                return False
+
+            with Image.open(source_path) as image:
+                image.seek(0)
+                image.thumbnail(PREVIEW_SIZE)
+                temp_path = os.path.join(directory, "preview.jpg")
+                image.convert("RGB").save(temp_path, "JPEG", quality=80, optimize=True)
+        except (OSError, UnidentifiedImageError, Image.DecompressionBombError,
+                subprocess.SubprocessError) as e:
+            logger.warning("Could not render a preview of %s: %s", original_name, e)
+            return False
+
+        shutil.move(temp_path, target_path)
+    return True
@@ -0,0 +1,87 @@
+from dataclasses import dataclass
+from functools import lru_cache
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = "tracker:reference-data:version"
+
+# Room for every reference table at a couple of versions
+LOCAL_CACHE_SIZE = 32
+
+
+@dataclass(frozen=True)
+class ReferenceData:
+    """One reference table, as forms and reports display it."""
+    choices: tuple
+    labels: dict
+    codes: dict
+
+
+@lru_cache(maxsize=None)
+def _reference_labels():
+    from tracker.models import Client, Country, Currency, FundingAgency, Institute, Unit
+
+    return {
+        FundingAgency: lambda obj: obj.display_label,
+        Client: lambda obj: obj.display_label,
+        Institute: str,
+        Unit: str,
+        Country: str,
+        Currency: str,
+    }
+
+
+def is_reference_model(model):
+    return model in _reference_labels()
+
+
+def reference_label(obj):
+    """The label of a reference row, computed without the cache."""
+    return _reference_labels()[type(obj)](obj)
+
+
+def get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+def bump_version():
+    """Invalidate the reference data cached by every process.
+
+    Bumped right away and again once the transaction commits, so a process
+    that reloads in between does not keep the pre-commit rows.
+    """
+    def bump():
+        cache.add(VERSION_KEY, 1, None)
+        cache.incr(VERSION_KEY)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+@lru_cache(maxsize=LOCAL_CACHE_SIZE)
+def _load(model, version):
+    label = _reference_labels()[model]
+    rows = list(model.objects.all())
+    choices = tuple((obj.pk, label(obj)) for obj in rows)
+    return ReferenceData(
+        choices=choices,
+        labels={str(pk): text for pk, text in choices},
+        codes={str(obj.pk): obj.code for obj in rows},
+    )
+
+
+def get_reference(model):
+    """The rows of a reference table, from a process-local LRU cache.
+
+    Entries are keyed by the version counter in the shared cache, which is
+    bumped whenever reference data changes (see tracker.signals and
+    CodeResource), so a bump makes every process reload on its next read
+    and old versions simply age out. Keys of `labels` and `codes` are the
+    string form of the primary key.
+    """
+    return _load(model, get_version())
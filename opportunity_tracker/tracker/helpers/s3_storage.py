@@ -0,0 +1,76 @@
+import os
+
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+from django.conf import settings
+from django.utils.http import content_disposition_header
+from storages.backends.s3 import S3Storage
+from storages.utils import clean_name
+
+from .storage import blob_name, spool_with_digest
+
+
+class ContentAddressedS3Storage(S3Storage):
+    """ContentAddressedStorage for S3-compatible object storage (AWS, MinIO).
+
+    Used when ATTACHMENT_STORAGE_BACKEND is "s3", so that every web replica
+    and worker reads the same bucket instead of a volume. Objects are keyed
+    by the SHA-256 of their content exactly like on disk; anything larger
+    than ATTACHMENT_S3_MULTIPART_THRESHOLD is uploaded in parts. Downloads
+    go straight to the bucket through presigned URLs.
+    """
+
+    def __init__(self, **settings_overrides):
+        settings_overrides.setdefault("transfer_config", TransferConfig(
+            multipart_threshold=settings.ATTACHMENT_S3_MULTIPART_THRESHOLD,
+            multipart_chunksize=settings.ATTACHMENT_S3_MULTIPART_CHUNKSIZE,
+        ))
+        super().__init__(**settings_overrides)
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def exists(self, name):
+        # S3Storage answers False whenever file_overwrite is on; blobs need the real answer
+        key = self._normalize_name(clean_name(name))
+        try:
+            self.connection.meta.client.head_object(Bucket=self.bucket_name, Key=key)
+        except ClientError as err:
+            if err.response["ResponseMetadata"]["HTTPStatusCode"] == 404:
+                return False
+            raise
+        return True
+
+    def _save(self, name, content):
+        digest, temp_path = spool_with_digest(content, settings.FILE_UPLOAD_TEMP_DIR)
+        try:
+            name = blob_name(digest)
+            if self.exists(name):
+                self._touch(name)
+            else:
+                with open(temp_path, "rb") as temp:
+                    super()._save(name, temp)
+        finally:
+            os.remove(temp_path)
+        return name
+
+    def _touch(self, name):
+        # Copying an object onto itself refreshes LastModified, which orphan cleanup checks
+        key = self._normalize_name(clean_name(name))
+        self.bucket.Object(key).copy_from(
+            CopySource={"Bucket": self.bucket_name, "Key": key}, MetadataDirective="REPLACE")
+
+    def stream(self, name, chunk_size):
+        """Yield the object's content as it is downloaded."""
+        key = self._normalize_name(clean_name(name))
+        body = self.bucket.Object(key).get()["Body"]
+        try:
+            yield from body.iter_chunks(chunk_size)
+        finally:
+            body.close()
+
+    def presigned_url(self, name, filename, as_attachment=False):
+        """Short-lived URL downloading the object under `filename`."""
+        return self.url(name, parameters={
+            "ResponseContentDisposition": content_disposition_header(as_attachment, filename),
+        })
@@ -0,0 +1,117 @@
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage, storages
+
+BLOB_PREFIX = "blobs"
+CHUNK_SIZE = 64 * 1024
+
+
+def blob_name(digest):
+    """Storage name of a blob, fanned out over two directory levels."""
+    return f"{BLOB_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}"
+
+
+def spool_with_digest(content, directory=None):
+    """Copy `content` to a temporary file while hashing it.
+
+    Returns the hex SHA-256 and the path of the temporary file, which the
+    caller must remove.
+    """
+    digest = hashlib.sha256()
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".upload")
+    try:
+        with os.fdopen(fd, "wb") as temp:
+            if hasattr(content, "seek"):
+                content.seek(0)
+            for chunk in content.chunks():
+                digest.update(chunk)
+                temp.write(chunk)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return digest.hexdigest(), temp_path
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Store each distinct attachment once, named by the SHA-256 of its content.
+
+    The content is hashed while it is streamed to a temporary file, which is
+    then moved into place, or discarded when the blob already exists. The
+    name passed in is ignored; callers keep the original file name
+    themselves. Blobs are shared, so they must only be deleted once no
+    OpportunityFile refers to them any more.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        blob_dir = self.path(BLOB_PREFIX)
+        os.makedirs(blob_dir, exist_ok=True)
+
+        digest, temp_path = spool_with_digest(content, blob_dir)
+        try:
+            name = blob_name(digest)
+            full_path = self.path(name)
+            if os.path.exists(full_path):
+                # Same content already stored; touch it so orphan cleanup leaves it alone
+                os.utime(full_path)
+            else:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                file_move_safe(temp_path, full_path, allow_overwrite=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(full_path, self.file_permissions_mode)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        return name
+
+
+def get_attachment_storage():
+    """The backend configured as STORAGES["attachments"]."""
+    return storages["attachments"]
+
+
+def iter_chunks(file, chunk_size=CHUNK_SIZE):
+    """Yield the content of a Django File chunk by chunk.
+
+    Object storage backends expose `stream()`, which reads the object as it
+    is downloaded instead of spooling it to disk first.
+    """
+    stream = getattr(getattr(file, "storage", None), "stream", None)
+    if stream:
+        yield from stream(file.name, chunk_size)
+        return
+    file.open("rb")
+    try:
+        while chunk := file.read(chunk_size):
+            yield chunk
+    finally:
+        file.close()
+
+
+@contextmanager
+def local_path(file):
+    """Yield a filesystem path holding the content of a stored file.
+
+    Local storage hands out the file itself; anything else is downloaded
+    to a temporary file for the duration of the block.
+    """
+    try:
+        path = file.storage.path(file.name)
+    except NotImplementedError:
+        path = None
+    if path:
+        yield path
+        return
+
+    with tempfile.NamedTemporaryFile() as temp:
+        for chunk in iter_chunks(file):
+            temp.write(chunk)
+        temp.flush()
+        yield temp.name
@@ -0,0 +1,82 @@
+import logging
+import os
+import shutil
+import subprocess
+import zipfile
+from xml.etree import ElementTree
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+PDF_EXTRACT_TIMEOUT = 120
+WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+EXTRACTABLE_EXTENSIONS = {".pdf", ".docx", ".xlsx"}
+
+
+def can_extract(original_name):
+    return os.path.splitext(original_name)[1].lower() in EXTRACTABLE_EXTENSIONS
+
+
+def _pdf_text(path):
+    # pdftotext comes with poppler-utils, which also renders the previews
+    if not shutil.which("pdftotext"):
+        logger.warning("pdftotext is not installed, skipping PDF text")
+        return None
+    result = subprocess.run(["pdftotext", "-enc", "UTF-8", path, "-"],
+                            check=True, capture_output=True, timeout=PDF_EXTRACT_TIMEOUT)
+    return result.stdout.decode("utf-8", "replace")
+
+
+def _docx_text(path):
+    with zipfile.ZipFile(path) as archive:
+        root = ElementTree.fromstring(archive.read("word/document.xml"))
+    paragraphs = []
+    for paragraph in root.iter(f"{WORD_NAMESPACE}p"):
+        paragraphs.append("".join(node.text or "" for node in paragraph.iter(f"{WORD_NAMESPACE}t")))
+    return "\n".join(paragraphs)
+
+
+def _xlsx_text(path):
+    from openpyxl import load_workbook
+
+    # Blobs have no extension, which openpyxl rejects for paths but not for file objects
+    with open(path, "rb") as handle:
+        return _workbook_text(load_workbook(handle, read_only=True, data_only=True))
+
+
+def _workbook_text(workbook):
+    try:
+        lines = []
+        for sheet in workbook.worksheets:
+            lines.append(sheet.title)
+            for row in sheet.iter_rows(values_only=True):
+                cells = [str(value) for value in row if value is not None]
+                if cells:
+                    lines.append(" ".join(cells))
+        return "\n".join(lines)
+    finally:
+        workbook.close()
+
+
+EXTRACTORS = {".pdf": _pdf_text, ".docx": _docx_text, ".xlsx": _xlsx_text}
+
+
+def extract_text(path, original_name):
+    """Return the plain text of a PDF, DOCX or XLSX file.
+
+    Returns None when the format is not supported or the file cannot be
+    read. The text is capped at ATTACHMENT_TEXT_MAX_LENGTH characters.
+    """
+    extractor = EXTRACTORS.get(os.path.splitext(original_name)[1].lower())
+    if not extractor:
+        return None
+    try:
+        text = extractor(path)
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile, ElementTree.ParseError,
+            subprocess.SubprocessError) as e:
+        logger.warning("Could not extract text from %s: %s", original_name, e)
+        return None
+    if text is None:
+        return None
+    return " ".join(text.split())[:settings.ATTACHMENT_TEXT_MAX_LENGTH]
@@ -0,0 +1,69 @@
+import os
+
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .archive_cache import invalidate_archives
+
+CHUNK_SIZE = 64 * 1024
+
+
+class UploadOffsetMismatch(Exception):
+    """The client's offset does not match what the server has stored."""
+
+
+def append_chunk(upload, stream, offset, length=None):
+    """Append the bytes of `stream` to an upload session at `offset`.
+
+    The session row is locked for the duration, so two PATCH requests for
+    the same upload cannot interleave. Bytes beyond the declared size are
+    rejected by truncating the write. Returns the new offset.
+    """
+    with transaction.atomic():
+        upload = type(upload).objects.select_for_update().get(pk=upload.pk)
+        if offset != upload.offset:
+            raise UploadOffsetMismatch(upload.offset)
+
+        os.makedirs(os.path.dirname(upload.path), exist_ok=True)
+        remaining = upload.size - upload.offset
+        if length is not None:
+            remaining = min(remaining, length)
+
+        with open(upload.path, "ab") as part:
+            part.truncate(upload.offset)
+            while remaining > 0:
+                chunk = stream.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                part.write(chunk)
+                remaining -= len(chunk)
+            upload.offset = part.tell()
+
+        if upload.offset == upload.size:
+            upload.completed_at = timezone.now()
+        upload.save(update_fields=["offset", "completed_at", "updated_at"])
+    return upload
+
+
+def attach_uploads(opportunity, uploads=(), files=()):
+    """Attach finished upload sessions and plain multipart files to an opportunity.
+
+    Consumed upload sessions are removed along with their assembled files.
+    """
+    from tracker.models import OpportunityFile
+
+    attached = []
+    for upload in uploads:
+        with open(upload.path, "rb") as assembled:
+            attached.append(OpportunityFile.objects.create(
+                opportunity=opportunity, file=File(assembled, name=upload.filename)))
+        upload.delete()
+
+    for f in files:
+        attached.append(OpportunityFile.objects.create(
+            opportunity=opportunity, file=f))
+
+    if attached:
+        invalidate_archives(opportunity.id)
+    return attached
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.2 on 2026-10-19 13:27
+
+import tracker.helpers.storage
+import tracker.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0011_schedule_expire_file_uploads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='opportunityfile',
+            name='original_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='opportunityfile',
+            name='file',
+            field=models.FileField(max_length=255, storage=tracker.helpers.storage.get_attachment_storage, upload_to=tracker.models.get_file_upload_path),
+        ),
+    ]
@@ -0,0 +1,44 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.db import migrations
+
+
+def move_to_blobs(apps, schema_editor):
+    """Rename existing attachments after their SHA-256 so duplicates share one blob."""
+    OpportunityFile = apps.get_model('tracker', 'OpportunityFile')
+
+    for opportunity_file in OpportunityFile.objects.exclude(file__startswith='blobs/').iterator():
+        old_name = opportunity_file.file.name
+        old_path = os.path.join(settings.MEDIA_ROOT, old_name)
+        if not os.path.isfile(old_path):
+            continue
+
+        digest = hashlib.sha256()
+        with open(old_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        digest = digest.hexdigest()
+
+        new_name = f"blobs/{digest[:2]}/{digest[2:4]}/{digest}"
+        new_path = os.path.join(settings.MEDIA_ROOT, new_name)
+        os.makedirs(os.path.dirname(new_path), exist_ok=True)
+        if os.path.exists(new_path):
+            os.remove(old_path)
+        else:
+            os.replace(old_path, new_path)
+
+        OpportunityFile.objects.filter(pk=opportunity_file.pk).update(
+            file=new_name, original_name=opportunity_file.original_name or os.path.basename(old_name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0012_opportunityfile_original_name'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_to_blobs, migrations.RunPython.noop),
+    ]
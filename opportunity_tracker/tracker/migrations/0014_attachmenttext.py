@@ -0,0 +1,29 @@
+# Generated by Django 5.1.2 on 2026-10-19 13:37
+
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0013_move_attachments_to_blobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttachmentText',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(db_index=True, max_length=64)),
+                ('text', models.TextField(blank=True)),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(blank=True, null=True)),
+                ('extracted_at', models.DateTimeField(auto_now=True)),
+                ('file', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='text', to='tracker.opportunityfile')),
+            ],
+            options={
+                'db_table': 'attachment_texts',
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    # GIN indexes only exist on PostgreSQL; other backends fall back to LIKE queries
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS attachment_texts_search_idx "
+            "ON attachment_texts USING gin (search_vector)")
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS attachment_texts_search_idx")
+
+
+def schedule_backfill(apps, schema_editor):
+    CrontabSchedule = apps.get_model('django_celery_beat', 'CrontabSchedule')
+    PeriodicTask = apps.get_model('django_celery_beat', 'PeriodicTask')
+
+    schedule, _ = CrontabSchedule.objects.get_or_create(
+        minute='15', hour='2', day_of_week='*', day_of_month='*', month_of_year='*')
+    PeriodicTask.objects.get_or_create(
+        name="Index attachment text",
+        defaults={'task': 'tracker.tasks.index_attachments', 'crontab': schedule},
+    )
+
+
+def unschedule_backfill(apps, schema_editor):
+    PeriodicTask = apps.get_model('django_celery_beat', 'PeriodicTask')
+    PeriodicTask.objects.filter(task='tracker.tasks.index_attachments').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0014_attachmenttext'),
+        ('django_celery_beat', '0019_alter_periodictasks_options'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(schedule_backfill, unschedule_backfill),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations
+
+
+def create_gc_task(apps, schema_editor):
+    CrontabSchedule = apps.get_model('django_celery_beat', 'CrontabSchedule')
+    PeriodicTask = apps.get_model('django_celery_beat', 'PeriodicTask')
+
+    schedule, _ = CrontabSchedule.objects.get_or_create(
+        minute='45', hour='3', day_of_week='*', day_of_month='*', month_of_year='*')
+    PeriodicTask.objects.get_or_create(
+        name="Collect orphaned attachment files",
+        defaults={'task': 'tracker.tasks.collect_orphan_files', 'crontab': schedule},
+    )
+
+
+def delete_gc_task(apps, schema_editor):
+    PeriodicTask = apps.get_model('django_celery_beat', 'PeriodicTask')
+    PeriodicTask.objects.filter(task='tracker.tasks.collect_orphan_files').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0015_attachmenttext_search_index'),
+        ('django_celery_beat', '0019_alter_periodictasks_options'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_gc_task, delete_gc_task),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.2 on 2026-10-19 14:05
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0016_schedule_collect_orphan_files'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('resource', models.CharField(choices=[('opportunity', 'Opportunities'), ('funding_agency', 'Funding agencies'), ('client', 'Clients'), ('institute', 'Institutes'), ('unit', 'Units')], max_length=20)),
+                ('file', models.FileField(help_text='CSV or XLSX with the same columns as the admin import.', upload_to='imports/%Y/%m/')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('validating', 'Validating'), ('valid', 'Ready to import'), ('invalid', 'Has errors'), ('importing', 'Importing'), ('done', 'Imported'), ('failed', 'Failed')], db_index=True, default='pending', max_length=10)),
+                ('total_rows', models.PositiveIntegerField(default=0)),
+                ('processed_rows', models.PositiveIntegerField(default=0)),
+                ('totals', models.JSONField(blank=True, default=dict)),
+                ('errors', models.JSONField(blank=True, default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='import_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'import_jobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
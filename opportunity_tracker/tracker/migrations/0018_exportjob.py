@@ -0,0 +1,39 @@
+# Generated by Django 5.1.2 on 2026-10-19 14:11
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0017_importjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('model', models.CharField(max_length=100)),
+                ('query', models.TextField(blank=True)),
+                ('resource_index', models.PositiveSmallIntegerField(default=0)),
+                ('file_format', models.CharField(max_length=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Ready'), ('failed', 'Failed')], db_index=True, default='pending', max_length=10)),
+                ('file', models.FileField(blank=True, upload_to='exports/%Y/%m/')),
+                ('row_count', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('expires_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='export_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'export_jobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations
+
+
+def create_expiry_task(apps, schema_editor):
+    CrontabSchedule = apps.get_model('django_celery_beat', 'CrontabSchedule')
+    PeriodicTask = apps.get_model('django_celery_beat', 'PeriodicTask')
+
+    schedule, _ = CrontabSchedule.objects.get_or_create(
+        minute='20', hour='*', day_of_week='*', day_of_month='*', month_of_year='*')
+    PeriodicTask.objects.get_or_create(
+        name="Expire admin exports",
+        defaults={'task': 'tracker.tasks.expire_export_jobs', 'crontab': schedule},
+    )
+
+
+def delete_expiry_task(apps, schema_editor):
+    PeriodicTask = apps.get_model('django_celery_beat', 'PeriodicTask')
+    PeriodicTask.objects.filter(task='tracker.tasks.expire_export_jobs').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0018_exportjob'),
+        ('django_celery_beat', '0019_alter_periodictasks_options'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_expiry_task, delete_expiry_task),
+    ]
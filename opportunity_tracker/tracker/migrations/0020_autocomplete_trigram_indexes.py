@@ -0,0 +1,46 @@
+from django.db import migrations
+
+# (table, column) pairs searched by the autocomplete endpoint
+SEARCHED_COLUMNS = [
+    ('funding_agency', 'code'), ('funding_agency', 'name'),
+    ('client', 'code'), ('client', 'name'),
+    ('institute', 'code'), ('institute', 'name'),
+    ('country', 'code'), ('country', 'name'),
+    ('accounts_user', 'username'), ('accounts_user', 'first_name'),
+    ('accounts_user', 'last_name'),
+]
+
+
+def _index_name(table, column):
+    return f'{table}_{column}_trgm_idx'
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # istartswith compiles to UPPER(col::text) LIKE 'TERM%'; trigram indexes on that
+    # expression serve it (and infix searches) on PostgreSQL only
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table, column in SEARCHED_COLUMNS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {_index_name(table, column)} '
+            f'ON {table} USING gin ((UPPER({column}::text)) gin_trgm_ops)')
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, column in SEARCHED_COLUMNS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {_index_name(table, column)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0019_schedule_expire_export_jobs'),
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,37 @@
+import os
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def mark_rendered_previews(apps, schema_editor):
+    """Record the thumbnails already in the preview cache."""
+    from tracker.helpers.previews import preview_path
+
+    OpportunityFile = apps.get_model('tracker', 'OpportunityFile')
+    rendered = [opportunity_file.pk for opportunity_file in OpportunityFile.objects.only('file').iterator()
+                if os.path.exists(preview_path(opportunity_file.file.name))]
+    OpportunityFile.objects.filter(pk__in=rendered).update(
+        preview_ready_at=django.utils.timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0020_autocomplete_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='opportunityfile',
+            name='uploaded_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='opportunityfile',
+            name='preview_ready_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(mark_rendered_previews, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 import os
 from typing import Any
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 import uuid
 from django.contrib.auth.models import User
@@ -8,6 +9,8 @@ import re
 from django.core.validators import MaxValueValidator
 from datetime import timedelta
 
+from .helpers.storage import get_attachment_storage
+
 
 class Entity(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -233,15 +236,189 @@ class Opportunity(models.Model):
 class OpportunityFile(models.Model):
     opportunity = models.ForeignKey(
         Opportunity, related_name="Files", on_delete=models.CASCADE)
-    file = models.FileField(upload_to=get_file_upload_path)
+    # Content-addressed blob, possibly shared with other opportunities
+    file = models.FileField(upload_to=get_file_upload_path,
+                            storage=get_attachment_storage, max_length=255)
+    original_name = models.CharField(max_length=255, blank=True)
+    uploaded_at = models.DateTimeField(auto_now_add=True)
+    # Set by the preview task once the thumbnail is rendered
+    preview_ready_at = models.DateTimeField(blank=True, null=True)
 
     class Meta:
         db_table = "opportunity_files"
 
+    def __str__(self):
+        return self.display_name
+
+    @property
+    def display_name(self):
+        return self.original_name or os.path.basename(self.file.name)
+
+    @property
+    def preview_url(self):
+        """URL of the cached thumbnail, or None until the preview task has rendered it."""
+        from .helpers.previews import preview_path, preview_url
+
+        if self.file and os.path.exists(preview_path(self.file.name)):
+            return preview_url(self.file.name)
+        return None
+
+    def save(self, *args, **kwargs):
+        if not self.original_name and self.file:
+            # Taken before the storage renames the file after its hash
+            self.original_name = os.path.basename(self.file.name)[:255]
+        super().save(*args, **kwargs)
+
+    def copy_to(self, opportunity):
+        """Attach the same content to another opportunity without copying it."""
+        return OpportunityFile.objects.create(
+            opportunity=opportunity, file=self.file.name, original_name=self.original_name)
+
+
+class AttachmentText(models.Model):
+    """Extracted text of an attachment, searched instead of opening the files."""
+    file = models.OneToOneField(
+        OpportunityFile, on_delete=models.CASCADE, related_name="text")
+    # Blob the text was extracted from; a different value means it is stale
+    content_hash = models.CharField(max_length=64, db_index=True)
+    text = models.TextField(blank=True)
+    # Maintained on PostgreSQL only, with a GIN index (see migration 0015)
+    search_vector = SearchVectorField(blank=True, null=True)
+    extracted_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "attachment_texts"
+
+    def __str__(self):
+        return f"Text of {self.file}"
+
+
+class FileUpload(models.Model):
+    """Resumable upload session; the file is assembled chunk by chunk on disk."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="file_uploads")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = "file_uploads"
+
+    def __str__(self):
+        return self.filename
+
+    @property
+    def path(self):
+        return os.path.join(settings.FILE_UPLOAD_SESSION_DIR, f"{self.id}.part")
+
+    @property
+    def is_complete(self):
+        return self.completed_at is not None
+
     def delete(self, *args, **kwargs):
-        if self.file:
-            if os.path.isfile(self.file.path):
-                os.remove(self.file.path)
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+        super().delete(*args, **kwargs)
+
+
+class ImportJob(models.Model):
+    """Admin import validated in parallel chunks and applied in one transaction.
+
+    See tracker.helpers.import_jobs and the import tasks.
+    """
+    RESOURCES = [
+        ("opportunity", "Opportunities"),
+        ("funding_agency", "Funding agencies"),
+        ("client", "Clients"),
+        ("institute", "Institutes"),
+        ("unit", "Units"),
+    ]
+    STATUS = [
+        ("pending", "Pending"),
+        ("validating", "Validating"),
+        ("valid", "Ready to import"),
+        ("invalid", "Has errors"),
+        ("importing", "Importing"),
+        ("done", "Imported"),
+        ("failed", "Failed"),
+    ]
+    RUNNING = ("pending", "validating", "importing")
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    resource = models.CharField(max_length=20, choices=RESOURCES)
+    file = models.FileField(upload_to="imports/%Y/%m/",
+                            help_text="CSV or XLSX with the same columns as the admin import.")
+    status = models.CharField(max_length=10, choices=STATUS, default="pending", db_index=True)
+    total_rows = models.PositiveIntegerField(default=0)
+    processed_rows = models.PositiveIntegerField(default=0)
+    # Row counts by import type ("new", "update", "skip", "invalid", ...)
+    totals = models.JSONField(default=dict, blank=True)
+    # [{"row": 12, "errors": ["..."]}, ...] merged from all chunks; row is None for file-level errors
+    errors = models.JSONField(default=list, blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="import_jobs")
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = "import_jobs"
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.get_resource_display()} import of {os.path.basename(self.file.name)}"
+
+    @property
+    def is_running(self):
+        return self.status in self.RUNNING
+
+    @property
+    def progress(self):
+        """Validated rows in percent."""
+        if not self.total_rows:
+            return 100 if self.status not in self.RUNNING else 0
+        return min(100, self.processed_rows * 100 // self.total_rows)
+
+
+class ExportJob(models.Model):
+    """Admin changelist export written to a file by a Celery task.
+
+    See tracker.helpers.exports; the file is removed once `expires_at` passes.
+    """
+    STATUS = [
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("done", "Ready"),
+        ("failed", "Failed"),
+    ]
 
-        # Now we will delete the record from the db
-        super(OpportunityFile, self).delete(*args, **kwargs)
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # "app_label.model_name" of the exported admin
+    model = models.CharField(max_length=100)
+    # Changelist query string, carrying the filters, search and ordering
+    query = models.TextField(blank=True)
+    resource_index = models.PositiveSmallIntegerField(default=0)
+    file_format = models.CharField(max_length=10)
+    status = models.CharField(max_length=10, choices=STATUS, default="pending", db_index=True)
+    file = models.FileField(upload_to="exports/%Y/%m/", blank=True)
+    row_count = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="export_jobs")
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    expires_at = models.DateTimeField(blank=True, null=True, db_index=True)
+
+    class Meta:
+        db_table = "export_jobs"
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.model} export ({self.file_format.upper()})"
+
+    @property
+    def filename(self):
+        return f"{self.model.split('.')[-1]}-{self.created_at:%Y-%m-%d}.{self.file_format}"
@@ -1,59 +1,305 @@
-import uuid
-from import_export import resources
-from .models import Client, FundingAgency, Institute, Unit
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from import_export import fields, resources, widgets
+from import_export.results import RowResult
 
+from .helpers.reference_cache import bump_version
+from .models import Client, Country, Currency, FundingAgency, Institute, Opportunity, Unit
+
+LOOKUP_CHUNK_SIZE = 500
+
+
+class LookupForeignKeyWidget(widgets.ForeignKeyWidget):
+    """ForeignKeyWidget answered from a map loaded once, not one query per row.
+
+    The resource calls load() in before_import; until then the widget
+    behaves like ForeignKeyWidget.
+    """
+    lookup = None
+
+    def load(self):
+        self.lookup = {str(getattr(obj, self.field)): obj
+                       for obj in self.get_queryset(None, None)}
+
+    def clean(self, value, row=None, **kwargs):
+        if self.lookup is None:
+            return super().clean(value, row, **kwargs)
+        if value is None or str(value).strip() == "":
+            return None
+        try:
+            return self.lookup[str(value).strip()]
+        except KeyError:
+            raise ValueError(
+                f"{self.model._meta.verbose_name.capitalize()} '{value}' does not exist")
+
+
+class LookupManyToManyWidget(widgets.ManyToManyWidget):
+    """ManyToManyWidget returning primary keys from a map loaded once.
+
+    Cleans to a list of pks rather than a queryset, ready to be written as
+    through rows in bulk.
+    """
+    lookup = None
+
+    def load(self):
+        self.lookup = {str(key): pk for key, pk in self.model.objects.values_list(self.field, "pk")}
+        self.keys = {pk: key for key, pk in self.lookup.items()}
+
+    def render_pks(self, pks):
+        return self.separator.join(self.keys[pk] for pk in pks)
+
+    def clean(self, value, row=None, **kwargs):
+        if self.lookup is None:
+            return super().clean(value, row, **kwargs)
+        if not value:
+            return []
+        if isinstance(value, (float, int)):
+            keys = [str(int(value))]
+        else:
+            keys = [key.strip() for key in value.split(self.separator) if key.strip()]
+        missing = [key for key in keys if key not in self.lookup]
+        if missing:
+            raise ValueError(
+                f"Unknown {self.model._meta.verbose_name_plural}: {', '.join(missing)}")
+        return [self.lookup[key] for key in keys]
+
+
+class PendingManyToManyField(fields.Field):
+    """Many-to-many field written in bulk after the import.
+
+    The resource keeps the cleaned pks on the instance as `_pending_m2m`
+    until then, and the import preview renders them from there instead of
+    querying the relation for every row.
+    """
+
+    def export(self, instance, **kwargs):
+        pending = getattr(instance, "_pending_m2m", {})
+        if self.attribute in pending:
+            return self.widget.render_pks(pending[self.attribute])
+        if instance._state.adding:
+            return ""
+        return super().export(instance, **kwargs)
+
+
+class CodeResource(resources.ModelResource):
+    """Base resource for reference data identified by a unique `code`.
+
+    All existing rows are loaded once in `before_import` and looked up by
+    code, instead of one query per row; new rows get their UUID from the
+    model default. Rows are written with bulk_create/bulk_update in batches
+    of `batch_size`.
+    """
+
+    def before_import(self, dataset, **kwargs):
+        super().before_import(dataset, **kwargs)
+        model = self._meta.model
+        self.existing = {instance.code: instance for instance in model.objects.all()}
+        self.seen_codes = set()
 
-class ClientResource(resources.ModelResource):
     def before_import_row(self, row, row_number=None, **kwargs):
-        if not row.get("code"):
-            raise ValueError("Each client must have a unique 'code'")
+        code = self.fields["code"].clean(row)
+        if not code:
+            raise ValueError(
+                f"Each {self._meta.model._meta.verbose_name} must have a unique 'code'")
+        # Bulk inserts would only fail on the duplicate when the batch is flushed
+        if code in self.seen_codes:
+            raise ValueError(f"Code '{code}' appears more than once in the file")
+        self.seen_codes.add(code)
+
+    def get_instance(self, instance_loader, row):
+        return self.existing.get(self.fields["code"].clean(row))
 
-        if not Client.objects.filter(code=row["code"]).exists():
-            row["id"] = str(uuid.uuid4())
+    def after_import(self, dataset, result, **kwargs):
+        super().after_import(dataset, result, **kwargs)
+        # Bulk writes send no post_save, so the cached choices are dropped here
+        if not self._is_dry_run(kwargs):
+            bump_version()
 
     class Meta:
-        model = Client
         import_id_fields = ("code", )
-        fields = ("code", "name", "client_type")
+        use_bulk = True
+        batch_size = 1000
 
 
-class FundingAgencyResource(resources.ModelResource):
-    def before_import_row(self, row, row_number=None, **kwargs):
-        if not row.get("code"):
-            raise ValueError("Each funding agency must have a unique 'code'")
+class ClientResource(CodeResource):
+    class Meta:
+        model = Client
+        fields = ("code", "name", "client_type")
 
-        if not FundingAgency.objects.filter(code=row["code"]).exists():
-            row["id"] = str(uuid.uuid4())
 
+class FundingAgencyResource(CodeResource):
     class Meta:
         model = FundingAgency
-        import_id_fields = ("code", )
         fields = ("code", "name")
 
 
-class InstituteResource(resources.ModelResource):
-    def before_import_row(self, row, row_number=None, **kwargs):
-        if not row.get("code"):
-            raise ValueError("Each institute must have a unique 'code'")
+class InstituteResource(CodeResource):
+    class Meta:
+        model = Institute
+        fields = ("code", "name")
 
-        if not Institute.objects.filter(code=row["code"]).exists():
-            row["id"] = str(uuid.uuid4())
 
+class UnitResource(CodeResource):
     class Meta:
-        model = Institute
-        import_id_fields = ("code", )
+        model = Unit
         fields = ("code", "name")
 
 
-class UnitResource(resources.ModelResource):
+class OpportunityResource(resources.ModelResource):
+    """Bulk import of opportunities.
+
+    Related records are referenced by code (users by username) and resolved
+    from lookup maps loaded once per import. Rows are written with
+    bulk_create/bulk_update and the countries and partners through rows are
+    replaced in bulk once all rows are in. Bulk writes send no post_save or
+    m2m_changed signals, so no per-row notification goes out; one import
+    summary is queued after the import is committed instead.
+    """
+    funding_agency = fields.Field(
+        attribute="funding_agency", column_name="funding_agency",
+        widget=LookupForeignKeyWidget(FundingAgency, field="code"))
+    client = fields.Field(
+        attribute="client", column_name="client",
+        widget=LookupForeignKeyWidget(Client, field="code"))
+    lead_unit = fields.Field(
+        attribute="lead_unit", column_name="lead_unit",
+        widget=LookupForeignKeyWidget(Unit, field="code"))
+    lead_institute = fields.Field(
+        attribute="lead_institute", column_name="lead_institute",
+        widget=LookupForeignKeyWidget(Institute, field="code"))
+    currency = fields.Field(
+        attribute="currency", column_name="currency",
+        widget=LookupForeignKeyWidget(Currency, field="code"))
+    created_by = fields.Field(
+        attribute="created_by", column_name="created_by",
+        widget=LookupForeignKeyWidget(get_user_model(), field="username"))
+    proposal_lead = fields.Field(
+        attribute="proposal_lead", column_name="proposal_lead",
+        widget=LookupForeignKeyWidget(get_user_model(), field="username"))
+    countries = PendingManyToManyField(
+        attribute="countries", column_name="countries",
+        widget=LookupManyToManyWidget(Country, field="code"))
+    partners = PendingManyToManyField(
+        attribute="partners", column_name="partners",
+        widget=LookupManyToManyWidget(Institute, field="code"))
+
+    M2M_FIELDS = ("countries", "partners")
+
+    def before_import(self, dataset, **kwargs):
+        super().before_import(dataset, **kwargs)
+        for field in self.fields.values():
+            if isinstance(field.widget, (LookupForeignKeyWidget, LookupManyToManyWidget)):
+                field.widget.load()
+
+        ref_nos = [ref_no for ref_no in dataset["ref_no"] if ref_no] if "ref_no" in dataset.headers else []
+        self.existing = {}
+        for start in range(0, len(ref_nos), LOOKUP_CHUNK_SIZE):
+            chunk = ref_nos[start:start + LOOKUP_CHUNK_SIZE]
+            self.existing.update(
+                (opportunity.ref_no, opportunity)
+                for opportunity in Opportunity.objects.filter(
+                    ref_no__in=chunk).prefetch_related(*self.M2M_FIELDS))
+        self.seen_ref_nos = set()
+        self.pending_m2m = {name: {} for name in self.M2M_FIELDS}
+
     def before_import_row(self, row, row_number=None, **kwargs):
-        if not row.get("code"):
-            raise ValueError("Each unit must have a unique 'code'")
+        ref_no = self.fields["ref_no"].clean(row)
+        if not ref_no:
+            raise ValueError("Each opportunity must have a 'ref_no'")
+        if ref_no in self.seen_ref_nos:
+            raise ValueError(f"Reference '{ref_no}' appears more than once in the file")
+        self.seen_ref_nos.add(ref_no)
 
-        if not Unit.objects.filter(code=row["code"]).exists():
-            row["id"] = str(uuid.uuid4())
+    def get_instance(self, instance_loader, row):
+        return self.existing.get(self.fields["ref_no"].clean(row))
+
+    def before_save_instance(self, instance, row, **kwargs):
+        user = kwargs.get("user")
+        if instance._state.adding:
+            if not instance.created_by_id and user:
+                instance.created_by = user
+        else:
+            # bulk_update skips auto_now
+            instance.updated_at = timezone.now()
+            if user:
+                instance.updated_by = user
+
+    def import_instance(self, instance, row, **kwargs):
+        errors = {}
+        try:
+            super().import_instance(instance, row, **kwargs)
+        except ValidationError as e:
+            errors = e.update_error_dict(errors)
+
+        # ModelResource skips many-to-many fields with use_bulk; clean them here
+        # so unknown codes are reported like any other invalid value
+        instance._pending_m2m = {}
+        for name in self.M2M_FIELDS:
+            field = self.fields[name]
+            if field.column_name not in row:
+                continue
+            try:
+                instance._pending_m2m[name] = field.clean(row)
+            except ValueError as e:
+                errors[name] = ValidationError(str(e), code="invalid")
+        if errors:
+            raise ValidationError(errors)
+
+    def save_m2m(self, instance, row, **kwargs):
+        # Written in after_import, once every row exists
+        for name, pks in instance._pending_m2m.items():
+            self.pending_m2m[name][instance.pk] = pks
+
+    def get_bulk_update_fields(self):
+        return [name for name in super().get_bulk_update_fields()
+                if name not in self.M2M_FIELDS] + ["updated_at", "updated_by"]
+
+    def after_import(self, dataset, result, **kwargs):
+        super().after_import(dataset, result, **kwargs)
+        if not self._is_using_transactions(kwargs) and self._is_dry_run(kwargs):
+            return
+        for name, values in self.pending_m2m.items():
+            self._replace_m2m(name, values)
+
+        if not self._is_dry_run(kwargs) and not result.has_errors():
+            self._queue_summary(result)
+
+    def _replace_m2m(self, name, values):
+        relation = getattr(Opportunity, name)
+        through = relation.through
+        source = f"{relation.field.m2m_field_name()}_id"
+        target = f"{relation.field.m2m_reverse_field_name()}_id"
+        opportunity_ids = list(values)
+        for start in range(0, len(opportunity_ids), LOOKUP_CHUNK_SIZE):
+            through.objects.filter(**{
+                f"{source}__in": opportunity_ids[start:start + LOOKUP_CHUNK_SIZE]}).delete()
+        through.objects.bulk_create(
+            [through(**{source: opportunity_id, target: related_id})
+             for opportunity_id, related_ids in values.items()
+             for related_id in dict.fromkeys(related_ids)],
+            batch_size=self._meta.batch_size)
+
+    def _queue_summary(self, result):
+        from .tasks import send_import_summary
+
+        created_ids = [str(row.object_id) for row in result.rows
+                       if row.import_type == RowResult.IMPORT_TYPE_NEW]
+        updated = result.totals[RowResult.IMPORT_TYPE_UPDATE]
+        if created_ids or updated:
+            transaction.on_commit(lambda: send_import_summary.delay(created_ids, updated))
 
     class Meta:
-        model = Unit
-        import_id_fields = ("code", )
-        fields = ("code", "name")
+        model = Opportunity
+        import_id_fields = ("ref_no", )
+        fields = (
+            "ref_no", "title", "opp_type", "status", "funding_agency", "client",
+            "countries", "due_date", "clarification_date", "intent_bid_date",
+            "duration_months", "notes", "created_by", "lead_unit", "proposal_lead",
+            "lead_institute", "partners", "submission_date", "currency",
+            "proposal_amount", "net_amount", "result_note", "submission_validity",
+            "result_date", "is_noncompetitive",
+        )
+        use_bulk = True
+        batch_size = 500
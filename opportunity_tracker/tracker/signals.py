@@ -3,15 +3,57 @@ import os
 from urllib.parse import urljoin
 from django.conf import settings
 from django.db import transaction
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.template.loader import render_to_string
 from django.urls import reverse
 from notification.models import NotificationChannel, NotificationSubscription, OpportunitySubscription
-from .models import Opportunity
+from .helpers.reference_cache import bump_version, is_reference_model
+from .models import ExportJob, Opportunity, OpportunityFile
 from notification.tasks import execute_channel_send
 
 
+@receiver(post_save, sender=OpportunityFile)
+def queue_file_preview(sender, instance, created, **kwargs):
+    from .tasks import extract_attachment_text, generate_file_preview
+
+    if created:
+        transaction.on_commit(lambda: generate_file_preview.delay(instance.id))
+        transaction.on_commit(lambda: extract_attachment_text.delay(instance.id))
+
+
+@receiver(post_delete, sender=OpportunityFile)
+def release_attachment_blob(sender, instance, **kwargs):
+    """Queue the blob for deletion once the delete is committed.
+
+    A receiver rather than OpportunityFile.delete so that cascade and
+    queryset deletes release their blobs too.
+    """
+    from .helpers.archive_cache import invalidate_archives
+    from .tasks import delete_attachment_blob
+
+    invalidate_archives(instance.opportunity_id)
+    if instance.file:
+        name = instance.file.name
+        transaction.on_commit(lambda: delete_attachment_blob.delay(name))
+
+
+@receiver(post_delete, sender=ExportJob)
+def delete_export_file(sender, instance, **kwargs):
+    """Delete the export's file once the delete is committed, queryset deletes included."""
+    if instance.file:
+        storage, name = instance.file.storage, instance.file.name
+        transaction.on_commit(lambda: storage.delete(name))
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_reference_data(sender, **kwargs):
+    """Reload cached reference data after admin edits, imports and deletes."""
+    if is_reference_model(sender):
+        bump_version()
+
+
 @receiver(post_save, sender=Opportunity)
 def notify_new_opportunity(sender, instance, created, **kwargs):
     try:
@@ -93,5 +135,6 @@ def _send_opportunity_update_notification(opportunity):
     short_message = f"An opportunity you are subscribed [{opportunity.title}] to has been updated."
 
     result = execute_channel_send.delay(subscription_ids, OpportunitySubscription.__name__, subject=f"Update: {opportunity.title}",
-                                        email_message=email_message, short_message=short_message)
+                                        email_message=email_message, short_message=short_message,
+                                        opportunity_id=str(opportunity.id))
     return result
@@ -1,35 +1,66 @@
+import os
 from urllib.parse import urljoin
-from celery import shared_task
+from celery import chord, shared_task
 import datetime
 import zoneinfo
 
 from django.conf import settings
+from django.db.models import F
 from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils import timezone
 
 from notification.models import NotificationSubscription
-from notification.tasks import execute_channel_send
+from notification.tasks import execute_channel_send, notify_user
 
-from .models import Opportunity
+from .helpers.archive_cache import evict_archives
+from .helpers.orphans import blob_age, collect_orphans, delete_blob
+from .helpers.storage import local_path
+from .helpers import previews
+from .helpers.attachment_search import update_search_vector
+from .helpers import import_jobs
+from .helpers.exports import write_export
+from .helpers.text_extraction import can_extract, extract_text
+from .models import (AttachmentText, ExportJob, FileUpload, ImportJob, Opportunity,
+                     OpportunityFile)
+
+
+def get_weekly_summary_opportunities(date_from):
+    """Return the new opportunities as a list, with everything the summary renders loaded."""
+    return list(Opportunity.objects.filter(
+        created_at__gte=date_from, status=1).select_related(
+            'funding_agency').prefetch_related('countries').order_by('-created_at'))
 
 
 @shared_task
-def send_weekly_summary(channel: str, days: int = 7):
+def send_weekly_summary(channel=None, days: int = 7):
+    """Send the summary to the subscribers of every channel in one run.
+
+    `channel` is a channel name or a list of names and defaults to
+    WEEKLY_SUMMARY_CHANNELS. The content is the same for all channels, so
+    the opportunities are loaded and the template rendered only once.
+    """
+    if channel is None:
+        channels = settings.WEEKLY_SUMMARY_CHANNELS
+    elif isinstance(channel, str):
+        channels = [channel]
+    else:
+        channels = list(channel)
+    channel_names = ", ".join(channels)
+
     # Convert to local timezone for display
     local_time = timezone.now().astimezone(zoneinfo.ZoneInfo(settings.TIME_ZONE))
     print(
-        f"📬 Sending a weekly summary for the channel {channel} at {local_time}")
+        f"📬 Sending a weekly summary for the channel {channel_names} at {local_time}")
     date_from = timezone.now() - datetime.timedelta(days=days)
-    opportunities = Opportunity.objects.filter(
-        created_at__gte=date_from, status=1).order_by('-created_at')
+    opportunities = get_weekly_summary_opportunities(date_from)
 
-    if not opportunities.exists():
+    if not opportunities:
         return "No new opportunities to send."
 
     # Get all the active subscriptions
     subscriptions = NotificationSubscription.objects.filter(
-        channel__name=channel, is_active=True)
+        channel__name__in=channels, is_active=True)
     subscription_ids = list(subscriptions.values_list('id', flat=True))
 
     context = {
@@ -41,9 +72,270 @@ def send_weekly_summary(channel: str, days: int = 7):
     email_message = render_to_string(
         'tracker/emails/weekly_summary.html', context)
 
-    short_message = f"{opportunities.count()} new opportunities created this week."
+    short_message = f"{len(opportunities)} new opportunities created this week."
+
+    if subscription_ids:
+        execute_channel_send.delay(subscription_ids, NotificationSubscription.__name__, subject="Your Weekly Summary",
+                                   email_message=email_message, short_message=short_message)
+
+    return f"Weekly summary sent to {len(subscription_ids)} subscribers for channel '{channel_names}'."
+
+
+@shared_task
+def send_import_summary(opportunity_ids, updated_count=0):
+    """Tell the new-opportunity channel about an admin import in one message.
+
+    Bulk imports send no per-row notification (see OpportunityResource).
+    """
+    channel_name = os.environ.get("NEW_OPPORTUNITY_ALERT_CHANNEL")
+    if not channel_name:
+        return "No channel configured."
+
+    subscription_ids = list(NotificationSubscription.objects.filter(
+        channel__name=channel_name, is_active=True).values_list('id', flat=True))
+    if not subscription_ids:
+        return "No active subscriptions."
 
-    execute_channel_send.delay(subscription_ids, NotificationSubscription.__name__, subject="Your Weekly Summary",
+    opportunities = list(Opportunity.objects.filter(id__in=opportunity_ids).select_related(
+        'funding_agency').prefetch_related('countries').order_by('due_date'))
+    context = {
+        'opportunities': opportunities,
+        'updated_count': updated_count,
+        'site_url': settings.SITE_URL,
+    }
+    email_message = render_to_string(
+        'tracker/emails/import_summary.html', context)
+    short_message = (f"{len(opportunities)} opportunities imported"
+                     f"{f', {updated_count} updated' if updated_count else ''}.")
+
+    execute_channel_send.delay(subscription_ids, NotificationSubscription.__name__,
+                               subject=f"Imported: {len(opportunities)} new opportunities",
                                email_message=email_message, short_message=short_message)
+    return f"Import summary sent to {len(subscription_ids)} subscribers."
+
+
+@shared_task
+def evict_archive_cache():
+    """Trim the attachment archive cache to ATTACHMENT_ARCHIVE_CACHE_MAX_SIZE."""
+    freed = evict_archives()
+    return f"{freed} bytes evicted from the archive cache."
+
+
+@shared_task
+def expire_file_uploads():
+    """Remove upload sessions that were never attached to an opportunity."""
+    expired = timezone.now() - datetime.timedelta(hours=settings.FILE_UPLOAD_EXPIRY_HOURS)
+    uploads = FileUpload.objects.filter(updated_at__lt=expired)
+    count = 0
+    for upload in uploads:
+        upload.delete()
+        count += 1
+    return f"{count} expired uploads removed."
+
+
+@shared_task(ignore_result=True)
+def delete_attachment_blob(name):
+    """Delete a blob after the last OpportunityFile referring to it is gone."""
+    # The same content may have been attached again since the delete was queued
+    if OpportunityFile.objects.filter(file=name).exists():
+        return f"{name} is still referenced."
+    # An identical upload in flight touches the blob before its row is committed;
+    # like collect_orphans, leave blobs inside the grace period to the next sweep
+    try:
+        if blob_age(name) < settings.ATTACHMENT_ORPHAN_GRACE_HOURS * 3600:
+            return f"{name} was modified recently, left to the orphan sweep."
+    except FileNotFoundError:
+        return f"{name} is already gone."
+    delete_blob(name)
+    return f"{name} deleted."
+
+
+@shared_task
+def collect_orphan_files(dry_run=False):
+    """Remove stored attachments without an OpportunityFile, see collect_orphans."""
+    return str(collect_orphans(dry_run=dry_run))
+
+
+@shared_task(ignore_result=True)
+def generate_file_preview(file_id):
+    """Render the thumbnail of an attachment.
+
+    Routed to the "previews" queue (CELERY_TASK_ROUTES), which a worker with
+    a small fixed concurrency consumes, so bulk uploads cannot starve the
+    notification tasks on the default queue.
+    """
+    opportunity_file = OpportunityFile.objects.filter(id=file_id).first()
+    if not opportunity_file or not previews.can_preview(opportunity_file.display_name):
+        return "Nothing to preview."
+
+    target_path = previews.preview_path(opportunity_file.file.name)
+    # preview_ready_at lets the detail pages' validators skip checking the cache
+    ready = OpportunityFile.objects.filter(id=file_id, preview_ready_at__isnull=True)
+    if os.path.exists(target_path):
+        ready.update(preview_ready_at=timezone.now())
+        return "Preview already cached."
+
+    with local_path(opportunity_file.file) as source_path:
+        created = previews.generate_preview(
+            source_path, opportunity_file.display_name, target_path)
+    if created:
+        ready.update(preview_ready_at=timezone.now())
+    return f"Preview {'created' if created else 'not available'} for {opportunity_file.display_name}."
+
+
+@shared_task(ignore_result=True)
+def extract_attachment_text(file_id):
+    """Store the text of an attachment in the search index.
 
-    return f"Weekly summary sent to {len(subscription_ids)} subscribers for channel '{channel}'."
+    Incremental: the text is keyed by the blob digest, so a file whose text
+    is current is skipped and a blob shared with another attachment is only
+    extracted once.
+    """
+    opportunity_file = OpportunityFile.objects.filter(
+        id=file_id).select_related("text").first()
+    if not opportunity_file or not can_extract(opportunity_file.display_name):
+        return "Nothing to extract."
+
+    content_hash = os.path.basename(opportunity_file.file.name)
+    current = getattr(opportunity_file, "text", None)
+    if current and current.content_hash == content_hash:
+        return "Text already indexed."
+
+    text = AttachmentText.objects.filter(
+        content_hash=content_hash).values_list("text", flat=True).first()
+    if text is None:
+        with local_path(opportunity_file.file) as source_path:
+            text = extract_text(source_path, opportunity_file.display_name)
+    if text is None:
+        return f"No text extracted from {opportunity_file.display_name}."
+
+    attachment_text, _ = AttachmentText.objects.update_or_create(
+        file=opportunity_file, defaults={"content_hash": content_hash, "text": text})
+    update_search_vector(attachment_text)
+    return f"Indexed {len(text)} characters of {opportunity_file.display_name}."
+
+
+@shared_task
+def index_attachments():
+    """Queue extraction for the attachments with missing or stale text."""
+    queued = 0
+    files = OpportunityFile.objects.values_list(
+        "id", "file", "original_name", "text__content_hash")
+    for file_id, name, original_name, content_hash in files.iterator():
+        if not can_extract(original_name or name):
+            continue
+        if content_hash != os.path.basename(name):
+            extract_attachment_text.delay(file_id)
+            queued += 1
+    return f"Queued text extraction for {queued} attachments."
+
+
+@shared_task
+def validate_import_job(job_id):
+    """Validate an admin import in parallel.
+
+    The file is parsed once and split into chunk files of
+    IMPORT_JOB_CHUNK_SIZE rows, each dry-run by its own validate_import_chunk
+    task on whichever workers are free; finish_import_validation merges their
+    results once all are done.
+    """
+    job = ImportJob.objects.get(pk=job_id)
+    try:
+        total, chunks = import_jobs.split_file(job, settings.IMPORT_JOB_CHUNK_SIZE)
+    except Exception as e:
+        ImportJob.objects.filter(pk=job_id).update(
+            status="failed", errors=[{"row": None, "errors": [str(e)]}], finished_at=timezone.now())
+        return f"Could not read {job.file.name}: {e}"
+
+    ImportJob.objects.filter(pk=job_id).update(
+        status="validating", total_rows=total, processed_rows=0, totals={}, errors=[])
+    if not chunks:
+        finish_import_validation([], str(job_id))
+    else:
+        chord(validate_import_chunk.s(str(job_id), start, stop, name)
+              for start, stop, name in chunks)(finish_import_validation.s(str(job_id)))
+    return f"Validating {total} rows in {len(chunks)} chunks."
+
+
+@shared_task
+def validate_import_chunk(job_id, start, stop, name):
+    """Dry-run one chunk file of an import job and report its progress."""
+    job = ImportJob.objects.select_related("created_by").get(pk=job_id)
+    result = import_jobs.validate_rows(job, start, name)
+    ImportJob.objects.filter(pk=job_id).update(processed_rows=F("processed_rows") + stop - start)
+    return result
+
+
+@shared_task
+def finish_import_validation(results, job_id):
+    """Merge the chunk results into the job's error report."""
+    totals, errors = import_jobs.merge_results(results)
+    ImportJob.objects.filter(pk=job_id).update(
+        status="invalid" if errors else "valid", totals=totals, errors=errors,
+        finished_at=timezone.now())
+    return f"{len(errors)} errors found."
+
+
+@shared_task
+def apply_import_job(job_id):
+    """Write a validated import job in a single transaction.
+
+    Queued by the admin, which moves the job from "valid" to "importing".
+    """
+    job = ImportJob.objects.select_related("created_by").get(pk=job_id)
+    if job.status != "importing":
+        return "Job is not ready to import."
+    result = import_jobs.apply_rows(job)
+
+    if result.has_errors() or result.has_validation_errors():
+        # Rolled back as a whole; the data changed since validation
+        errors = [{"row": number, "errors": [str(error.error) for error in row_errors]}
+                  for number, row_errors in result.row_errors()]
+        errors += [{"row": invalid.number, "errors": [str(invalid.error)]}
+                   for invalid in result.invalid_rows]
+        errors += [{"row": None, "errors": [str(error.error)]} for error in result.base_errors]
+        ImportJob.objects.filter(pk=job_id).update(
+            status="failed", errors=errors, finished_at=timezone.now())
+        return f"Import failed with {len(errors)} errors."
+
+    ImportJob.objects.filter(pk=job_id).update(
+        status="done", totals=dict(result.totals), finished_at=timezone.now())
+    return f"{result.totals['new']} created, {result.totals['update']} updated."
+
+
+@shared_task
+def run_export_job(job_id):
+    """Write an admin export to a file and email its owner the download link.
+
+    Rows are streamed from the database into the file, so the size of the
+    export is not bounded by memory or by the request timeout.
+    """
+    job = ExportJob.objects.select_related("created_by").get(pk=job_id)
+    ExportJob.objects.filter(pk=job_id).update(status="running")
+    try:
+        row_count = write_export(job)
+    except Exception as e:
+        ExportJob.objects.filter(pk=job_id).update(
+            status="failed", error=str(e), finished_at=timezone.now())
+        raise
+
+    now = timezone.now()
+    job.status, job.row_count, job.finished_at = "done", row_count, now
+    job.expires_at = now + datetime.timedelta(hours=settings.EXPORT_JOB_EXPIRY_HOURS)
+    job.save(update_fields=["status", "row_count", "file", "finished_at", "expires_at"])
+
+    context = {
+        'job': job,
+        'download_url': urljoin(settings.SITE_URL, reverse(
+            'admin:tracker_exportjob_download', args=[job.pk])),
+    }
+    notify_user.delay(job.created_by_id, subject=f"Your export is ready: {job.filename}",
+                      email_message=render_to_string('tracker/emails/export_ready.html', context))
+    return f"{row_count} rows exported to {job.file.name}."
+
+
+@shared_task
+def expire_export_jobs():
+    """Remove export files past their expiry."""
+    count, _ = ExportJob.objects.filter(expires_at__lt=timezone.now()).delete()
+    return f"{count} expired exports removed."
@@ -0,0 +1,50 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+
+from tracker.helpers.reference_cache import get_version
+
+register = template.Library()
+
+
+class OpportunityCacheNode(template.Node):
+    def __init__(self, nodelist, fragment_name, opportunity, vary_on):
+        self.nodelist = nodelist
+        self.fragment_name = fragment_name
+        self.opportunity = opportunity
+        self.vary_on = vary_on
+
+    def render(self, context):
+        opportunity = self.opportunity.resolve(context)
+        vary_on = [opportunity.pk, opportunity.updated_at.isoformat(), get_version(),
+                   *(var.resolve(context) for var in self.vary_on)]
+        key = make_template_fragment_key(f"opportunity:{self.fragment_name}", vary_on)
+        fragment = cache.get(key)
+        if fragment is None:
+            fragment = self.nodelist.render(context)
+            cache.set(key, fragment, settings.OPPORTUNITY_FRAGMENT_CACHE_TIMEOUT)
+        return fragment
+
+
+@register.tag
+def opportunity_cache(parser, token):
+    """Cache a fragment rendered for one opportunity.
+
+    Usage::
+
+        {% opportunity_cache "card" opportunity [vary_on ...] %}...{% endopportunity_cache %}
+
+    The key is made of the opportunity id, its updated_at, the reference
+    data version and any extra values the fragment shows, so saving the
+    opportunity or changing reference data renders it again.
+    """
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' takes a fragment name and an opportunity")
+    nodelist = parser.parse(("endopportunity_cache", ))
+    parser.delete_first_token()
+    fragment_name = bits[1].strip("\"'")
+    return OpportunityCacheNode(nodelist, fragment_name, parser.compile_filter(bits[2]),
+                                [parser.compile_filter(bit) for bit in bits[3:]])
@@ -11,18 +11,24 @@ This module tests:
 from datetime import date, timedelta
 from decimal import Decimal
 
+import tablib
+
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase, RequestFactory
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from tracker.forms import (
     LoginForm, OpportunityForm, UpdateOpportunityForm, UpdateStatusForm,
     SubmitProposalForm, OpportunitySearchForm, FundingAgencyForm, ClientForm,
-    FundingAgencyChoiceField, ClientChoiceField
+    FundingAgencyChoiceField, ClientChoiceField, ReferenceChoiceField
 )
+from tracker.helpers.reference_cache import bump_version, get_version
 from tracker.models import (
     FundingAgency, Client, Institute, Unit, Country, Currency, Opportunity
 )
+from tracker.resources import FundingAgencyResource
 
 User = get_user_model()
 
@@ -653,3 +659,100 @@ class ClientFormTest(TestCase):
         self.assertFalse(form.is_valid())
         self.assertIn('code', form.errors)
         self.assertIn('name', form.errors)
+
+
+class AutocompleteSelectTest(TestCase):
+    """Test cases for the autocomplete select widgets."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(username='creator', password='testpass123')
+        self.agencies = [FundingAgency.objects.create(code=f'FA{i}', name=f'Agency {i}')
+                         for i in range(5)]
+        self.institutes = [Institute.objects.create(code=f'IN{i}', name=f'Institute {i}')
+                           for i in range(3)]
+        self.opportunity = Opportunity.objects.create(
+            ref_no='OPP-AUTO', title='Autocomplete', opp_type='RFP',
+            created_by=self.user, funding_agency=self.agencies[2], status=1)
+        self.opportunity.partners.set(self.institutes[:2])
+
+    def test_renders_only_selected_options(self):
+        """Test that unselected reference rows are not rendered."""
+        form = UpdateOpportunityForm(instance=self.opportunity)
+
+        agency_html = str(form['funding_agency'])
+        partners_html = str(form['partners'])
+
+        self.assertIn('FA2 | Agency 2', agency_html)
+        self.assertNotIn('Agency 1', agency_html)
+        self.assertIn(f'data-ajax--url="{reverse("autocomplete", args=["funding_agency"])}"',
+                      agency_html)
+        self.assertEqual(partners_html.count('<option'), 2)
+        self.assertNotIn('Institute 2', partners_html)
+
+    def test_render_queries_do_not_grow_with_table(self):
+        """Test that rendering does not read the whole reference table."""
+        bump_version()
+        with CaptureQueriesContext(connection) as few:
+            str(UpdateOpportunityForm(instance=self.opportunity)['funding_agency'])
+        FundingAgency.objects.bulk_create(
+            [FundingAgency(code=f'MORE{i}', name=f'More {i}') for i in range(50)])
+        bump_version()
+        with CaptureQueriesContext(connection) as many:
+            html = str(UpdateOpportunityForm(instance=self.opportunity)['funding_agency'])
+
+        self.assertEqual(len(few), len(many))
+        self.assertEqual(html.count('<option'), 2)
+
+    def test_new_entity_tag_is_ignored(self):
+        """Test that a "new:" tag posted back does not break rendering."""
+        form = OpportunityForm(data={'title': 'New', 'funding_agency': 'new:Someone'})
+
+        self.assertNotIn('Someone', str(form['funding_agency']))
+
+
+class ReferenceChoiceFieldTest(TestCase):
+    """Test cases for choices read from the reference data cache."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.unit = Unit.objects.create(code='RU1', name='Reference Unit')
+
+    def _choices(self, queryset=None):
+        field = ReferenceChoiceField(queryset=queryset or Unit.objects.all())
+        return list(field.choices)
+
+    def test_cached_choices_need_no_queries(self):
+        """Test that choices are only loaded once per version."""
+        self._choices()
+        with self.assertNumQueries(0):
+            choices = self._choices()
+        self.assertIn((self.unit.pk, 'Reference Unit'), choices)
+
+    def test_save_and_delete_reload_choices(self):
+        """Test that saving or deleting a row bumps the version."""
+        version = get_version()
+        self._choices()
+
+        added = Unit.objects.create(code='RU2', name='Added Unit')
+        self.assertGreater(get_version(), version)
+        self.assertIn((added.pk, 'Added Unit'), self._choices())
+
+        added.delete()
+        self.assertNotIn((added.pk, 'Added Unit'), self._choices())
+
+    def test_bulk_import_reloads_choices(self):
+        """Test that bulk imports, which send no signals, bump the version."""
+        field = FundingAgencyChoiceField(queryset=FundingAgency.objects.all())
+        list(field.choices)
+        dataset = tablib.Dataset(('ZZREF', 'Imported Agency'), headers=['code', 'name'])
+
+        FundingAgencyResource().import_data(dataset)
+
+        self.assertIn('ZZREF | Imported Agency', [label for _, label in field.choices])
+
+    def test_filtered_queryset_is_not_cached(self):
+        """Test that a narrowed queryset still reads from the database."""
+        Unit.objects.create(code='RU3', name='Other Unit')
+        choices = self._choices(Unit.objects.filter(code='RU3'))
+        self.assertEqual([label for _, label in choices], ['---------', 'Other Unit'])
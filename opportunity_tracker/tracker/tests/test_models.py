@@ -10,8 +10,10 @@ This module tests:
 """
 from datetime import date, timedelta
 from decimal import Decimal
+import hashlib
 import os
 import uuid
+from unittest.mock import patch
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
@@ -24,6 +26,7 @@ from tracker.models import (
     FundingAgency, Client, Institute, Unit, Staff, Country,
     Currency, Opportunity, OpportunityFile, get_file_upload_path
 )
+from tracker.tasks import delete_attachment_blob
 
 User = get_user_model()
 
@@ -604,8 +607,62 @@ class OpportunityFileModelTest(TestCase):
         )
 
         self.assertEqual(opp_file.opportunity, self.opportunity)
-        self.assertTrue(opp_file.file.name.startswith(
-            "opportunities/OPP_2024_010/"))
+        # Stored once under the SHA-256 of its content, named for display
+        digest = hashlib.sha256(b"file_content").hexdigest()
+        self.assertEqual(opp_file.file.name,
+                         f"blobs/{digest[:2]}/{digest[2:4]}/{digest}")
+        self.assertEqual(opp_file.original_name, "document.pdf")
+
+    @override_settings(ATTACHMENT_ORPHAN_GRACE_HOURS=0)
+    def test_identical_files_share_one_blob(self):
+        """Test that the same content attached twice is stored once."""
+        first = OpportunityFile.objects.create(
+            opportunity=self.opportunity, file=SimpleUploadedFile("tor.pdf", b"terms"))
+        second = OpportunityFile.objects.create(
+            opportunity=self.opportunity, file=SimpleUploadedFile("annex.pdf", b"terms"))
+
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertEqual(second.display_name, "annex.pdf")
+
+        name, storage = second.file.name, second.file.storage
+        with patch('tracker.tasks.delete_attachment_blob.delay',
+                   side_effect=delete_attachment_blob):
+            with self.captureOnCommitCallbacks(execute=True):
+                first.delete()
+            self.assertTrue(storage.exists(name))
+            with self.captureOnCommitCallbacks(execute=True):
+                second.delete()
+        self.assertFalse(storage.exists(name))
+
+    @patch('tracker.tasks.delete_attachment_blob.delay')
+    def test_blob_deletion_waits_for_commit(self, mock_delay):
+        """Test that blobs are released after commit, cascade deletes included."""
+        opp_file = OpportunityFile.objects.create(
+            opportunity=self.opportunity, file=SimpleUploadedFile("tor.pdf", b"terms"))
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.opportunity.delete()
+        self.assertTrue(opp_file.file.storage.exists(opp_file.file.name))
+        mock_delay.assert_not_called()
+
+        for callback in callbacks:
+            callback()
+        mock_delay.assert_called_once_with(opp_file.file.name)
+
+    def test_copy_to_shares_blob(self):
+        """Test that copying to another opportunity adds a row, not a file."""
+        opp_file = OpportunityFile.objects.create(
+            opportunity=self.opportunity, file=SimpleUploadedFile("tor.pdf", b"terms"))
+        rfp = Opportunity.objects.create(
+            ref_no="OPP-2024-011", title="RFP", opp_type="RFP", created_by=self.user)
+
+        copy = opp_file.copy_to(rfp)
+
+        self.assertEqual(copy.file.name, opp_file.file.name)
+        self.assertEqual(copy.original_name, "tor.pdf")
+        opp_file.delete()
+        self.assertTrue(copy.file.storage.exists(copy.file.name))
+        copy.delete()
 
     def test_opportunity_file_relationship(self):
         """Test reverse relationship from Opportunity to OpportunityFile."""
@@ -0,0 +1,178 @@
+"""
+Unit tests for tracker app import-export resources.
+
+This module tests:
+- Bulk imports of reference data keyed by code
+- Query counts that do not grow with the number of rows
+- Row-level validation (missing and duplicate codes)
+- Opportunity imports: lookup maps, bulk M2M and the import summary
+
+Set RUN_BENCHMARKS=1 to also time a 50,000-row import.
+"""
+import os
+import time
+import unittest
+from unittest.mock import patch
+
+import tablib
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from tracker.models import Client, Country, FundingAgency, Institute, Opportunity
+from tracker.resources import ClientResource, FundingAgencyResource, OpportunityResource
+
+User = get_user_model()
+
+BENCHMARK_ROWS = 50_000
+
+
+def _agencies(count, prefix='AG'):
+    return tablib.Dataset(*[(f'{prefix}{i:06d}', f'Agency {i}') for i in range(count)],
+                          headers=['code', 'name'])
+
+
+class CodeResourceTest(TestCase):
+    """Test cases for the shared CodeResource behaviour."""
+
+    def test_new_and_existing_codes(self):
+        """Test that existing codes are updated and new ones created."""
+        agency = FundingAgency.objects.create(code='ZZEXIST', name='Old name')
+        dataset = tablib.Dataset(('ZZEXIST', 'New name'), ('ZZNEW', 'Created'),
+                                 headers=['code', 'name'])
+
+        result = FundingAgencyResource().import_data(dataset)
+
+        self.assertFalse(result.has_errors())
+        agency.refresh_from_db()
+        self.assertEqual(agency.name, 'New name')
+        self.assertEqual(FundingAgency.objects.get(code='ZZNEW').name, 'Created')
+
+    def test_queries_do_not_grow_with_rows(self):
+        """Test that existence checks are no longer issued per row."""
+        with CaptureQueriesContext(connection) as few:
+            FundingAgencyResource().import_data(_agencies(10, 'QA'))
+        with CaptureQueriesContext(connection) as many:
+            FundingAgencyResource().import_data(_agencies(200, 'QB'))
+
+        self.assertEqual(len(few), len(many))
+        self.assertEqual(FundingAgency.objects.filter(code__startswith='QB').count(), 200)
+
+    def test_missing_code(self):
+        """Test that rows without a code are reported."""
+        dataset = tablib.Dataset(('', 'No code', 'O'), headers=['code', 'name', 'client_type'])
+
+        result = ClientResource().import_data(dataset)
+
+        self.assertTrue(result.has_errors())
+        self.assertIn("Each client must have a unique 'code'",
+                      str(result.row_errors()[0][1][0].error))
+
+    def test_duplicate_code_in_file(self):
+        """Test that a code repeated in the file is reported on its second row."""
+        dataset = tablib.Dataset(('ZZDUP', 'First', 'O'), ('ZZDUP', 'Second', 'O'),
+                                 headers=['code', 'name', 'client_type'])
+
+        result = ClientResource().import_data(dataset)
+
+        self.assertEqual(result.row_errors()[0][0], 2)
+        self.assertFalse(Client.objects.filter(code='ZZDUP').exists())
+
+
+OPPORTUNITY_HEADERS = ['ref_no', 'title', 'opp_type', 'status', 'funding_agency',
+                       'created_by', 'countries', 'partners']
+
+
+class OpportunityResourceTest(TestCase):
+    """Test cases for OpportunityResource."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(username='importer', password='testpass123')
+        self.agency = FundingAgency.objects.create(code='ZZFA', name='Agency')
+        self.institute = Institute.objects.create(code='ZZIN', name='Institute')
+        self.kenya, _ = Country.objects.get_or_create(code='KE', defaults={'name': 'Kenya'})
+        self.uganda, _ = Country.objects.get_or_create(code='UG', defaults={'name': 'Uganda'})
+
+    def _dataset(self, count, prefix='IMP', countries='KE,UG'):
+        return tablib.Dataset(
+            *[(f'{prefix}-{i:04d}', f'Imported {i}', 'RFP', 1, 'ZZFA', 'importer', countries, 'ZZIN')
+              for i in range(count)],
+            headers=OPPORTUNITY_HEADERS)
+
+    @patch('tracker.tasks.send_import_summary.delay')
+    @patch('tracker.signals._send_new_opportunity_notification')
+    def test_import_resolves_relations_and_sends_one_summary(self, mock_notify, mock_summary):
+        """Test that rows are linked by code and only one summary is queued."""
+        with self.captureOnCommitCallbacks(execute=True):
+            result = OpportunityResource().import_data(self._dataset(3), user=self.user)
+
+        self.assertFalse(result.has_errors())
+        self.assertFalse(result.has_validation_errors())
+        opportunity = Opportunity.objects.get(ref_no='IMP-0000')
+        self.assertEqual(opportunity.funding_agency, self.agency)
+        self.assertEqual(opportunity.created_by, self.user)
+        self.assertEqual(set(opportunity.countries.all()), {self.kenya, self.uganda})
+        self.assertEqual(list(opportunity.partners.all()), [self.institute])
+        mock_notify.assert_not_called()
+        mock_summary.assert_called_once()
+        created_ids, updated = mock_summary.call_args.args
+        self.assertEqual(len(created_ids), 3)
+        self.assertEqual(updated, 0)
+
+    @patch('tracker.tasks.send_import_summary.delay')
+    def test_update_replaces_countries(self, mock_summary):
+        """Test that re-importing a row updates it and replaces its M2M rows."""
+        OpportunityResource().import_data(self._dataset(1), user=self.user)
+
+        result = OpportunityResource().import_data(
+            self._dataset(1, countries='UG'), user=self.user)
+
+        self.assertEqual(result.totals['update'], 1)
+        opportunity = Opportunity.objects.get(ref_no='IMP-0000')
+        self.assertEqual(list(opportunity.countries.all()), [self.uganda])
+        self.assertEqual(opportunity.updated_by, self.user)
+
+    def test_unknown_reference_is_reported(self):
+        """Test that unresolved codes are row validation errors."""
+        dataset = self._dataset(1, countries='KE,XX')
+        dataset.append(('IMP-0001', 'Bad agency', 'RFP', 1, 'NOPE', 'importer', 'KE', ''))
+
+        result = OpportunityResource().import_data(dataset, user=self.user, dry_run=True)
+
+        self.assertEqual([row.number for row in result.invalid_rows], [1, 2])
+        self.assertIn('XX', str(result.invalid_rows[0].error))
+        self.assertIn("'NOPE' does not exist", str(result.invalid_rows[1].error))
+
+    @patch('tracker.tasks.send_import_summary.delay')
+    def test_queries_do_not_grow_with_rows(self, mock_summary):
+        """Test that FK and M2M resolution is not done per row."""
+        with CaptureQueriesContext(connection) as few:
+            OpportunityResource().import_data(self._dataset(5, 'QA'), user=self.user)
+        with CaptureQueriesContext(connection) as many:
+            OpportunityResource().import_data(self._dataset(100, 'QB'), user=self.user)
+
+        def lookups(queries):
+            # SQLite splits wide bulk inserts by its variable limit; only count the rest
+            return [q for q in queries.captured_queries
+                    if not q['sql'].startswith('INSERT INTO "opportunity" ')]
+
+        self.assertEqual(len(lookups(few)), len(lookups(many)))
+        self.assertEqual(Opportunity.objects.filter(ref_no__startswith='QB-').count(), 100)
+
+
+@unittest.skipUnless(os.environ.get('RUN_BENCHMARKS'), 'set RUN_BENCHMARKS=1 to run')
+class CodeResourceBenchmark(TestCase):
+    """Rows per second for a 50,000-row funding agency import."""
+
+    def test_bulk_import_throughput(self):
+        dataset = _agencies(BENCHMARK_ROWS, 'BM')
+
+        started = time.perf_counter()
+        result = FundingAgencyResource().import_data(dataset)
+        elapsed = time.perf_counter() - started
+
+        self.assertFalse(result.has_errors())
+        print(f"\n{BENCHMARK_ROWS} rows imported in {elapsed:.1f}s "
+              f"({BENCHMARK_ROWS / elapsed:.0f} rows/s)")
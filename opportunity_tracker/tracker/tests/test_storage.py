@@ -0,0 +1,136 @@
+"""
+Unit tests for the attachment storage backends.
+
+This module tests:
+- Content-addressed storage on S3-compatible object storage (moto stand-in)
+- Multipart uploads and streaming reads
+- Presigned downloads and zip assembly from object storage
+"""
+import io
+import os
+import unittest
+import zipfile
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from tracker.helpers.storage import blob_name, local_path
+from tracker.models import Opportunity, OpportunityFile
+
+try:
+    import boto3
+    from moto import mock_aws
+except ImportError:
+    mock_aws = None
+
+User = get_user_model()
+
+
+@unittest.skipUnless(mock_aws, 'moto is not installed')
+@override_settings(AWS_ACCESS_KEY_ID='testing', AWS_SECRET_ACCESS_KEY='testing',
+                   AWS_S3_REGION_NAME='us-east-1', AWS_STORAGE_BUCKET_NAME='attachments',
+                   AWS_S3_ENDPOINT_URL=None, AWS_QUERYSTRING_EXPIRE=300,
+                   ATTACHMENT_S3_MULTIPART_THRESHOLD=5 * 1024 ** 2,
+                   ATTACHMENT_S3_MULTIPART_CHUNKSIZE=5 * 1024 ** 2,
+                   PREVIEW_ROOT='/tmp/test_previews/')
+class ContentAddressedS3StorageTest(TestCase):
+    """Test cases for ContentAddressedS3Storage."""
+
+    def setUp(self):
+        """Set up a mocked bucket and an attachment field stored in it."""
+        from tracker.helpers.s3_storage import ContentAddressedS3Storage
+
+        self.mock = mock_aws()
+        self.mock.start()
+        self.client_s3 = boto3.client('s3', region_name='us-east-1')
+        self.client_s3.create_bucket(Bucket='attachments')
+        self.storage = ContentAddressedS3Storage()
+
+        field = OpportunityFile._meta.get_field('file')
+        patcher = patch.object(field, 'storage', self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.opportunity = Opportunity.objects.create(
+            ref_no='OPP-2024-S3', title='S3', opp_type='RFP', created_by=self.user, status=1)
+
+    def tearDown(self):
+        self.mock.stop()
+
+    def _attach(self, name, content):
+        return OpportunityFile.objects.create(
+            opportunity=self.opportunity, file=SimpleUploadedFile(name, content))
+
+    def test_identical_content_is_stored_once(self):
+        """Test that objects are keyed by content and uploaded once."""
+        first = self._attach('tor.pdf', b'terms')
+        second = self._attach('annex.pdf', b'terms')
+
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertTrue(first.file.name.startswith('blobs/'))
+        listing = self.client_s3.list_objects_v2(Bucket='attachments')
+        self.assertEqual([item['Key'] for item in listing['Contents']], [first.file.name])
+
+    def test_large_files_use_multipart_upload(self):
+        """Test that content above the threshold is uploaded in parts."""
+        content = os.urandom(11 * 1024 ** 2)
+        name = self.storage.save('budget.xlsx', ContentFile(content))
+
+        head = self.client_s3.head_object(Bucket='attachments', Key=name)
+        self.assertTrue(head['ETag'].strip('"').endswith('-3'))
+        self.assertEqual(b''.join(self.storage.stream(name, 1024 ** 2)), content)
+
+    def test_download_redirects_to_presigned_url(self):
+        """Test that attachments are downloaded straight from the bucket."""
+        opp_file = self._attach('terms.pdf', b'terms of reference')
+        self.client.login(username='testuser', password='testpass123')
+
+        response = self.client.get(reverse('media', kwargs={'path': opp_file.file.name}))
+
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(opp_file.file.name, response['Location'])
+        self.assertIn('Signature', response['Location'])
+        self.assertIn('response-content-disposition=inline', response['Location'])
+
+    @override_settings(ATTACHMENT_ARCHIVE_CACHE_DIR='/tmp/test_s3_archive_cache/')
+    @patch('tracker.tasks.evict_archive_cache.delay')
+    def test_download_folder_streams_from_bucket(self, mock_evict):
+        """Test that the zip of all attachments is assembled from object storage."""
+        self._attach('terms.txt', b'terms of reference')
+        self._attach('budget.txt', b'budget')
+        self.client.login(username='testuser', password='testpass123')
+
+        response = self.client.get(reverse('download_folder', kwargs={'pk': self.opportunity.pk}))
+
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(archive.read('terms.txt'), b'terms of reference')
+        self.assertEqual(archive.read('budget.txt'), b'budget')
+
+    def test_local_path_downloads_object(self):
+        """Test that workers get a temporary local copy to render or extract."""
+        opp_file = self._attach('terms.txt', b'terms of reference')
+
+        with local_path(opp_file.file) as path:
+            with open(path, 'rb') as local:
+                self.assertEqual(local.read(), b'terms of reference')
+        self.assertFalse(os.path.exists(path))
+
+    def test_orphans_are_found_in_bucket(self):
+        """Test that garbage collection walks the bucket."""
+        from tracker.helpers.orphans import collect_orphans
+
+        kept = self._attach('kept.txt', b'kept')
+        orphan = self.storage.save('orphan.txt', ContentFile(b'orphan'))
+
+        with override_settings(ATTACHMENT_ORPHAN_GRACE_HOURS=0):
+            report = collect_orphans(storage=self.storage)
+
+        self.assertEqual(report.orphans, [orphan])
+        self.assertFalse(self.storage.exists(orphan))
+        self.assertTrue(self.storage.exists(kept.file.name))
+        self.assertEqual(orphan, blob_name(orphan.rsplit('/', 1)[1]))
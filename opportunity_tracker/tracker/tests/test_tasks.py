@@ -7,15 +7,34 @@ This module tests:
 - Task parameters and return values
 """
 from datetime import timedelta
+import io
+import os
+import shutil
+import time
+import unittest
 from unittest.mock import patch, MagicMock
+import zipfile
+
+from PIL import Image
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
-from tracker.models import Opportunity
-from tracker.tasks import send_weekly_summary
+from notification.models import NotificationChannel, NotificationSubscription
+from tracker.helpers import import_jobs
+from tracker.models import (AttachmentText, Country, ExportJob, FileUpload, FundingAgency,
+                            ImportJob, Opportunity, OpportunityFile)
+from tracker.tasks import (apply_import_job, collect_orphan_files, delete_attachment_blob,
+                           evict_archive_cache, expire_export_jobs, expire_file_uploads,
+                           extract_attachment_text,
+                           generate_file_preview, index_attachments, run_export_job,
+                           send_import_summary, send_weekly_summary, validate_import_job)
 
 User = get_user_model()
 
@@ -163,3 +182,649 @@ class SendWeeklySummaryTaskTest(TestCase):
 
         # Should still return success message even with 0 subscribers
         self.assertIn('Weekly summary sent to 0 subscribers', result)
+
+
+@override_settings(
+    CELERY_TASK_ALWAYS_EAGER=True,
+    SITE_URL='http://testserver',
+    WEEKLY_SUMMARY_CHANNELS=['weekly_email', 'weekly_whatsapp']
+)
+class WeeklySummaryQueryCountTest(TestCase):
+    """Test the queries and rendering done by one weekly summary run."""
+
+    def setUp(self):
+        """Set up opportunities with relations and two summary channels."""
+        self.user = User.objects.create_user(
+            username='testuser', email='test@example.com', password='testpass123')
+        self.countries = [
+            Country.objects.create(code='XA', name='Country A'),
+            Country.objects.create(code='XB', name='Country B'),
+        ]
+        self.subscription_ids = []
+        for name in settings.WEEKLY_SUMMARY_CHANNELS:
+            channel = NotificationChannel.objects.create(name=name, description=name)
+            self.subscription_ids.append(NotificationSubscription.objects.create(
+                user=self.user, channel=channel).id)
+
+    def _create_opportunities(self, count):
+        start = Opportunity.objects.count()
+        for i in range(start, start + count):
+            agency = FundingAgency.objects.create(code=f'FA-{i}', name=f'Agency {i}')
+            opportunity = Opportunity.objects.create(
+                ref_no=f'OPP-QC-{i:03d}', title=f'Opportunity {i}', opp_type='RFP',
+                created_by=self.user, funding_agency=agency, status=1)
+            opportunity.countries.set(self.countries)
+
+    @patch('tracker.tasks.execute_channel_send.delay')
+    def test_query_count_does_not_grow_with_opportunities(self, mock_task):
+        """Test that opportunities, countries and subscriptions take one query each."""
+        self._create_opportunities(2)
+        with self.assertNumQueries(3):
+            send_weekly_summary()
+
+        self._create_opportunities(10)
+        with self.assertNumQueries(3):
+            send_weekly_summary()
+
+    @patch('tracker.tasks.execute_channel_send.delay')
+    def test_summary_includes_related_data(self, mock_task):
+        """Test that the prefetched relations are rendered."""
+        self._create_opportunities(1)
+
+        send_weekly_summary()
+
+        email_message = mock_task.call_args[1]['email_message']
+        self.assertIn('Agency 0', email_message)
+        self.assertIn('Country A, Country B', email_message)
+
+    @patch('tracker.tasks.execute_channel_send.delay')
+    def test_all_channels_served_by_one_run(self, mock_task):
+        """Test that all configured channels share one render and one send task."""
+        self._create_opportunities(3)
+
+        with patch('tracker.tasks.render_to_string', return_value='<p>Summary</p>') as mock_render:
+            result = send_weekly_summary()
+
+        mock_render.assert_called_once()
+        mock_task.assert_called_once()
+        self.assertCountEqual(mock_task.call_args[0][0], self.subscription_ids)
+        self.assertEqual(mock_task.call_args[1]['short_message'],
+                         '3 new opportunities created this week.')
+        self.assertIn('weekly_email, weekly_whatsapp', result)
+
+
+@override_settings(SITE_URL='http://testserver')
+class SendImportSummaryTaskTest(TestCase):
+    """Test cases for the send_import_summary task."""
+
+    def setUp(self):
+        """Set up imported opportunities and a subscribed channel."""
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        channel = NotificationChannel.objects.create(name='new_opportunities')
+        self.subscription = NotificationSubscription.objects.create(user=self.user, channel=channel)
+        self.opportunity_ids = [str(Opportunity.objects.create(
+            ref_no=f'OPP-IMP-{i}', title=f'Imported {i}', opp_type='RFP',
+            created_by=self.user, status=1).id) for i in range(2)]
+
+    @patch.dict(os.environ, {'NEW_OPPORTUNITY_ALERT_CHANNEL': 'new_opportunities'})
+    @patch('tracker.tasks.execute_channel_send.delay')
+    def test_one_message_for_the_import(self, mock_task):
+        """Test that the whole import is announced in a single send."""
+        send_import_summary(self.opportunity_ids, 3)
+
+        mock_task.assert_called_once()
+        self.assertEqual(mock_task.call_args[0][0], [self.subscription.id])
+        self.assertEqual(mock_task.call_args[1]['short_message'],
+                         '2 opportunities imported, 3 updated.')
+        self.assertIn('Imported 1', mock_task.call_args[1]['email_message'])
+
+    @patch.dict(os.environ, {}, clear=True)
+    @patch('tracker.tasks.execute_channel_send.delay')
+    def test_no_channel_configured(self, mock_task):
+        """Test that nothing is sent without NEW_OPPORTUNITY_ALERT_CHANNEL."""
+        self.assertEqual(send_import_summary(self.opportunity_ids), "No channel configured.")
+        mock_task.assert_not_called()
+
+
+@override_settings(ATTACHMENT_ARCHIVE_CACHE_DIR='/tmp/test_archive_cache/',
+                   ATTACHMENT_ARCHIVE_CACHE_MAX_SIZE=250)
+class EvictArchiveCacheTaskTest(TestCase):
+    """Test cases for evict_archive_cache task."""
+
+    def setUp(self):
+        """Create three 100 byte archives used at different times."""
+        self.paths = []
+        now = time.time()
+        for i in range(3):
+            path = f'/tmp/test_archive_cache/opp-{i}/archive.zip'
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as archive:
+                archive.write(b'x' * 100)
+            os.utime(path, (now - 100 + i, now - 100 + i))
+            self.paths.append(path)
+
+    def tearDown(self):
+        shutil.rmtree('/tmp/test_archive_cache/', ignore_errors=True)
+
+    def test_least_recently_used_archive_is_evicted(self):
+        """Test that the oldest archive is removed to fit the size cap."""
+        result = evict_archive_cache()
+
+        self.assertEqual(result, '100 bytes evicted from the archive cache.')
+        self.assertFalse(os.path.exists(self.paths[0]))
+        self.assertTrue(os.path.exists(self.paths[1]))
+        self.assertTrue(os.path.exists(self.paths[2]))
+
+
+@override_settings(FILE_UPLOAD_SESSION_DIR='/tmp/test_upload_sessions/', FILE_UPLOAD_EXPIRY_HOURS=24)
+class ExpireFileUploadsTaskTest(TestCase):
+    """Test cases for expire_file_uploads task."""
+
+    def test_stale_sessions_are_removed(self):
+        """Test that only sessions idle longer than the expiry are removed."""
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        stale = FileUpload.objects.create(filename='old.pdf', size=10, created_by=user)
+        fresh = FileUpload.objects.create(filename='new.pdf', size=10, created_by=user)
+        FileUpload.objects.filter(pk=stale.pk).update(
+            updated_at=timezone.now() - timedelta(hours=25))
+        os.makedirs('/tmp/test_upload_sessions/', exist_ok=True)
+        with open(stale.path, 'wb') as part:
+            part.write(b'12345')
+
+        result = expire_file_uploads()
+
+        self.assertEqual(result, '1 expired uploads removed.')
+        self.assertFalse(os.path.exists(stale.path))
+        self.assertEqual(list(FileUpload.objects.all()), [fresh])
+        shutil.rmtree('/tmp/test_upload_sessions/', ignore_errors=True)
+
+
+@override_settings(MEDIA_ROOT='/tmp/test_media/', PREVIEW_ROOT='/tmp/test_previews/')
+class GenerateFilePreviewTaskTest(TestCase):
+    """Test cases for generate_file_preview task."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.opportunity = Opportunity.objects.create(
+            ref_no='OPP-2024-PREVIEW', title='Preview', opp_type='RFP',
+            created_by=self.user, status=1)
+
+    def tearDown(self):
+        for opp_file in OpportunityFile.objects.all():
+            opp_file.delete()
+        shutil.rmtree('/tmp/test_previews/', ignore_errors=True)
+
+    def _attach(self, name, content):
+        return OpportunityFile.objects.create(
+            opportunity=self.opportunity, file=SimpleUploadedFile(name, content))
+
+    def test_image_thumbnail(self):
+        """Test that images are scaled down to a cached JPEG."""
+        buffer = io.BytesIO()
+        Image.new('RGBA', (2000, 1000), (200, 30, 30, 255)).save(buffer, 'PNG')
+        opp_file = self._attach('map.png', buffer.getvalue())
+        self.assertIsNone(opp_file.preview_url)
+
+        generate_file_preview(opp_file.id)
+
+        opp_file.refresh_from_db()
+        self.assertIsNotNone(opp_file.preview_ready_at)
+        self.assertTrue(opp_file.preview_url.startswith(settings.PREVIEW_URL))
+        with Image.open(os.path.join('/tmp/test_previews/', opp_file.preview_url[len(settings.PREVIEW_URL):])) as preview:
+            self.assertEqual(preview.format, 'JPEG')
+            self.assertEqual(preview.size, (480, 240))
+        self.assertEqual(generate_file_preview(opp_file.id), 'Preview already cached.')
+
+    @unittest.skipUnless(shutil.which('pdftoppm'), 'poppler-utils is not installed')
+    def test_pdf_first_page(self):
+        """Test that the first page of a PDF is rendered."""
+        buffer = io.BytesIO()
+        Image.new('RGB', (600, 800), 'white').save(buffer, 'PDF')
+        opp_file = self._attach('tor.pdf', buffer.getvalue())
+
+        generate_file_preview(opp_file.id)
+
+        self.assertIsNotNone(opp_file.preview_url)
+
+    def test_unsupported_format(self):
+        """Test that other formats are skipped."""
+        opp_file = self._attach('budget.xlsx', b'not an image')
+
+        self.assertEqual(generate_file_preview(opp_file.id), 'Nothing to preview.')
+        self.assertIsNone(opp_file.preview_url)
+
+    def test_corrupt_image(self):
+        """Test that unreadable files do not fail the task."""
+        opp_file = self._attach('broken.jpg', b'not an image')
+
+        generate_file_preview(opp_file.id)
+
+        self.assertIsNone(opp_file.preview_url)
+        opp_file.refresh_from_db()
+        self.assertIsNone(opp_file.preview_ready_at)
+
+    @patch('tracker.tasks.extract_attachment_text.delay')
+    @patch('tracker.tasks.generate_file_preview.delay')
+    def test_preview_queued_after_commit(self, mock_delay, mock_extract):
+        """Test that new attachments queue their preview once committed."""
+        with self.captureOnCommitCallbacks(execute=True):
+            opp_file = self._attach('map.png', b'png')
+
+        mock_delay.assert_called_once_with(opp_file.id)
+
+
+def _docx_bytes(*paragraphs):
+    """Build a minimal DOCX file holding the given paragraphs."""
+    body = "".join(f"<w:p><w:r><w:t>{text}</w:t></w:r></w:p>" for text in paragraphs)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("word/document.xml", (
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+            f"<w:body>{body}</w:body></w:document>"))
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT='/tmp/test_media/')
+class ExtractAttachmentTextTaskTest(TestCase):
+    """Test cases for extract_attachment_text and index_attachments tasks."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.opportunity = Opportunity.objects.create(
+            ref_no='OPP-2024-TEXT', title='Text', opp_type='RFP',
+            created_by=self.user, status=1)
+
+    def tearDown(self):
+        for opp_file in OpportunityFile.objects.all():
+            opp_file.delete()
+
+    def _attach(self, name, content):
+        return OpportunityFile.objects.create(
+            opportunity=self.opportunity, file=SimpleUploadedFile(name, content))
+
+    def test_docx_text(self):
+        """Test that the paragraphs of a Word document are indexed."""
+        opp_file = self._attach('tor.docx', _docx_bytes('Terms of reference', 'Water  sanitation'))
+
+        extract_attachment_text(opp_file.id)
+
+        self.assertEqual(opp_file.text.text, 'Terms of reference Water sanitation')
+        self.assertEqual(opp_file.text.content_hash, os.path.basename(opp_file.file.name))
+
+    def test_xlsx_text(self):
+        """Test that sheet names and cell values of a workbook are indexed."""
+        from openpyxl import Workbook
+
+        workbook = Workbook()
+        workbook.active.title = 'Budget'
+        workbook.active.append(['Solar pumps', 1200])
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        opp_file = self._attach('budget.xlsx', buffer.getvalue())
+
+        extract_attachment_text(opp_file.id)
+
+        self.assertEqual(opp_file.text.text, 'Budget Solar pumps 1200')
+
+    @unittest.skipUnless(shutil.which('pdftotext'), 'poppler-utils is not installed')
+    def test_pdf_text(self):
+        """Test that PDFs are passed through pdftotext."""
+        buffer = io.BytesIO()
+        Image.new('RGB', (600, 800), 'white').save(buffer, 'PDF')
+        opp_file = self._attach('scan.pdf', buffer.getvalue())
+
+        extract_attachment_text(opp_file.id)
+
+        self.assertEqual(opp_file.text.text, '')
+
+    def test_unsupported_format(self):
+        """Test that other formats are skipped."""
+        opp_file = self._attach('map.png', b'png')
+
+        self.assertEqual(extract_attachment_text(opp_file.id), 'Nothing to extract.')
+        self.assertFalse(AttachmentText.objects.exists())
+
+    @patch('tracker.tasks.extract_text')
+    def test_extraction_is_incremental(self, mock_extract):
+        """Test that current text is kept and shared blobs are extracted once."""
+        mock_extract.return_value = 'call for proposals'
+        opp_file = self._attach('call.docx', b'docx')
+        extract_attachment_text(opp_file.id)
+
+        self.assertEqual(extract_attachment_text(opp_file.id), 'Text already indexed.')
+        copy = opp_file.copy_to(self.opportunity)
+        extract_attachment_text(copy.id)
+
+        mock_extract.assert_called_once()
+        self.assertEqual(copy.text.text, 'call for proposals')
+
+    @patch('tracker.tasks.extract_attachment_text.delay')
+    def test_index_attachments_queues_missing_and_stale(self, mock_delay):
+        """Test that the backfill only queues attachments without current text."""
+        current = self._attach('current.docx', _docx_bytes('current'))
+        extract_attachment_text(current.id)
+        stale = self._attach('stale.docx', _docx_bytes('stale'))
+        AttachmentText.objects.create(file=stale, content_hash='0' * 64, text='old')
+        missing = self._attach('missing.docx', _docx_bytes('missing'))
+        self._attach('map.png', b'png')
+
+        index_attachments()
+
+        self.assertEqual(sorted(call.args[0] for call in mock_delay.call_args_list),
+                         sorted([stale.id, missing.id]))
+
+
+@override_settings(MEDIA_ROOT='/tmp/test_gc_media/', PREVIEW_ROOT='/tmp/test_previews/',
+                   ATTACHMENT_ORPHAN_GRACE_HOURS=24, ATTACHMENT_ORPHAN_QUARANTINE_DIR='')
+class CollectOrphanFilesTaskTest(TestCase):
+    """Test cases for delete_attachment_blob and collect_orphan_files tasks."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.opportunity = Opportunity.objects.create(
+            ref_no='OPP-2024-GC', title='GC', opp_type='RFP',
+            created_by=self.user, status=1)
+        self.kept = OpportunityFile.objects.create(
+            opportunity=self.opportunity, file=SimpleUploadedFile('kept.txt', b'kept'))
+        orphan = OpportunityFile.objects.create(
+            opportunity=self.opportunity, file=SimpleUploadedFile('orphan.txt', b'orphan'))
+        self.orphan = orphan.file.name
+        self.storage = orphan.file.storage
+        OpportunityFile.objects.filter(pk=orphan.pk).delete()
+        self._age(self.kept.file.name)
+        self._age(self.orphan)
+
+    def tearDown(self):
+        shutil.rmtree('/tmp/test_gc_media/', ignore_errors=True)
+        shutil.rmtree('/tmp/test_quarantine/', ignore_errors=True)
+
+    def _age(self, name, hours=48):
+        past = time.time() - hours * 3600
+        os.utime(self.storage.path(name), (past, past))
+
+    def test_delete_attachment_blob(self):
+        """Test that a blob is only deleted once nothing refers to it."""
+        self.assertEqual(delete_attachment_blob(self.kept.file.name),
+                         f'{self.kept.file.name} is still referenced.')
+        delete_attachment_blob(self.orphan)
+
+        self.assertTrue(self.storage.exists(self.kept.file.name))
+        self.assertFalse(self.storage.exists(self.orphan))
+
+    def test_recently_touched_blob_is_not_deleted(self):
+        """Test that a blob written within the grace period survives its release."""
+        self._age(self.orphan, hours=1)
+
+        self.assertEqual(delete_attachment_blob(self.orphan),
+                         f'{self.orphan} was modified recently, left to the orphan sweep.')
+        self.assertTrue(self.storage.exists(self.orphan))
+
+    def test_dry_run_reports_without_deleting(self):
+        """Test that a dry run lists the orphans and leaves them in place."""
+        report = collect_orphan_files(dry_run=True)
+
+        self.assertIn('2 files scanned', report)
+        self.assertIn('1 orphans (6 bytes) would be removed', report)
+        self.assertTrue(self.storage.exists(self.orphan))
+
+    def test_orphans_are_removed(self):
+        """Test that unreferenced files go and referenced ones stay."""
+        collect_orphan_files()
+
+        self.assertFalse(self.storage.exists(self.orphan))
+        self.assertTrue(self.storage.exists(self.kept.file.name))
+
+    def test_recent_files_are_kept(self):
+        """Test that files inside the grace period are not collected."""
+        self._age(self.orphan, hours=1)
+
+        collect_orphan_files()
+
+        self.assertTrue(self.storage.exists(self.orphan))
+
+    @override_settings(ATTACHMENT_ORPHAN_QUARANTINE_DIR='/tmp/test_quarantine/')
+    def test_orphans_are_quarantined(self):
+        """Test that orphans are moved aside when a quarantine directory is set."""
+        collect_orphan_files()
+
+        self.assertFalse(self.storage.exists(self.orphan))
+        self.assertTrue(os.path.exists(os.path.join('/tmp/test_quarantine/', self.orphan)))
+
+    def test_storage_is_checked_in_batches(self):
+        """Test that each batch of stored names costs one query."""
+        from tracker.helpers.orphans import collect_orphans
+
+        with self.assertNumQueries(2):
+            report = collect_orphans(dry_run=True, batch_size=1)
+
+        self.assertEqual(report.scanned, 2)
+        self.assertEqual(report.orphans, [self.orphan])
+
+
+@override_settings(MEDIA_ROOT='/tmp/test_import_media/', IMPORT_JOB_CHUNK_SIZE=2,
+                   CELERY_TASK_ALWAYS_EAGER=True)
+class ImportJobTaskTest(TestCase):
+    """Test cases for the parallel validation and the commit of import jobs."""
+
+    def setUp(self):
+        """Set up the importing user."""
+        self.user = User.objects.create_user(username='importer', password='testpass123')
+
+    def tearDown(self):
+        shutil.rmtree('/tmp/test_import_media/', ignore_errors=True)
+
+    def _job(self, *rows):
+        content = '\n'.join(['code,name', *rows]).encode()
+        return ImportJob.objects.create(
+            resource='funding_agency', created_by=self.user,
+            file=SimpleUploadedFile('agencies.csv', content))
+
+    def test_valid_file_is_validated_in_chunks(self):
+        """Test that every chunk is dry-run and nothing is written yet."""
+        job = self._job('FA1,One', 'FA2,Two', 'FA3,Three', 'FA4,Four', 'FA5,Five')
+
+        with patch('tracker.helpers.import_jobs.load_dataset',
+                   wraps=import_jobs.load_dataset) as load_dataset, \
+                patch('tracker.helpers.import_jobs.validate_rows',
+                      wraps=import_jobs.validate_rows) as validate_rows:
+            validate_import_job(job.pk)
+
+        job.refresh_from_db()
+        load_dataset.assert_called_once()
+        self.assertEqual([call.args[1] for call in validate_rows.call_args_list], [0, 2, 4])
+        self.assertFalse(job.file.storage.listdir(f'imports/chunks/{job.pk}')[1])
+        self.assertEqual(job.status, 'valid')
+        self.assertEqual((job.processed_rows, job.total_rows, job.progress), (5, 5, 100))
+        self.assertEqual(job.totals['new'], 5)
+        self.assertFalse(FundingAgency.objects.filter(code__startswith='FA').exists())
+
+    def test_errors_are_merged_across_chunks(self):
+        """Test that row errors and duplicates in other chunks are reported by file row."""
+        job = self._job('FA1,One', ',No code', 'FA3,Three', 'FA1,Again')
+
+        validate_import_job(job.pk)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'invalid')
+        self.assertEqual([error['row'] for error in job.errors], [2, 4])
+        self.assertIn("must have a unique 'code'", job.errors[0]['errors'][0])
+        self.assertIn('first on row 1', job.errors[1]['errors'][0])
+
+    def test_xlsx_file_is_split_into_workbooks(self):
+        """Test that XLSX imports are chunked as workbooks and validated by file row."""
+        from openpyxl import Workbook
+
+        workbook = Workbook()
+        for row in [('code', 'name'), ('FA1', 'One'), ('FA2', 'Two'), (None, 'No code')]:
+            workbook.active.append(row)
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        job = ImportJob.objects.create(
+            resource='funding_agency', created_by=self.user,
+            file=SimpleUploadedFile('agencies.xlsx', buffer.getvalue()))
+
+        validate_import_job(job.pk)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'invalid')
+        self.assertEqual(job.total_rows, 3)
+        self.assertEqual([error['row'] for error in job.errors], [3])
+
+    def test_unreadable_file_fails(self):
+        """Test that an unsupported file type fails the job."""
+        job = ImportJob.objects.create(
+            resource='unit', created_by=self.user,
+            file=SimpleUploadedFile('units.txt', b'code,name'))
+
+        validate_import_job(job.pk)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('Unsupported file type', job.errors[0]['errors'][0])
+
+    def test_apply_writes_all_rows(self):
+        """Test that a validated job is imported and marked done."""
+        job = self._job('FA1,One', 'FA2,Two', 'FA3,Three')
+        validate_import_job(job.pk)
+        ImportJob.objects.filter(pk=job.pk).update(status='importing')
+
+        apply_import_job(job.pk)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(FundingAgency.objects.filter(code__startswith='FA').count(), 3)
+
+    def test_apply_rolls_back_on_error(self):
+        """Test that rows that became invalid after validation roll back the whole import."""
+        job = self._job('FA1,One', 'FA2,Two', ',No code')
+        ImportJob.objects.filter(pk=job.pk).update(status='importing')
+
+        apply_import_job(job.pk)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertFalse(FundingAgency.objects.filter(code__startswith='FA').exists())
+
+
+@override_settings(MEDIA_ROOT='/tmp/test_export_media/', EXPORT_JOB_CHUNK_SIZE=2,
+                   SITE_URL='http://testserver')
+class ExportJobTaskTest(TestCase):
+    """Test cases for background admin exports."""
+
+    def setUp(self):
+        """Set up opportunities and the exporting user."""
+        self.user = User.objects.create_superuser(
+            username='exporter', email='exporter@example.com', password='testpass123')
+        agency = FundingAgency.objects.create(code='FA-EXP', name='Agency')
+        country = Country.objects.create(code='XE', name='Exportland')
+        for i in range(5):
+            opportunity = Opportunity.objects.create(
+                ref_no=f'EXP-{i}', title=f'Road {i}' if i % 2 else f'Water {i}',
+                opp_type='RFP', created_by=self.user, funding_agency=agency, status=1)
+            opportunity.countries.add(country)
+
+    def tearDown(self):
+        shutil.rmtree('/tmp/test_export_media/', ignore_errors=True)
+
+    def _job(self, file_format, query=''):
+        return ExportJob.objects.create(model='tracker.opportunity', query=query,
+                                        file_format=file_format, created_by=self.user)
+
+    @patch('tracker.tasks.notify_user.delay')
+    def test_csv_export_honours_changelist_search(self, mock_notify):
+        """Test that only the rows of the filtered changelist are exported."""
+        job = self._job('csv', 'q=Road')
+
+        run_export_job(job.pk)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.row_count), ('done', 2))
+        self.assertIsNotNone(job.expires_at)
+        with job.file.open('r') as exported:
+            lines = exported.read().splitlines()
+        self.assertTrue(lines[0].startswith('ref_no,title'))
+        self.assertEqual(sorted(line.split(',')[0] for line in lines[1:]), ['EXP-1', 'EXP-3'])
+        self.assertIn('FA-EXP', lines[1])
+        self.assertIn('XE', lines[1])
+        mock_notify.assert_called_once()
+        self.assertIn(f'/admin/tracker/exportjob/{job.pk}/download/',
+                      mock_notify.call_args[1]['email_message'])
+
+    @patch('tracker.tasks.notify_user.delay')
+    def test_xlsx_export(self, mock_notify):
+        """Test that XLSX exports are written with a write-only workbook."""
+        from openpyxl import load_workbook
+
+        job = self._job('xlsx')
+
+        run_export_job(job.pk)
+
+        job.refresh_from_db()
+        with job.file.open('rb') as exported:
+            rows = list(load_workbook(exported, read_only=True).active.values)
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[0][0], 'ref_no')
+
+    @patch('tracker.tasks.notify_user.delay')
+    def test_relations_are_loaded_per_chunk(self, mock_notify):
+        """Test that queries grow with the number of chunks, not of rows."""
+        job = self._job('csv')
+        with CaptureQueriesContext(connection) as five_rows:
+            run_export_job(job.pk)
+
+        for i in range(5, 10):
+            Opportunity.objects.create(ref_no=f'EXP-{i}', title='More', opp_type='RFP',
+                                       created_by=self.user, status=1)
+        job = self._job('csv')
+        with override_settings(EXPORT_JOB_CHUNK_SIZE=10), \
+                CaptureQueriesContext(connection) as ten_rows:
+            run_export_job(job.pk)
+
+        self.assertLessEqual(len(ten_rows), len(five_rows))
+
+    @patch('tracker.tasks.notify_user.delay')
+    def test_subscription_export(self, mock_notify):
+        """Test that opportunity subscriptions are exported from their admin."""
+        from notification.models import OpportunitySubscription
+
+        for opportunity in Opportunity.objects.all():
+            OpportunitySubscription.objects.create(user=self.user, opportunity=opportunity)
+        job = ExportJob.objects.create(model='notification.opportunitysubscription',
+                                       query='digest_mode=immediate', file_format='csv',
+                                       created_by=self.user)
+
+        run_export_job(job.pk)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.row_count), ('done', 5))
+
+    def test_expired_exports_are_removed(self):
+        """Test that expired files and jobs are deleted."""
+        job = self._job('csv')
+        job.file.save('old.csv', ContentFile(b'ref_no'))
+        job.expires_at = timezone.now() - timedelta(minutes=1)
+        job.save()
+        path = job.file.path
+
+        with self.captureOnCommitCallbacks(execute=True):
+            expire_export_jobs()
+
+        self.assertFalse(ExportJob.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+    def test_cascade_delete_removes_export_files(self):
+        """Test that export files go with their jobs when the owner is deleted."""
+        staff = User.objects.create_user(username='staff', password='testpass123', is_staff=True)
+        job = ExportJob.objects.create(model='tracker.opportunity', file_format='csv',
+                                       created_by=staff)
+        job.file.save('export.csv', ContentFile(b'ref_no'))
+        path = job.file.path
+
+        with self.captureOnCommitCallbacks(execute=True):
+            staff.delete()
+
+        self.assertFalse(ExportJob.objects.exists())
+        self.assertFalse(os.path.exists(path))
@@ -11,22 +11,48 @@ This module tests:
 """
 from datetime import date, timedelta
 from decimal import Decimal
+import base64
+import io
 import json
-
+import os
+import re
+import shutil
+import time
+import unittest
+import zipfile
+from unittest.mock import patch
+from urllib.parse import urlencode
+
+from django.contrib import admin
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.core.files.base import ContentFile
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import TestCase, Client as TestClient, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
 
 from tracker.models import (
     FundingAgency, Client, Institute, Unit, Country, Currency,
-    Opportunity, OpportunityFile
+    Opportunity, OpportunityFile, FileUpload, AttachmentText, ImportJob, ExportJob
 )
 from notification.models import OpportunitySubscription
 
 User = get_user_model()
 
 
+def _hx_url(response, attribute, path):
+    """The first `attribute` URL in the rendered page that points at `path`, as htmx would request it."""
+    for url in re.findall(rf'{attribute}="([^"]*)"', response.content.decode()):
+        if url.startswith(path):
+            return url.replace('&amp;', '&')
+    raise AssertionError(f'No {attribute} to {path} in the page')
+
+
 class IndexViewTest(TestCase):
     """Test cases for IndexView."""
 
@@ -44,6 +70,7 @@ class IndexViewTest(TestCase):
         self.assertTemplateUsed(response, 'tracker/home.html')
 
 
+@override_settings(MEDIA_ROOT='/tmp/test_media/')
 class OpportunityListViewTest(TestCase):
     """Test cases for OpportunityListView."""
 
@@ -98,6 +125,23 @@ class OpportunityListViewTest(TestCase):
                                    'title': 'Opportunity 1'})
         self.assertGreater(response.context['opportunity_count'], 0)
 
+    def test_opportunity_list_view_search_in_attachments(self):
+        """Test that the title search can include the attachment text index."""
+        opportunity = Opportunity.objects.get(ref_no='OPP-2024-005')
+        opp_file = OpportunityFile.objects.create(
+            opportunity=opportunity, file=SimpleUploadedFile('tor.docx', b'docx'))
+        AttachmentText.objects.create(
+            file=opp_file, content_hash='0' * 64, text='rural electrification baseline')
+        self.client.login(username='testuser', password='testpass123')
+
+        response = self.client.get(reverse('opportunities'), {'title': 'electrification'})
+        self.assertEqual(response.context['opportunity_count'], 0)
+
+        response = self.client.get(reverse('opportunities'), {
+                                   'title': 'electrification', 'search_attachments': 'on'})
+        self.assertEqual(list(response.context['page_obj']), [opportunity])
+        opp_file.delete()
+
     def test_opportunity_list_view_filter_by_funding_agency(self):
         """Test filtering opportunities by funding_agency."""
         Opportunity.objects.filter(
@@ -126,6 +170,143 @@ class OpportunityListViewTest(TestCase):
         self.assertTemplateUsed(
             response, 'tracker/partials/opportunity_cards.html')
 
+    def test_opportunity_list_htmx_conditional_get(self):
+        """Test that an unchanged card page is answered with 304 before rendering."""
+        self.client.login(username='testuser', password='testpass123')
+        url = reverse('opportunities')
+        response = self.client.get(url, {'status': '1'}, HTTP_HX_REQUEST='true')
+        etag = response.headers['ETag']
+        self.assertIn('Last-Modified', response.headers)
+        self.assertIn('HX-Request', response.headers['Vary'])
+
+        with self.assertNumQueries(3):  # Session, user and the aggregate
+            response = self.client.get(
+                url, {'status': '1'}, HTTP_HX_REQUEST='true', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        other = self.client.get(url, {'status': '2'}, HTTP_HX_REQUEST='true')
+        self.assertNotEqual(other.headers['ETag'], etag)
+
+        Opportunity.objects.get(ref_no='OPP-2024-001').save()
+        response = self.client.get(
+            url, {'status': '1'}, HTTP_HX_REQUEST='true', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_opportunity_list_full_page_has_no_etag(self):
+        """Test that the full list page, which carries a CSRF token, is always rendered."""
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(reverse('opportunities'))
+        self.assertNotIn('ETag', response.headers)
+
+
+class OpportunityFragmentCacheTest(TestCase):
+    """Test cases for the cached opportunity card and detail fragments."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.client = TestClient()
+        self.user = User.objects.create_user(
+            username='testuser', first_name='Test', password='testpass123')
+        self.funding_agency = FundingAgency.objects.create(code="FRAG", name="Fragment Agency")
+        self.opportunities = [
+            Opportunity.objects.create(
+                ref_no=f'FRAG-{i:03d}', title=f'Cached Opportunity {i}', opp_type='RFP',
+                funding_agency=self.funding_agency, created_by=self.user, status=1)
+            for i in range(15)]
+        self.client.login(username='testuser', password='testpass123')
+
+    def _cards(self):
+        return self.client.get(reverse('opportunities'), HTTP_HX_REQUEST='true')
+
+    def test_hot_cards_skip_related_queries(self):
+        """Test that cached cards no longer load their related rows."""
+        with CaptureQueriesContext(connection) as cold:
+            cold_html = self._cards().content
+        with CaptureQueriesContext(connection) as hot:
+            hot_html = self._cards().content
+
+        self.assertEqual(cold_html, hot_html)
+        # One funding agency per card; the users come with the opportunities
+        self.assertLessEqual(len(hot), len(cold) - 15)
+
+    def test_saved_opportunity_is_rendered_again(self):
+        """Test that saving an opportunity changes its card's key."""
+        self._cards()
+        opportunity = self.opportunities[0]
+        opportunity.title = 'Renamed Opportunity'
+        opportunity.save()
+
+        self.assertContains(self._cards(), 'Renamed Opportunity')
+
+    def test_reference_data_change_renders_again(self):
+        """Test that renaming a funding agency refreshes the cards showing it."""
+        self._cards()
+        self.funding_agency.name = 'Renamed Agency'
+        self.funding_agency.save()
+
+        response = self._cards()
+        self.assertContains(response, 'Renamed Agency')
+        self.assertNotContains(response, 'Fragment Agency')
+
+    def test_renamed_user_renders_again(self):
+        """Test that renaming the creator or proposal lead refreshes the cached card and detail."""
+        opportunity = self.opportunities[0]
+        lead = User.objects.create_user(username='lead', first_name='Lead', password='testpass123')
+        Opportunity.objects.filter(pk=opportunity.pk).update(proposal_lead=lead, status=5)
+        url = reverse('opportunity', kwargs={'pk': opportunity.pk})
+        self._cards()
+        self.client.get(url)
+
+        User.objects.filter(pk=self.user.pk).update(first_name='Renamed')
+        User.objects.filter(pk=lead.pk).update(first_name='Promoted')
+
+        cards = self._cards()
+        self.assertContains(cards, 'Created by Renamed')
+        self.assertContains(cards, 'Promoted')
+        detail = self.client.get(url)
+        self.assertContains(detail, 'Renamed')
+        self.assertContains(detail, 'Promoted')
+
+    @override_settings(MEDIA_ROOT='/tmp/test_media/')
+    def test_detail_fragment_keeps_attachments_fresh(self):
+        """Test that attachments are rendered outside the cached detail fragment."""
+        opportunity = self.opportunities[0]
+        url = reverse('opportunity', kwargs={'pk': opportunity.pk})
+        self.assertContains(self.client.get(url), 'No attachments available.')
+
+        OpportunityFile.objects.create(
+            opportunity=opportunity, file=SimpleUploadedFile('fresh.txt', b'data'))
+
+        self.assertNotContains(self.client.get(url), 'No attachments available.')
+
+
+@unittest.skipUnless(os.environ.get('RUN_BENCHMARKS'), 'set RUN_BENCHMARKS=1 to run')
+class OpportunityCardsBenchmark(TestCase):
+    """Render time and queries of a 15-card page with cold and hot caches."""
+
+    ROUNDS = 20
+
+    setUp = OpportunityFragmentCacheTest.setUp
+    _cards = OpportunityFragmentCacheTest._cards
+
+    def test_render_cold_and_hot(self):
+        def measure(clear):
+            timings, queries = [], 0
+            for _ in range(self.ROUNDS):
+                if clear:
+                    cache.clear()
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    self._cards()
+                    timings.append(time.perf_counter() - started)
+                queries = len(captured)
+            return sum(timings) / len(timings) * 1000, queries
+
+        cold_ms, cold_queries = measure(clear=True)
+        hot_ms, hot_queries = measure(clear=False)
+        print(f"\n15 cards: cold {cold_ms:.1f}ms/{cold_queries} queries, "
+              f"hot {hot_ms:.1f}ms/{hot_queries} queries")
+
 
 class OpportunityCreateViewTest(TestCase):
     """Test cases for OpportunityCreateView."""
@@ -171,6 +352,27 @@ class OpportunityCreateViewTest(TestCase):
         opp = Opportunity.objects.get(ref_no='OPP-2024-NEW')
         self.assertEqual(opp.created_by, self.user)
 
+    def test_new_opportunity_modal_from_list_prepends_card(self):
+        """Test that a save from the list's new opportunity modal adds only its card."""
+        self.client.login(username='testuser', password='testpass123')
+        list_url = 'http://testserver' + reverse('opportunities')
+        page = self.client.get(list_url)
+        modal = self.client.get(_hx_url(page, 'hx-get', reverse('new_opportunity')),
+                                HTTP_HX_REQUEST='true', HTTP_HX_CURRENT_URL=list_url)
+        self.assertTemplateUsed(modal, 'tracker/new_modal.html')
+
+        response = self.client.post(
+            _hx_url(modal, 'hx-post', reverse('new_opportunity')),
+            data={'ref_no': 'OPP-2024-NEW', 'title': 'New Opportunity', 'opp_type': 'RFP',
+                  'status': 1, 'countries': [self.country.code]},
+            HTTP_HX_REQUEST='true', HTTP_HX_CURRENT_URL=list_url)
+
+        opportunity = Opportunity.objects.get(ref_no='OPP-2024-NEW')
+        self.assertTemplateUsed(response, 'tracker/partials/opportunity_swap.html')
+        self.assertContains(response, 'hx-swap-oob="afterbegin:#opportunity-container"')
+        self.assertContains(response, f'id="opportunity-{opportunity.pk}"')
+        self.assertContains(response, '1 Opportunities Found')
+
     def test_opportunity_create_view_post_invalid(self):
         """Test POST request with invalid data."""
         self.client.login(username='testuser', password='testpass123')
@@ -271,6 +473,28 @@ class OpportunityCreateViewTest(TestCase):
         parent_eoi.refresh_from_db()
         self.assertEqual(parent_eoi.status, 11)  # Transferred to RFP
 
+    @override_settings(MEDIA_ROOT='/tmp/test_media/')
+    def test_opportunity_transfer_shares_attachments(self):
+        """Test that the RFP references the EOI documents without copying them."""
+        self.client.login(username='testuser', password='testpass123')
+        parent_eoi = Opportunity.objects.create(
+            ref_no='EOI-2024-002', title='Parent EOI', opp_type='EOI',
+            created_by=self.user, status=7)
+        tor = OpportunityFile.objects.create(
+            opportunity=parent_eoi, file=SimpleUploadedFile('ToR.pdf', b'terms'))
+
+        self.client.post(
+            reverse('new_opportunity') + f'?source_id={parent_eoi.id}&is_transfer=true',
+            data={'ref_no': 'RFP-2024-002', 'title': 'Child RFP', 'opp_type': 'RFP',
+                  'status': 1, 'source_id': str(parent_eoi.id),
+                  'countries': [self.country.code]})
+
+        child_file = Opportunity.objects.get(ref_no='RFP-2024-002').Files.get()
+        self.assertEqual(child_file.file.name, tor.file.name)
+        self.assertEqual(child_file.display_name, 'ToR.pdf')
+        child_file.delete()
+        tor.delete()
+
 
 class OpportunityUpdateViewTest(TestCase):
     """Test cases for OpportunityUpdateView."""
@@ -300,6 +524,27 @@ class OpportunityUpdateViewTest(TestCase):
         self.assertTemplateUsed(response, 'tracker/update.html')
         self.assertEqual(response.context['form'].instance, self.opportunity)
 
+    def test_update_page_defers_modals(self):
+        """Test that the update page stays within its query budget.
+
+        The status and submit proposal modals are loaded with htmx when
+        opened, so their forms are neither built nor rendered here.
+        """
+        self.client.login(username='testuser', password='testpass123')
+        url = reverse('update_opportunity', kwargs={'pk': self.opportunity.pk})
+        self.client.get(url)  # Warm the reference data and fragment caches
+
+        # Session, user, opportunity, its countries and partners, subscription
+        # and attachments
+        with self.assertNumQueries(7):
+            response = self.client.get(url)
+
+        self.assertNotIn('update_status_form', response.context)
+        self.assertNotIn('submit_proposal_form', response.context)
+        self.assertNotContains(response, 'id="submitProposalForm"')
+        self.assertContains(
+            response, reverse('udpate_status', kwargs={'pk': self.opportunity.pk}))
+
     def test_opportunity_update_view_post_valid(self):
         """Test POST request with valid update data."""
         self.client.login(username='testuser', password='testpass123')
@@ -319,6 +564,18 @@ class OpportunityUpdateViewTest(TestCase):
         self.assertEqual(self.opportunity.title, 'Updated Title')
         self.assertEqual(self.opportunity.updated_by, self.user)
 
+    def test_opportunity_update_htmx_elsewhere_redirects(self):
+        """Test that an htmx update sent from another page still goes back to the list."""
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.post(
+            reverse('update_opportunity', kwargs={'pk': self.opportunity.pk}) + '?status=1',
+            data={'ref_no': 'OPP-2024-UPDATE', 'title': 'Updated Title', 'opp_type': 'RFP',
+                  'status': 1, 'countries': [self.country.code]},
+            HTTP_HX_REQUEST='true')
+
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(response.headers['HX-Redirect'], reverse('opportunities') + '?status=1')
+
     def test_opportunity_update_preserves_ref_no(self):
         """Test that ref_no field is marked as readonly in update form.
 
@@ -589,6 +846,98 @@ class OpportunityStatusUpdateViewTest(TestCase):
         self.assertEqual(self.opportunity.status, 2)
         self.assertIsNone(self.opportunity.result_date)
 
+    def _patch(self, data):
+        return self.client.patch(
+            reverse('udpate_status', kwargs={'pk': self.opportunity.pk}),
+            urlencode(data, doseq=True), content_type='application/x-www-form-urlencoded',
+            HTTP_HX_REQUEST='true')
+
+    def test_status_patch_writes_only_transition_fields(self):
+        """Test that a PATCH saves the status fields with one UPDATE and swaps the card."""
+        self.client.login(username='testuser', password='testpass123')
+        with CaptureQueriesContext(connection) as queries:
+            response = self._patch(
+                {'status': '2', 'proposal_lead': self.user.id, 'lead_unit': self.unit.id})
+
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "opportunity"')]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('"title"', updates[0])
+        self.assertContains(response, 'id="leadFields" hx-swap-oob="true"')
+        self.assertContains(response, 'id="statusActions" hx-swap-oob="true"')
+        self.assertContains(response, 'name="status" value="2"')
+        self.assertNotContains(response, 'id="mainDiv"')
+        self.assertNotContains(response, 'name="title"')
+
+        self.opportunity.refresh_from_db()
+        self.assertEqual(self.opportunity.status, 2)
+        self.assertEqual(self.opportunity.lead_unit, self.unit)
+        self.assertEqual(self.opportunity.updated_by, self.user)
+        self.assertEqual(self.opportunity.title, 'Status Test')
+
+    def test_status_patch_keeps_result_date(self):
+        """Test that a PATCH without a result date keeps the recorded one."""
+        result_date = date.today() - timedelta(days=3)
+        Opportunity.objects.filter(pk=self.opportunity.pk).update(status=5, result_date=result_date)
+        self.client.login(username='testuser', password='testpass123')
+        self._patch({'status': '10'})
+
+        self.opportunity.refresh_from_db()
+        self.assertEqual(self.opportunity.status, 10)
+        self.assertEqual(self.opportunity.result_date, result_date)
+
+    def test_status_modal_from_filtered_list_removes_card(self):
+        """Test that a status change from a list card's modal removes a card leaving the filters."""
+        self.client.login(username='testuser', password='testpass123')
+        page = self.client.get(reverse('opportunities'))
+        self.assertContains(page, 'hx-replace-url="true"')
+        # The filter form's request, whose URL htmx then shows in the address bar
+        list_url = 'http://testserver' + reverse('opportunities') + '?status=1'
+        cards = self.client.get(list_url, HTTP_HX_REQUEST='true')
+        status_url = reverse('udpate_status', kwargs={'pk': self.opportunity.pk})
+        modal = self.client.get(_hx_url(cards, 'hx-get', status_url),
+                                HTTP_HX_REQUEST='true', HTTP_HX_CURRENT_URL=list_url)
+
+        response = self.client.patch(
+            _hx_url(modal, 'hx-patch', status_url),
+            urlencode({'status': '3'}), content_type='application/x-www-form-urlencoded',
+            HTTP_HX_REQUEST='true', HTTP_HX_CURRENT_URL=list_url)
+
+        self.assertContains(
+            response, f'id="opportunity-{self.opportunity.pk}" hx-swap-oob="delete"')
+        self.assertContains(response, '0 Opportunities Found')
+
+    def test_status_modal_from_list_swaps_card(self):
+        """Test that a status change from a list card's modal swaps only that card and the count."""
+        self.client.login(username='testuser', password='testpass123')
+        list_url = 'http://testserver' + reverse('opportunities')
+        page = self.client.get(list_url)
+        status_url = reverse('udpate_status', kwargs={'pk': self.opportunity.pk})
+        modal = self.client.get(_hx_url(page, 'hx-get', status_url),
+                                HTTP_HX_REQUEST='true', HTTP_HX_CURRENT_URL=list_url)
+
+        response = self.client.patch(
+            _hx_url(modal, 'hx-patch', status_url),
+            urlencode({'status': '2', 'proposal_lead': self.user.id, 'lead_unit': self.unit.id}),
+            content_type='application/x-www-form-urlencoded',
+            HTTP_HX_REQUEST='true', HTTP_HX_CURRENT_URL=list_url)
+
+        self.assertContains(
+            response, f'id="opportunity-{self.opportunity.pk}" hx-swap-oob="true"')
+        self.assertContains(response, reverse('submit_proposal', kwargs={'pk': self.opportunity.pk}))
+        self.assertContains(response, '<h4 id="oppCount" hx-swap-oob="true">1 Opportunities Found</h4>',
+                            html=True)
+
+    def test_status_patch_invalid_rerenders_modal(self):
+        """Test that an invalid PATCH returns the modal with its errors."""
+        self.client.login(username='testuser', password='testpass123')
+        response = self._patch({'status': '2'})
+
+        self.assertTemplateUsed(response, 'tracker/partials/update_status_modal.html')
+        self.assertEqual(response.headers['HX-Trigger'], 'form_invalid')
+        self.assertContains(response, 'Lead Unit is required')
+        self.opportunity.refresh_from_db()
+        self.assertEqual(self.opportunity.status, 1)
+
 
 class OpportunitySubmitViewTest(TestCase):
     """Test cases for OpportunitySubmitView."""
@@ -637,6 +986,49 @@ class OpportunitySubmitViewTest(TestCase):
         self.assertEqual(self.opportunity.status, 5)  # Submitted
         self.assertEqual(self.opportunity.lead_institute, self.institute)
 
+    def test_submit_proposal_invalid_rerenders_modal(self):
+        """Test that an invalid submission returns the modal with its errors."""
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.post(
+            reverse('submit_proposal', kwargs={'pk': self.opportunity.pk}),
+            data={'ref_no': 'OPP-2024-SUBMIT', 'title': 'Submit Test', 'opp_type': 'RFP',
+                  'status': 5},
+            HTTP_HX_REQUEST='true')
+
+        self.assertTemplateUsed(response, 'tracker/partials/submit_proposal_modal.html')
+        self.assertEqual(response.headers['HX-Trigger'], 'form_invalid')
+        self.assertContains(response, 'Select a Lead Organization')
+
+    def test_submit_proposal_patch_applies_partners_diff(self):
+        """Test that a PATCH submits with one UPDATE and only changes the partners that differ."""
+        kept = Institute.objects.create(code="KEPT", name="Kept")
+        dropped = Institute.objects.create(code="DROP", name="Dropped")
+        added = Institute.objects.create(code="ADD", name="Added")
+        self.opportunity.partners.add(kept, dropped)
+        self.client.login(username='testuser', password='testpass123')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(
+                reverse('submit_proposal', kwargs={'pk': self.opportunity.pk}),
+                urlencode({'status': 5, 'lead_institute': self.institute.id,
+                           'partners': [kept.id, added.id],
+                           'submission_date': date.today().isoformat(),
+                           'submission_validity': 30}, doseq=True),
+                content_type='application/x-www-form-urlencoded', HTTP_HX_REQUEST='true')
+
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "opportunity"')]
+        self.assertEqual(len(updates), 1)
+        self.assertContains(response, 'id="submitProposal"', count=0)
+        self.assertContains(response, 'id="update_result"')
+        self.assertContains(response, 'name="lead_institute"')
+
+        self.opportunity.refresh_from_db()
+        self.assertEqual(self.opportunity.status, 5)
+        self.assertEqual(self.opportunity.lead_institute, self.institute)
+        self.assertEqual(self.opportunity.submission_validity, 30)
+        self.assertEqual(set(self.opportunity.partners.all()), {kept, added})
+        self.assertEqual(self.opportunity.title, 'Submit Test')
+
 
 class OpportunityDetailViewTest(TestCase):
     """Test cases for OpportunityDetailView."""
@@ -674,6 +1066,56 @@ class OpportunityDetailViewTest(TestCase):
         data = response.json()
         self.assertIn('html', data)
 
+    def test_opportunity_detail_conditional_get(self):
+        """Test that an unchanged opportunity is answered with 304 before rendering."""
+        self.client.login(username='testuser', password='testpass123')
+        url = reverse('opportunity', kwargs={'pk': self.opportunity.pk})
+        response = self.client.get(url)
+        etag = response.headers['ETag']
+        self.assertEqual(response.headers['Cache-Control'], 'private, no-cache')
+
+        # Session, user, and the opportunity's updated_at with its attachments' stats
+        with self.assertNumQueries(3):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers['ETag'], etag)
+
+        ajax = self.client.get(url, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertNotEqual(ajax.headers['ETag'], etag)
+
+    @override_settings(MEDIA_ROOT='/tmp/test_media/')
+    def test_opportunity_detail_etag_changes_with_attachments(self):
+        """Test that attaching a file, which does not touch the opportunity, changes the ETag."""
+        self.client.login(username='testuser', password='testpass123')
+        url = reverse('opportunity', kwargs={'pk': self.opportunity.pk})
+        etag = self.client.get(url).headers['ETag']
+
+        OpportunityFile.objects.create(
+            opportunity=self.opportunity, file=ContentFile(b'notes', name='notes.txt'))
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    @override_settings(MEDIA_ROOT='/tmp/test_media/')
+    def test_opportunity_detail_last_modified_follows_attachments(self):
+        """Test that uploads and rendered thumbnails move Last-Modified past updated_at."""
+        self.client.login(username='testuser', password='testpass123')
+        url = reverse('opportunity', kwargs={'pk': self.opportunity.pk})
+        Opportunity.objects.filter(pk=self.opportunity.pk).update(
+            updated_at=timezone.now() - timedelta(days=1))
+        last_modified = self.client.get(url).headers['Last-Modified']
+
+        opp_file = OpportunityFile.objects.create(
+            opportunity=self.opportunity, file=ContentFile(b'notes', name='notes.txt'))
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['Last-Modified'], last_modified)
+
+        etag = response.headers['ETag']
+        OpportunityFile.objects.filter(pk=opp_file.pk).update(preview_ready_at=timezone.now())
+        self.assertNotEqual(self.client.get(url).headers['ETag'], etag)
+
 
 class OpportunityDetailAnonymousViewTest(TestCase):
     """Test cases for OpportunityDetailAnonymousView."""
@@ -699,6 +1141,27 @@ class OpportunityDetailAnonymousViewTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'tracker/detail_anonymous.html')
 
+    @override_settings(OPPORTUNITY_PUBLIC_CACHE_TIMEOUT=600)
+    def test_opportunity_detail_anonymous_is_publicly_cacheable(self):
+        """Test that the public page can be kept by a shared cache and revalidated."""
+        url = reverse('opportunity_anonymous', kwargs={'pk': self.opportunity.pk})
+        response = self.client.get(url)
+        cache_control = response.headers['Cache-Control']
+        self.assertIn('public', cache_control)
+        self.assertIn('s-maxage=600', cache_control)
+        self.assertIn('max-age=0', cache_control)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response.headers['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_opportunity_detail_anonymous_signed_in_is_private(self):
+        """Test that the page rendered for a signed-in user is neither shared nor validated."""
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(
+            reverse('opportunity_anonymous', kwargs={'pk': self.opportunity.pk}))
+        self.assertNotIn('ETag', response.headers)
+        self.assertEqual(response.headers['Cache-Control'], 'private, no-cache')
+
 
 class FileDeleteViewTest(TestCase):
     """Test cases for FileDeleteView."""
@@ -735,6 +1198,375 @@ class FileDeleteViewTest(TestCase):
             pk=opp_file.pk).exists())
 
 
+@override_settings(MEDIA_ROOT='/tmp/test_media/',
+                   ATTACHMENT_ARCHIVE_CACHE_DIR='/tmp/test_media/archive_cache/')
+@patch('tracker.tasks.evict_archive_cache.delay')
+class DownloadFolderViewTest(TestCase):
+    """Test cases for DownloadFolderView."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.client = TestClient()
+        self.user = User.objects.create_user(
+            username='testuser', password='testpass123')
+        self.opportunity = Opportunity.objects.create(
+            ref_no='OPP-2024-ZIP',
+            title='Download Test',
+            opp_type='RFP',
+            created_by=self.user,
+            status=1
+        )
+        self.client.login(username='testuser', password='testpass123')
+
+    def tearDown(self):
+        for opp_file in OpportunityFile.objects.all():
+            opp_file.delete()
+        shutil.rmtree('/tmp/test_media/archive_cache/', ignore_errors=True)
+
+    def _download(self, **headers):
+        return self.client.get(
+            reverse('download_folder', kwargs={'pk': self.opportunity.pk}), headers=headers)
+
+    def _attach(self, name, content):
+        return OpportunityFile.objects.create(
+            opportunity=self.opportunity, file=SimpleUploadedFile(name, content))
+
+    def test_download_streams_all_attachments(self, mock_evict):
+        """Test that the archive is streamed and contains every attachment."""
+        self._attach('terms.txt', b'terms of reference ' * 100)
+        self._attach('photo.jpg', b'\xff\xd8' + os.urandom(1000))
+
+        response = self.client.get(
+            reverse('download_folder', kwargs={'pk': self.opportunity.pk}))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        self.assertIn('OPP_2024_ZIP.zip', response['Content-Disposition'])
+
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertIsNone(archive.testzip())
+        self.assertEqual(archive.read('terms.txt'), b'terms of reference ' * 100)
+        self.assertEqual(archive.getinfo('terms.txt').compress_type, zipfile.ZIP_DEFLATED)
+        self.assertEqual(archive.getinfo('photo.jpg').compress_type, zipfile.ZIP_STORED)
+
+    def test_large_attachment_is_streamed_in_chunks(self, mock_evict):
+        """Test that no chunk holds more than one read of a member."""
+        content = os.urandom(5 * 1024 * 1024)
+        self._attach('scan.png', content)
+
+        response = self.client.get(
+            reverse('download_folder', kwargs={'pk': self.opportunity.pk}))
+
+        chunks = list(response.streaming_content)
+        self.assertGreater(len(chunks), 50)
+        self.assertLessEqual(max(len(chunk) for chunk in chunks), 65 * 1024)
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(chunks)))
+        self.assertEqual(archive.read('scan.png'), content)
+
+    def test_download_without_attachments(self, mock_evict):
+        """Test that an opportunity without files returns 404."""
+        response = self.client.get(
+            reverse('download_folder', kwargs={'pk': self.opportunity.pk}))
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_second_download_is_served_from_cache(self, mock_evict):
+        """Test that a completed archive is cached and served with validators."""
+        self._attach('terms.txt', b'terms of reference')
+        streamed = b''.join(self._download().streaming_content)
+        mock_evict.assert_called_once()
+
+        with patch('tracker.views.stream_zip') as mock_stream:
+            response = self._download()
+
+        mock_stream.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), streamed)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertTrue(response['ETag'].startswith('"'))
+
+    def test_cache_hits_keep_last_modified(self, mock_evict):
+        """Test that recording a cache hit does not change the archive's Last-Modified."""
+        self._attach('terms.txt', b'terms of reference')
+        b''.join(self._download().streaming_content)
+        archive_dir = os.path.join('/tmp/test_media/archive_cache/', str(self.opportunity.pk))
+        path = os.path.join(archive_dir, os.listdir(archive_dir)[0])
+        built = int(time.time()) - 3600
+        os.utime(path, (built, built))
+
+        last_modified = self._download()['Last-Modified']
+        self.assertEqual(last_modified, http_date(built))
+        self.assertEqual(self._download()['Last-Modified'], last_modified)
+        self.assertGreater(os.stat(path).st_atime, built)
+
+    def test_cached_archive_supports_ranges(self, mock_evict):
+        """Test partial and conditional requests against a cached archive."""
+        self._attach('terms.txt', b'terms of reference')
+        streamed = b''.join(self._download().streaming_content)
+        etag = self._download()['ETag']
+
+        response = self._download(Range='bytes=10-19', If_Range=etag)
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(streamed)}')
+        self.assertEqual(b''.join(response.streaming_content), streamed[10:20])
+
+        response = self._download(Range='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content), streamed[-5:])
+
+        response = self._download(Range=f'bytes={len(streamed)}-')
+        self.assertEqual(response.status_code, 416)
+
+        response = self._download(If_None_Match=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_new_attachment_invalidates_cache(self, mock_evict):
+        """Test that adding or deleting a file yields a fresh archive."""
+        first = self._attach('terms.txt', b'terms of reference')
+        b''.join(self._download().streaming_content)
+        etag = self._download()['ETag']
+
+        self._attach('budget.txt', b'budget')
+        response = self._download()
+        self.assertTrue(response.has_header('ETag'))
+        self.assertNotEqual(response['ETag'], etag)
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(sorted(archive.namelist()), ['budget.txt', 'terms.txt'])
+
+        first.delete()
+        self.assertFalse(os.path.exists(os.path.join(
+            '/tmp/test_media/archive_cache/', str(self.opportunity.pk))))
+
+
+@override_settings(MEDIA_ROOT='/tmp/test_media/')
+class MediaFileViewTest(TestCase):
+    """Test cases for the attachment serving views."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.client = TestClient()
+        self.user = User.objects.create_user(
+            username='testuser', password='testpass123')
+        self.opportunity = Opportunity.objects.create(
+            ref_no='OPP-2024-MEDIA',
+            title='Media Test',
+            opp_type='RFP',
+            created_by=self.user,
+            status=1
+        )
+        self.opp_file = OpportunityFile.objects.create(
+            opportunity=self.opportunity,
+            file=SimpleUploadedFile('terms.pdf', b'%PDF-1.4 terms of reference'))
+        self.url = self.opp_file.file.url
+
+    def tearDown(self):
+        self.opp_file.delete()
+
+    def test_media_requires_login(self):
+        """Test that anonymous users cannot fetch attachments by path."""
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 302)
+
+    def test_media_served_with_ranges(self):
+        """Test that attachments are served by Django without a sendfile backend."""
+        self.client.login(username='testuser', password='testpass123')
+
+        response = self.client.get(self.url, headers={'Range': 'bytes=0-7'})
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+
+    def test_detail_modal_links_media_url(self):
+        """Test that the signed-in detail modal links attachments through the media view."""
+        self.client.login(username='testuser', password='testpass123')
+
+        response = self.client.get(reverse('opportunity', args=[self.opportunity.pk]),
+                                   HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+
+        html = response.json()['html']
+        self.assertIn(f'href="{self.url}"', html)
+
+    def test_unknown_media_path_returns_404(self):
+        """Test that only files attached to an opportunity are served."""
+        self.client.login(username='testuser', password='testpass123')
+
+        response = self.client.get('/media/archive_cache/other.zip')
+
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(MEDIA_SENDFILE_BACKEND='nginx',
+                       MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/')
+    def test_nginx_accel_redirect(self):
+        """Test that the transfer is handed to nginx."""
+        self.client.login(username='testuser', password='testpass123')
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'],
+                         f'/protected-media/{self.opp_file.file.name}')
+        self.assertEqual(response.content, b'')
+
+    @override_settings(MEDIA_SENDFILE_BACKEND='apache')
+    def test_apache_sendfile(self):
+        """Test that the transfer is handed to Apache."""
+        self.client.login(username='testuser', password='testpass123')
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response['X-Sendfile'], self.opp_file.file.path)
+
+    def test_public_page_links_media_view(self):
+        """Test that the public page lists attachments to signed-in visitors only, via the media view."""
+        url = reverse('opportunity_anonymous', args=[self.opportunity.pk])
+        self.assertNotContains(self.client.get(url), 'terms.pdf')
+
+        self.client.login(username='testuser', password='testpass123')
+        self.assertContains(self.client.get(url), f'href="{self.url}"')
+
+
+@override_settings(MEDIA_ROOT='/tmp/test_media/',
+                   FILE_UPLOAD_SESSION_DIR='/tmp/test_media/upload_sessions/')
+class FileUploadViewTest(TestCase):
+    """Test cases for the resumable chunked upload endpoints."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.client = TestClient()
+        self.user = User.objects.create_user(
+            username='testuser', password='testpass123')
+        self.country = Country.objects.create(code='XU', name='Upload Country')
+        self.client.login(username='testuser', password='testpass123')
+        self.content = b'tender dossier ' * 1000
+
+    def tearDown(self):
+        for opp_file in OpportunityFile.objects.all():
+            opp_file.delete()
+        shutil.rmtree('/tmp/test_media/upload_sessions/', ignore_errors=True)
+
+    def _create(self, name='dossier.pdf', size=None):
+        return self.client.post(reverse('file_uploads'), headers={
+            'Upload-Length': str(len(self.content) if size is None else size),
+            'Upload-Metadata': 'filename ' + base64.b64encode(name.encode()).decode(),
+        })
+
+    def _patch(self, location, offset, data):
+        return self.client.patch(location, data=data,
+                                 content_type='application/offset+octet-stream',
+                                 headers={'Upload-Offset': str(offset)})
+
+    def _upload(self):
+        location = self._create()['Location']
+        self._patch(location, 0, self.content[:6000])
+        self._patch(location, 6000, self.content[6000:])
+        return FileUpload.objects.get()
+
+    def test_create_upload_session(self):
+        """Test that a session is opened with its size and name."""
+        response = self._create()
+
+        self.assertEqual(response.status_code, 201)
+        upload = FileUpload.objects.get()
+        self.assertEqual(response['Location'],
+                         reverse('file_upload', kwargs={'pk': upload.pk}))
+        self.assertEqual(upload.filename, 'dossier.pdf')
+        self.assertEqual(upload.size, len(self.content))
+        self.assertEqual(upload.created_by, self.user)
+
+    @override_settings(FILE_UPLOAD_MAX_SIZE=100)
+    def test_create_rejects_large_files(self):
+        """Test that sessions above FILE_UPLOAD_MAX_SIZE are refused."""
+        self.assertEqual(self._create(size=101).status_code, 413)
+
+    def test_chunks_are_assembled(self):
+        """Test that chunks are appended and the session completes."""
+        location = self._create()['Location']
+
+        response = self._patch(location, 0, self.content[:6000])
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(response['Upload-Offset'], '6000')
+        self.assertFalse(FileUpload.objects.get().is_complete)
+
+        response = self._patch(location, 6000, self.content[6000:])
+        self.assertEqual(response['Upload-Offset'], str(len(self.content)))
+
+        upload = FileUpload.objects.get()
+        self.assertTrue(upload.is_complete)
+        with open(upload.path, 'rb') as assembled:
+            self.assertEqual(assembled.read(), self.content)
+
+    def test_resume_after_interruption(self):
+        """Test that HEAD reports the stored offset and wrong offsets conflict."""
+        location = self._create()['Location']
+        self._patch(location, 0, self.content[:4000])
+
+        response = self.client.head(location)
+        self.assertEqual(response['Upload-Offset'], '4000')
+
+        response = self._patch(location, 2000, self.content[2000:])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Upload-Offset'], '4000')
+
+        self._patch(location, 4000, self.content[4000:])
+        self.assertTrue(FileUpload.objects.get().is_complete)
+
+    def test_chunk_beyond_length_is_rejected(self):
+        """Test that a session cannot grow past its declared size."""
+        location = self._create(size=10)['Location']
+
+        response = self._patch(location, 0, b'x' * 11)
+
+        self.assertEqual(response.status_code, 413)
+
+    def test_other_users_session_not_found(self):
+        """Test that sessions are private to their creator."""
+        location = self._create()['Location']
+        User.objects.create_user(username='other', password='testpass123')
+        self.client.login(username='other', password='testpass123')
+
+        self.assertEqual(self.client.head(location).status_code, 404)
+
+    def test_form_attaches_finished_upload(self):
+        """Test that saving the form attaches the referenced upload."""
+        upload = self._upload()
+
+        response = self.client.post(reverse('new_opportunity'), data={
+            'ref_no': 'OPP-2024-UPLOAD',
+            'title': 'Chunked Upload',
+            'opp_type': 'RFP',
+            'status': 1,
+            'countries': [self.country.code],
+            'uploads': [str(upload.pk)],
+        })
+
+        self.assertEqual(response.status_code, 302)
+        opp_file = Opportunity.objects.get(ref_no='OPP-2024-UPLOAD').Files.get()
+        self.assertEqual(opp_file.display_name, 'dossier.pdf')
+        with opp_file.file.open('rb') as attached:
+            self.assertEqual(attached.read(), self.content)
+        self.assertFalse(FileUpload.objects.exists())
+        self.assertFalse(os.path.exists(upload.path))
+
+    def test_form_rejects_unfinished_upload(self):
+        """Test that incomplete uploads cannot be referenced."""
+        location = self._create()['Location']
+        self._patch(location, 0, self.content[:10])
+
+        response = self.client.post(reverse('new_opportunity'), data={
+            'ref_no': 'OPP-2024-PARTIAL',
+            'title': 'Partial Upload',
+            'opp_type': 'RFP',
+            'status': 1,
+            'countries': [self.country.code],
+            'uploads': [str(FileUpload.objects.get().pk)],
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('uploads', response.context['form'].errors)
+
+
 class NewFundingAgencyViewTest(TestCase):
     """Test cases for NewFundingAgencyView."""
 
@@ -782,6 +1614,64 @@ class NewFundingAgencyViewTest(TestCase):
         self.assertIn('name', data)
 
 
+class AutocompleteViewTest(TestCase):
+    """Test cases for AutocompleteView."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.client = TestClient()
+        self.user = User.objects.create_user(
+            username='testuser', first_name='Test', last_name='User', password='testpass123')
+        FundingAgency.objects.bulk_create(
+            [FundingAgency(code=f'AC{i:02d}', name=f'Agency {i:02d}') for i in range(25)])
+        FundingAgency.objects.create(code='WHO', name='World Health Organization')
+
+    def test_login_required(self):
+        """Test that anonymous users are redirected."""
+        response = self.client.get(reverse('autocomplete', args=['funding_agency']))
+        self.assertEqual(response.status_code, 302)
+
+    def test_prefix_search_on_code_and_name(self):
+        """Test that the term matches the start of the code or the name."""
+        self.client.login(username='testuser', password='testpass123')
+        url = reverse('autocomplete', args=['funding_agency'])
+
+        by_code = self.client.get(url, {'term': 'who'}).json()
+        by_name = self.client.get(url, {'term': 'World'}).json()
+        infix = self.client.get(url, {'term': 'Health'}).json()
+
+        self.assertEqual([r['text'] for r in by_code['results']],
+                         ['WHO | World Health Organization'])
+        self.assertEqual(by_name['results'], by_code['results'])
+        self.assertEqual(infix['results'], [])
+
+    def test_results_are_paginated(self):
+        """Test that results come in pages with a "more" flag."""
+        self.client.login(username='testuser', password='testpass123')
+        url = reverse('autocomplete', args=['funding_agency'])
+
+        first = self.client.get(url, {'term': 'AC'}).json()
+        second = self.client.get(url, {'term': 'AC', 'page': 2}).json()
+
+        self.assertEqual(len(first['results']), 20)
+        self.assertTrue(first['pagination']['more'])
+        self.assertEqual(len(second['results']), 5)
+        self.assertFalse(second['pagination']['more'])
+
+    def test_user_labels(self):
+        """Test that users are listed by full name."""
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(reverse('autocomplete', args=['user']), {'term': 'tes'})
+        self.assertEqual(response.json()['results'],
+                         [{'id': str(self.user.pk), 'text': 'Test User'}])
+
+    def test_unknown_entity(self):
+        """Test that unknown tables are not searchable."""
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(reverse('autocomplete', args=['opportunity']))
+        self.assertEqual(response.status_code, 404)
+
+
 class NewClientViewTest(TestCase):
     """Test cases for NewClientView."""
 
@@ -848,3 +1738,117 @@ class TransferOpportunityViewTest(TestCase):
 
         self.assertEqual(response.status_code, 200)
         self.assertIn('HX-Redirect', response.headers)
+
+
+@override_settings(MEDIA_ROOT='/tmp/test_media/')
+class ImportJobAdminTest(TestCase):
+    """Test cases for the import job pages of the admin."""
+
+    def setUp(self):
+        """Set up a staff user and a job being validated."""
+        self.user = User.objects.create_superuser(username='admin', password='testpass123')
+        self.client.login(username='admin', password='testpass123')
+        self.job = ImportJob.objects.create(
+            resource='unit', created_by=self.user, status='validating', total_rows=4,
+            processed_rows=1, file=SimpleUploadedFile('units.csv', b'code,name'))
+
+    @patch('tracker.admin.validate_import_job.delay')
+    def test_upload_queues_validation(self, mock_validate):
+        """Test that adding a job starts its validation after commit."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('admin:tracker_importjob_add'), {
+                'resource': 'client',
+                'file': SimpleUploadedFile('clients.csv', b'code,name,client_type'),
+            })
+
+        job = ImportJob.objects.get(resource='client')
+        self.assertEqual(job.created_by, self.user)
+        mock_validate.assert_called_once_with(str(job.pk))
+
+    def test_change_page_shows_progress(self):
+        """Test that the job page embeds the polled progress fragment."""
+        response = self.client.get(reverse('admin:tracker_importjob_change', args=[self.job.pk]))
+
+        self.assertContains(response, 'id="import-job-progress"')
+        self.assertContains(response, 'Validating')
+
+    def test_progress_polls_while_running(self):
+        """Test that the progress fragment keeps polling until the job is finished."""
+        url = reverse('admin:tracker_importjob_progress', args=[self.job.pk])
+
+        response = self.client.get(url)
+        self.assertContains(response, 'hx-trigger="every 2s"')
+        self.assertContains(response, '1 / 4 rows validated')
+
+        ImportJob.objects.filter(pk=self.job.pk).update(
+            status='invalid', errors=[{'row': 3, 'errors': ['code: required']}])
+        response = self.client.get(url)
+        self.assertNotContains(response, 'hx-trigger')
+        self.assertContains(response, 'code: required')
+
+    @patch('tracker.admin.apply_import_job.delay')
+    def test_apply_only_valid_jobs(self, mock_apply):
+        """Test that applying queues the import once the job is valid."""
+        url = reverse('admin:tracker_importjob_apply', args=[self.job.pk])
+
+        self.client.post(url)
+        mock_apply.assert_not_called()
+
+        ImportJob.objects.filter(pk=self.job.pk).update(status='valid')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url)
+        mock_apply.assert_called_once_with(str(self.job.pk))
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, 'importing')
+
+
+@override_settings(MEDIA_ROOT='/tmp/test_media/')
+class ExportJobAdminTest(TestCase):
+    """Test cases for background exports from the admin."""
+
+    def setUp(self):
+        """Set up a staff user and the export URL with a changelist search."""
+        self.user = User.objects.create_superuser(username='admin', password='testpass123')
+        self.client.login(username='admin', password='testpass123')
+        self.url = reverse('admin:tracker_opportunity_export') + '?q=Road'
+        formats = [f.__name__ for f in admin.site._registry[Opportunity].get_export_formats()]
+        self.csv = formats.index('CSV')
+
+    @patch('tracker.admin.run_export_job.delay')
+    def test_background_export_creates_job(self, mock_run):
+        """Test that the export is queued with the changelist filters."""
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, {
+                'format': self.csv, 'resource': 0, 'background': 'on'})
+
+        job = ExportJob.objects.get()
+        self.assertRedirects(response, reverse('admin:tracker_opportunity_changelist') + '?q=Road',
+                             fetch_redirect_response=False)
+        self.assertEqual((job.model, job.query, job.file_format),
+                         ('tracker.opportunity', 'q=Road', 'csv'))
+        mock_run.assert_called_once_with(str(job.pk))
+
+    def test_export_without_background_is_immediate(self):
+        """Test that the default export still returns the file."""
+        self.assertContains(self.client.get(self.url), 'name="background"')
+
+        response = self.client.post(self.url, {'format': self.csv, 'resource': 0})
+
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertFalse(ExportJob.objects.exists())
+
+    def test_download_is_limited_to_owner(self):
+        """Test that other staff users cannot download someone's export."""
+        job = ExportJob.objects.create(model='tracker.opportunity', file_format='csv',
+                                       status='done', created_by=self.user)
+        job.file.save('export.csv', ContentFile(b'ref_no\nOPP-1\n'))
+        url = reverse('admin:tracker_exportjob_download', args=[job.pk])
+
+        response = self.client.get(url)
+        self.assertEqual(b''.join(response.streaming_content), b'ref_no\nOPP-1\n')
+        self.assertIn('attachment', response['Content-Disposition'])
+
+        other = User.objects.create_user(username='staff', password='testpass123', is_staff=True)
+        other.user_permissions.add(*Permission.objects.filter(codename='view_exportjob'))
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(url).status_code, 404)
@@ -1,7 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from .views import DownloadFolderView, FileDeleteView, OpportunityListView, OpportunityViewSet, OpportunityUpdateView, OpportunityCreateView, OpportunitySubmitView, OpportunityStatusUpdateView, OpportunityDetailView, OpportunityDetailAnonymousView, IndexView, NewFundingAgencyView, NewClientView, TransferOpportunityView
+from .views import DownloadFolderView, FileUploadCreateView, FileUploadView, FileDeleteView, OpportunityListView, OpportunityViewSet, OpportunityUpdateView, OpportunityCreateView, OpportunitySubmitView, OpportunityStatusUpdateView, OpportunityDetailView, OpportunityDetailAnonymousView, IndexView, AutocompleteView, NewFundingAgencyView, NewClientView, TransferOpportunityView
 
 router = DefaultRouter()
 router.register(r"Opportunity", OpportunityViewSet)
@@ -23,11 +23,15 @@ urlpatterns = [
          OpportunityStatusUpdateView.as_view(), name="udpate_status"),
     path("delete_attachment/<int:pk>/",
          FileDeleteView.as_view(), name="delete_attachment"),
+    path("uploads/", FileUploadCreateView.as_view(), name="file_uploads"),
+    path("uploads/<uuid:pk>/", FileUploadView.as_view(), name="file_upload"),
     path("opportunity/download/<uuid:pk>/",
          DownloadFolderView.as_view(), name="download_folder"),
     path("opportunity/new_funding_agency/",
          NewFundingAgencyView.as_view(), name="new_funding_agency"),    path("opportunity/new_client/",
                                                                              NewClientView.as_view(), name="new_client"),
+    path("autocomplete/<str:entity>/",
+         AutocompleteView.as_view(), name="autocomplete"),
     path("opportunity/<uuid:pk>/transfer",
          TransferOpportunityView.as_view(), name="transfer_opportunity"),
 ]
@@ -1,14 +1,18 @@
+import base64
 import os
 import re
-import zipfile
 from typing import Any
+from urllib.parse import urlsplit
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_not_required
+from django.db.models import Q
+from django.utils import timezone
 from django.utils.decorators import method_decorator
-from django.http import HttpRequest, HttpResponse, JsonResponse
-from django.shortcuts import render
+from django.http import (Http404, HttpRequest, HttpResponse, HttpResponseRedirect, JsonResponse,
+                         QueryDict, StreamingHttpResponse)
+from django.shortcuts import get_object_or_404, render
 from django.template.loader import render_to_string
 from django.urls import reverse, reverse_lazy
 from django.views import View
@@ -24,7 +28,14 @@ from notification.models import OpportunitySubscription
 from .forms import (OpportunityDetailForm, OpportunityDetailAnonymousForm, OpportunityForm,
                     OpportunitySearchForm, SubmitProposalForm,
                     UpdateOpportunityForm, UpdateStatusForm, FundingAgencyForm, ClientForm)
-from .models import Opportunity, OpportunityFile
+from .helpers.attachment_search import search_attachments
+from .helpers.autocomplete import SOURCES, search
+from .helpers.conditional import ConditionalGetMixin, opportunity_validators, queryset_validators
+from .helpers.archive_cache import archive_key, cache_archive, get_cached_archive
+from .helpers.file_response import ranged_file_response, send_field_file
+from .helpers.uploads import UploadOffsetMismatch, append_chunk, attach_uploads
+from .helpers.zip_stream import stream_zip, unique_arcnames
+from .models import FileUpload, Opportunity, OpportunityFile
 
 from .serializers import OpportunitySerializer
 
@@ -32,6 +43,65 @@ from .serializers import OpportunitySerializer
 User = get_user_model()
 
 
+def _attach_files(request, opportunity, form):
+    """Attach the form's finished uploads and any files posted the plain multipart way."""
+    uploads = form.cleaned_data.get("uploads") or FileUpload.objects.none()
+    attach_uploads(opportunity, uploads.filter(created_by=request.user),
+                   request.FILES.getlist("files"))
+
+
+def _subscription_kwargs(user, opportunity):
+    """The update form's is_subscribed and digest_mode, from the user's subscription."""
+    subscription = OpportunitySubscription.objects.filter(
+        user=user, opportunity=opportunity).values("is_active", "digest_mode").first()
+    if subscription is None:
+        return {}
+    return {"is_subscribed": subscription["is_active"], "digest_mode": subscription["digest_mode"]}
+
+
+def _patch_data(request):
+    # Django only parses POST bodies; htmx sends PATCH forms urlencoded
+    return QueryDict(request.body, encoding=request.encoding)
+
+
+def _transition_response(request, opportunity):
+    """Swap out-of-band only what a status transition changed on the update page.
+
+    The rest of the main form is left alone, so edits not saved yet survive.
+    """
+    form = UpdateOpportunityForm(instance=opportunity)
+    context = {"opportunity": opportunity, "object": opportunity, "form": form}
+    return render(request, "tracker/partials/update_transition.html", context)
+
+
+def _list_url(request):
+    """The list page an htmx request was sent from, or None.
+
+    The list's filter form keeps the page URL in step with the filters
+    (hx-replace-url), so the URL htmx reports in HX-Current-URL carries them.
+    """
+    current_url = request.htmx.current_url if request.htmx else None
+    if current_url and urlsplit(current_url).path == reverse("opportunities"):
+        return urlsplit(current_url)
+    return None
+
+
+def _list_swap_response(request, list_url, opportunity, created=False):
+    """Swap the changed card and the opportunity count into the list page out-of-band.
+
+    A card that no longer matches the list filters is removed, and a new one
+    is added at the top.
+    """
+    opportunities = _filter_opportunities(QueryDict(list_url.query), request.user)
+    context = {
+        "opportunity": opportunity,
+        "listed": opportunities.filter(pk=opportunity.pk).exists(),
+        "opportunity_count": opportunities.count(),
+        "created": created,
+    }
+    return render(request, "tracker/partials/opportunity_swap.html", context)
+
+
 class OpportunityViewSet(viewsets.ModelViewSet):
     authentication_classes = [JWTAuthentication]  # Required JWT token
     permission_classes = [IsAuthenticated]  # Only allow authenticated users
@@ -47,60 +117,82 @@ class IndexView(View):
         return render(request, self.template_name)
 
 
-class OpportunityListView(ListView):
+def _filter_opportunities(params, user):
+    """The opportunities matching the list page's search filters in `params`."""
+    opportunities = Opportunity.objects.all().order_by("-created_at")
+    form = OpportunitySearchForm(params or None)
+
+    # Apply filter
+    if form.is_valid():
+        ref_no = form.cleaned_data.get('ref_no', None)
+        title = form.cleaned_data.get('title', None)
+        funding_agency = form.cleaned_data.get('funding_agency', None)
+        client = form.cleaned_data.get('client', None)
+        status = form.cleaned_data.get('status', None)
+        opp_type = form.cleaned_data.get('opp_type', None)
+        country = form.cleaned_data.get('country', None)
+        is_subscribed = form.cleaned_data.get('is_subscribed', None)
+        search_in_attachments = form.cleaned_data.get(
+            'search_attachments', None)
+        is_noncompetitive = form.cleaned_data.get(
+            'is_noncompetitive', None)
+
+        if ref_no:
+            opportunities = opportunities.filter(ref_no__icontains=ref_no)
+        if title and search_in_attachments:
+            # Attachment matches come from the text index, never the files
+            opportunities = opportunities.filter(
+                Q(title__icontains=title) | Q(id__in=search_attachments(title)))
+        elif title:
+            opportunities = opportunities.filter(title__icontains=title)
+        if funding_agency:
+            opportunities = opportunities.filter(
+                funding_agency=funding_agency)
+        if client:
+            opportunities = opportunities.filter(client=client)
+        if status:
+            opportunities = opportunities.filter(status=status)
+        if opp_type:
+            opportunities = opportunities.filter(opp_type=opp_type)
+        if country:
+            opportunities = opportunities.filter(countries=country)
+        if is_noncompetitive:
+            opportunities = opportunities.filter(
+                is_noncompetitive=is_noncompetitive)
+        if is_subscribed:
+            subscriptions = OpportunitySubscription.objects.filter(
+                user=user,
+                is_active=True
+            )
+
+            opportunity_ids = subscriptions.values_list(
+                'opportunity', flat=True)
+
+            opportunities = opportunities.filter(
+                id__in=opportunity_ids)
+
+    return opportunities
+
+
+class OpportunityListView(ConditionalGetMixin, ListView):
     model = Opportunity
     template_name = "tracker/list.html"
     paginate_by = 15
     form_class = OpportunitySearchForm
+    vary_on = ("HX-Request", )
 
-    def get_queryset(self):
-        opportunities = Opportunity.objects.all().order_by("-created_at")
-        form = OpportunitySearchForm(self.request.GET or None)
+    def get_validators(self):
+        # Only the htmx card pages; the full page carries the user's CSRF token
+        if not self.request.htmx:
+            return None
+        opportunities = _filter_opportunities(self.request.GET, self.request.user)
+        return queryset_validators(
+            opportunities, sorted(self.request.GET.lists()), self.request.user.pk)
 
-        # Apply filter
-        if form.is_valid():
-            ref_no = form.cleaned_data.get('ref_no', None)
-            title = form.cleaned_data.get('title', None)
-            funding_agency = form.cleaned_data.get('funding_agency', None)
-            client = form.cleaned_data.get('client', None)
-            status = form.cleaned_data.get('status', None)
-            opp_type = form.cleaned_data.get('opp_type', None)
-            country = form.cleaned_data.get('country', None)
-            is_subscribed = form.cleaned_data.get('is_subscribed', None)
-            is_noncompetitive = form.cleaned_data.get(
-                'is_noncompetitive', None)
-
-            if ref_no:
-                opportunities = opportunities.filter(ref_no__icontains=ref_no)
-            if title:
-                opportunities = opportunities.filter(title__icontains=title)
-            if funding_agency:
-                opportunities = opportunities.filter(
-                    funding_agency=funding_agency)
-            if client:
-                opportunities = opportunities.filter(client=client)
-            if status:
-                opportunities = opportunities.filter(status=status)
-            if opp_type:
-                opportunities = opportunities.filter(opp_type=opp_type)
-            if country:
-                opportunities = opportunities.filter(countries=country)
-            if is_noncompetitive:
-                opportunities = opportunities.filter(
-                    is_noncompetitive=is_noncompetitive)
-            if is_subscribed:
-                subscriptions = OpportunitySubscription.objects.filter(
-                    user=self.request.user,
-                    is_active=True
-                )
-
-                opportunity_ids = subscriptions.values_list(
-                    'opportunity', flat=True)
-
-                opportunities = opportunities.filter(
-                    id__in=opportunity_ids)
-
-        return opportunities or Opportunity.objects.none()
+    def get_queryset(self):
+        # The proposal lead is part of the cached card's key, the creator is rendered outside it
+        return _filter_opportunities(self.request.GET, self.request.user).select_related(
+            'created_by', 'proposal_lead')
 
     def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
         context = super().get_context_data(**kwargs)
@@ -179,10 +271,8 @@ class OpportunityCreateView(CreateView):
         with transaction.atomic():
             response = super().form_valid(form)
 
-            # Handle file upload
-            files = self.request.FILES.getlist("files")
-            for f in files:
-                OpportunityFile.objects.create(opportunity=self.object, file=f)
+            # Attach the finished chunked uploads
+            _attach_files(self.request, self.object, form)
 
             # If this is a transfer operation, update the parent opportunity status to "Transfer to RFP"
             # Only update status after the new RFP opportunity is successfully created
@@ -190,7 +280,15 @@ class OpportunityCreateView(CreateView):
                 parent_opportunity.status = 11  # Transfer to RFP
                 parent_opportunity.save()
 
+                # The RFP keeps the EOI documents; the blobs are shared, not copied
+                for opportunity_file in parent_opportunity.Files.all():
+                    opportunity_file.copy_to(self.object)
+
         headers = {"HX-Trigger": "refresh_opp_list"}
+        # The list's new opportunity modal gets the card added in place
+        list_url = _list_url(self.request)
+        if list_url:
+            return _list_swap_response(self.request, list_url, self.object, created=True)
         if self.request.htmx:
             return HttpResponse(status=204, headers=headers)
         else:
@@ -232,11 +330,8 @@ class OpportunityUpdateView(UpdateView):
 
         response = super().form_valid(form)
 
-        # handle file upload
-        # Handle file upload
-        files = self.request.FILES.getlist("files")
-        for f in files:
-            OpportunityFile.objects.create(opportunity=self.object, file=f)
+        # Attach the finished chunked uploads
+        _attach_files(self.request, self.object, form)
 
         if self.request.htmx:
             headers = {"HX-Redirect": str(self.get_success_url())}
@@ -244,28 +339,17 @@ class OpportunityUpdateView(UpdateView):
 
         return response
 
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        if self.request.method == "GET":
+            kwargs.update(_subscription_kwargs(self.request.user, self.object))
+        return kwargs
+
     def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
+        # The status and submit proposal modals are fetched with htmx when opened,
+        # so only the main form is built here
         context = super().get_context_data(**kwargs)
 
-        subscription = OpportunitySubscription.objects.filter(
-            user=self.request.user,
-            opportunity=self.object,
-            is_active=True
-        ).first()
-
-        if 'form' not in kwargs:
-            context['form'] = UpdateOpportunityForm(
-                instance=self.object, is_subscribed=subscription is not None)
-        else:
-            context['form'] = kwargs['form']  # Preserve form with errors
-
-        context['update_status_form'] = UpdateStatusForm(instance=self.object)
-        if not self.submit_proposal_form:
-            context['submit_proposal_form'] = SubmitProposalForm(
-                instance=self.object)
-        else:
-            context['submit_proposal_form'] = self.submit_proposal_form
-
         filters = self.request.GET.copy()
         filters.pop('page', None)  # Remove 'page' if present
         context['back_query'] = filters.urlencode()
@@ -281,12 +365,6 @@ class OpportunityUpdateView(UpdateView):
             return "tracker/update.html"
         return super().get_template_names()
 
-    def dispatch(self, request, *args, **kwargs):
-        # Extract additional kwargs if provided
-        self.submit_proposal_form = kwargs.pop(
-            'submit_proposal_form', None)
-        return super().dispatch(request, *args, **kwargs)
-
 
 class OpportunityStatusUpdateView(UpdateView):
     print("Regular update....")
@@ -345,10 +423,8 @@ class OpportunityStatusUpdateView(UpdateView):
             # Save the combined data
             main_obj = main_form.save()
 
-            # Handle file uploads from the main form
-            files = self.request.FILES.getlist("files")
-            for f in files:
-                OpportunityFile.objects.create(opportunity=main_obj, file=f)
+            # Attach the uploads referenced by the main form
+            _attach_files(self.request, main_obj, main_form)
 
             if self.request.htmx:
                 headers = {"HX-Redirect": str(self.get_success_url())}
@@ -358,10 +434,31 @@ class OpportunityStatusUpdateView(UpdateView):
         else:
             return self.form_invalid(status_form)
 
+    def patch(self, request, *args, **kwargs):
+        """Apply the modal's status transition without the rest of the opportunity form."""
+        self.object = self.get_object()
+        result_date = self.object.result_date
+
+        form = self.form_class(_patch_data(request), instance=self.object)
+        if not form.is_valid():
+            self.object.refresh_from_db()
+            context = self.get_context_data(update_status_form=form)
+            return self.render_to_response(context, headers={"HX-Trigger": "form_invalid"})
+
+        # Only a result sets the result date; keep the recorded one otherwise
+        if form.cleaned_data.get("result_date") is None:
+            form.instance.result_date = result_date
+        form.save_partial(request.user)
+
+        # The list's card actions open the same modal
+        list_url = _list_url(request)
+        if list_url:
+            return _list_swap_response(request, list_url, self.object)
+        return _transition_response(request, self.object)
+
     def form_valid(self, form):
         self.object = form.save()
         if self.request.htmx:
-            # return HttpResponseClientRefresh()
             headers = {"HX-Redirect": str(self.get_success_url())}
             return HttpResponse(status=204, headers=headers)
 
@@ -449,10 +546,8 @@ class OpportunitySubmitView(UpdateView):
             main_obj.submission_date = proposal_obj.submission_date
             main_obj.save()
 
-            # Handle file uploads from the main form
-            files = self.request.FILES.getlist("files")
-            for f in files:
-                OpportunityFile.objects.create(opportunity=main_obj, file=f)
+            # Attach the uploads referenced by the main form
+            _attach_files(self.request, main_obj, main_form)
 
             if self.request.htmx:
                 headers = {"HX-Redirect": str(self.get_success_url())}
@@ -462,6 +557,24 @@ class OpportunitySubmitView(UpdateView):
         else:
             return self.form_invalid(proposal_form)
 
+    def patch(self, request, *args, **kwargs):
+        """Submit the proposal from the modal without the rest of the opportunity form."""
+        self.object = self.get_object()
+
+        form = self.form_class(_patch_data(request), instance=self.object)
+        if not form.is_valid():
+            self.object.refresh_from_db()
+            return self.form_invalid(form)
+
+        form.instance.status = 5  # Submitted
+        form.save_partial(request.user)
+
+        # The list's card actions open the same modal
+        list_url = _list_url(request)
+        if list_url:
+            return _list_swap_response(request, list_url, self.object)
+        return _transition_response(request, self.object)
+
     def form_valid(self, form):
         self.object = form.save()
         if self.request.htmx:
@@ -481,8 +594,10 @@ class OpportunitySubmitView(UpdateView):
         return context
 
     def form_invalid(self, form):
-        view = OpportunityUpdateView.as_view()
-        return view(self.request, pk=self.object.id, submit_proposal_form=form)
+        # Re-render the modal with its errors, like the status update does
+        context = self.get_context_data(submit_proposal_form=form)
+        headers = {"HX-Trigger": "form_invalid"} if self.request.htmx else None
+        return self.render_to_response(context, headers=headers)
 
     def get_template_names(self):
         if self.request.htmx:
@@ -490,10 +605,25 @@ class OpportunitySubmitView(UpdateView):
         return super().get_template_names()
 
 
-class OpportunityDetailView(DetailView):
+def _detail_validators(request, pk):
+    validators = opportunity_validators(pk)
+    if validators is None:
+        return None
+    parts, updated_at = validators
+    # The AJAX call gets the details wrapped in JSON
+    return (*parts, request.headers.get("X-Requested-With")), updated_at
+
+
+class OpportunityDetailView(ConditionalGetMixin, DetailView):
     model = Opportunity
+    # Their names are part of the cached detail fragment's key
+    queryset = Opportunity.objects.select_related('created_by', 'proposal_lead')
     template_name = "tracker/detail_modal.html"
     context_object_name = "opportunity"
+    vary_on = ("X-Requested-With", )
+
+    def get_validators(self):
+        return _detail_validators(self.request, self.kwargs["pk"])
 
     def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
         context = super().get_context_data(**kwargs)
@@ -521,11 +651,25 @@ class OpportunityDetailView(DetailView):
 
 
 @method_decorator(login_not_required, name='dispatch')
-class OpportunityDetailAnonymousView(DeleteView):
+class OpportunityDetailAnonymousView(ConditionalGetMixin, DeleteView):
     model = Opportunity
     form_class = OpportunityDetailAnonymousForm
     template_name = "tracker/detail_anonymous.html"
     context_object_name = "opportunity"
+    vary_on = ("X-Requested-With", )
+
+    def get_validators(self):
+        # Signed-in visitors get their navigation bar, with a CSRF token, on this page
+        if self.request.user.is_authenticated:
+            return None
+        return _detail_validators(self.request, self.kwargs["pk"])
+
+    def get_cache_control(self):
+        if self.request.user.is_authenticated:
+            return super().get_cache_control()
+        # Shared caches may keep the public page; browsers revalidate it every time
+        return {"public": True, "max_age": 0,
+                "s_maxage": settings.OPPORTUNITY_PUBLIC_CACHE_TIMEOUT}
 
     def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
         context = super().get_context_data(**kwargs)
@@ -562,38 +706,139 @@ class DownloadFolderView(View):
             return HttpResponse("Opportunity not found", status=404)
 
         # Get all the files
-        files = opportunity.Files.all()
+        files = list(opportunity.Files.all())
 
-        if not files.exists():
+        if not files:
             return HttpResponse("No attachment found", status=404)
 
-        # Create a zip file in memory
-        ref_no = foldername = re.sub(r"[^a-zA-Z0-9]", "_", opportunity.ref_no)
+        ref_no = re.sub(r"[^a-zA-Z0-9]", "_", opportunity.ref_no)
         zip_filename = f"{ref_no}.zip"
-        zip_path = os.path.join(settings.MEDIA_ROOT, "temp", zip_filename)
 
-        # Ensure the temp folder exists
-        os.makedirs(os.path.join(settings.MEDIA_ROOT, "temp"), exist_ok=True)
+        # The same set of files always produces the same archive
+        key = archive_key(files)
+        cached_path = get_cached_archive(opportunity.id, key)
+        if cached_path:
+            return ranged_file_response(request, cached_path, filename=zip_filename,
+                                        etag=key, content_type="application/zip")
+
+        # Stream the archive while it is built, caching it for the next download
+        members = [(arcname, file.file) for arcname, file in zip(
+            unique_arcnames(file.display_name for file in files), files)]
+        response = StreamingHttpResponse(
+            cache_archive(opportunity.id, key, stream_zip(members)), content_type="application/zip")
+        response["Content-Disposition"] = f"attachment; filename={
+            zip_filename}"
+        response["ETag"] = f'"{key}"'
 
-        with zipfile.ZipFile(zip_path, "w") as zip_file:
-            for file in files:
-                file_path = file.file.path
-                # Relative path inside zip
-                archname = os.path.relpath(
-                    file_path, os.path.join(settings.MEDIA_ROOT, "opportunities", ref_no))
-                zip_file.write(file_path, archname)
+        return response
 
-        # Serve the zip file
-        with open(zip_path, "rb") as file:
-            response = HttpResponse(
-                file.read(), content_type="application/zip")
-            response["Content-Disposition"] = f"attachment; filename={
-                zip_filename}"
 
-        # Clean up the zip file
-        os.remove(zip_path)
+class MediaFileView(View):
+    """Serve an attachment to logged-in users after checking it belongs to an opportunity."""
 
-        return response
+    def get(self, request, path):
+        # Blobs can be shared; any opportunity referencing it grants access
+        opportunity_file = OpportunityFile.objects.filter(file=path).first()
+        if not opportunity_file:
+            raise Http404("File not found")
+        return _send_attachment(request, opportunity_file)
+
+
+def _send_attachment(request, opportunity_file):
+    return send_field_file(request, opportunity_file.file, opportunity_file.display_name)
+
+
+TUS_HEADERS = {"Tus-Resumable": "1.0.0"}
+
+
+class FileUploadCreateView(View):
+    """Open a resumable upload session (tus-style creation).
+
+    The client sends the total size in `Upload-Length` and the file name in
+    `Upload-Metadata` ("filename <base64>") or as a `filename` form field,
+    then PATCHes the chunks to the returned `Location`.
+    """
+
+    def post(self, request):
+        metadata = dict(
+            item.strip().split(" ", 1) for item in request.headers.get("Upload-Metadata", "").split(",")
+            if " " in item.strip())
+        try:
+            filename = base64.b64decode(metadata["filename"]).decode()
+        except (KeyError, ValueError):
+            filename = request.POST.get("filename", "")
+        filename = os.path.basename(filename.replace("\\", "/"))
+
+        try:
+            size = int(request.headers.get("Upload-Length") or request.POST.get("size"))
+        except (TypeError, ValueError):
+            return HttpResponse("Upload-Length is required", status=400, headers=TUS_HEADERS)
+
+        if not filename or size < 0:
+            return HttpResponse("A file name is required", status=400, headers=TUS_HEADERS)
+        if size > settings.FILE_UPLOAD_MAX_SIZE:
+            return HttpResponse("File too large", status=413, headers=TUS_HEADERS)
+
+        upload = FileUpload.objects.create(
+            filename=filename[:255], size=size, created_by=request.user,
+            completed_at=timezone.now() if size == 0 else None)
+        location = reverse("file_upload", kwargs={"pk": upload.pk})
+        return JsonResponse({"id": str(upload.pk), "offset": upload.offset}, status=201,
+                            headers={**TUS_HEADERS, "Location": location})
+
+
+class FileUploadView(View):
+    """Resume (HEAD), append to (PATCH) or cancel (DELETE) an upload session."""
+
+    def dispatch(self, request, *args, **kwargs):
+        self.upload = get_object_or_404(
+            FileUpload, pk=kwargs["pk"], created_by=request.user)
+        return super().dispatch(request, *args, **kwargs)
+
+    def _offset_headers(self):
+        return {**TUS_HEADERS, "Upload-Offset": str(self.upload.offset),
+                "Upload-Length": str(self.upload.size), "Cache-Control": "no-store"}
+
+    def head(self, request, pk):
+        return HttpResponse(headers=self._offset_headers())
+
+    def patch(self, request, pk):
+        if request.content_type != "application/offset+octet-stream":
+            return HttpResponse(status=415, headers=TUS_HEADERS)
+        try:
+            offset = int(request.headers["Upload-Offset"])
+            length = int(request.headers["Content-Length"])
+        except (KeyError, ValueError):
+            return HttpResponse("Upload-Offset is required", status=400, headers=TUS_HEADERS)
+        if offset + length > self.upload.size:
+            return HttpResponse("Chunk exceeds Upload-Length", status=413, headers=TUS_HEADERS)
+
+        try:
+            self.upload = append_chunk(self.upload, request, offset, length)
+        except UploadOffsetMismatch:
+            self.upload.refresh_from_db()
+            return HttpResponse(status=409, headers=self._offset_headers())
+
+        return HttpResponse(status=204, headers=self._offset_headers())
+
+    def delete(self, request, pk):
+        self.upload.delete()
+        return HttpResponse(status=204, headers=TUS_HEADERS)
+
+
+class AutocompleteView(View):
+    """Prefix search over a reference table, answered in select2's ajax format."""
+
+    def get(self, request, entity):
+        try:
+            source = SOURCES[entity]
+        except KeyError:
+            raise Http404(f"No autocomplete for '{entity}'")
+        try:
+            page = max(int(request.GET.get("page", 1)), 1)
+        except ValueError:
+            page = 1
+        return JsonResponse(search(source, request.GET.get("term", ""), page))
 
 
 class NewFundingAgencyView(View):